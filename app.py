@@ -1,10 +1,15 @@
 # app.py (Flask example)
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
+import re
+import time
+import atexit
 import hashlib
 import json
+from concurrent.futures import TimeoutError as CommitTimeout
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,63 +17,185 @@ load_dotenv()
 
 # Import services
 from auth_service import VoterAuthService
-from kyc_service import KYCService
+from kyc_service import KYCService, KYCUploadTooLarge, KYCInvalidImage
 from blockchain_lite import TamperEvidenceChain
 from vote_service import VoteProcessor
 from excel_manager import ExcelManager
 from anti_replay import AntiReplayProtection
 from security_config import SecurityConfig
 from otp_service import OTPService
+from kyc_jobs import KYCJobQueue
+from geoip import GeoIPLookup
+from vote_pipeline import VoteCommitPipeline
+from vote_store import EncryptedVoteStore
+from export_pipeline import ExportJob
+from static_assets import StaticAssetCache
+from results_stream import ResultsBroadcaster
+from warmup import Warmup
+from metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+from profiling import PROFILER
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})  # Enable CORS for frontend
 
-# Initialize services
+# Initialize services (data files are loaded by the background warm-up below)
 keys = SecurityConfig.load_keys()
-auth_service = VoterAuthService('voter_registry.xlsx', keys['session_key'])
+auth_service = VoterAuthService('voter_registry.xlsx', keys['session_key'], load_registry=False)
 kyc_service = KYCService('kyc_storage', keys['pii_encryption_key'])
-tamper_chain = TamperEvidenceChain('vote_chain.json')
-vote_processor = VoteProcessor(auth_service, kyc_service, tamper_chain)
+# Reject oversized request bodies before they are buffered (form overhead allowance)
+app.config['MAX_CONTENT_LENGTH'] = kyc_service.max_upload_bytes + 64 * 1024
+tamper_chain = TamperEvidenceChain('vote_chain.json', load=False)
+geoip = GeoIPLookup(os.getenv('GEOIP_CSV', 'geoip.csv'), load=False)
+vote_store = EncryptedVoteStore('vote_store.dat', load=False)
+vote_processor = VoteProcessor(auth_service, kyc_service, tamper_chain, geoip, vote_store)
 excel_manager = ExcelManager('voter_registry.xlsx', 'vote_records.xlsx', 'candidates.xlsx')
 anti_replay = AntiReplayProtection()
 otp_service = OTPService()
+kyc_jobs = KYCJobQueue(kyc_service)
 
-# Load voter registry and candidates at startup
-excel_manager.load_voter_registry()
-excel_manager.load_candidates()
-excel_manager.load_vote_records()
+# Live tally for /api/results/stream, fed by the commit pipeline
+results = ResultsBroadcaster.from_env()
+
+# ========== WARM-UP ==========
+
+def load_registry():
+    """Parse the registry once for both services"""
+    success, detail = excel_manager.load_voter_registry()
+    if success:
+        auth_service.voter_db = excel_manager.voter_db.copy()
+    return success, detail
+
+def load_results():
+    results.load(excel_manager.get_vote_tallies(), len(vote_store), len(excel_manager.voter_db))
+
+# Data files load concurrently in the background so the server answers
+# /api/health at once; /api/ready reports progress
+warmup = Warmup()
+warmup.add('registry', load_registry)
+warmup.add('candidates', excel_manager.load_candidates)
+warmup.add('vote_records', excel_manager.load_vote_records)
+warmup.add('chain', tamper_chain.load)
+warmup.add('vote_store', vote_store.load)
+warmup.add('geoip', geoip.load)
+warmup.add('results', load_results, after=('registry', 'candidates', 'vote_store'))
+warmup.start()
+
+# Components a route needs before it can serve (others need none)
+ENDPOINT_REQUIREMENTS = {
+    'get_candidates': ('candidates',),
+    'login': ('registry',),
+    'verify_otp': ('registry',),
+    'resend_otp': ('registry',),
+    'submit_vote': ('registry', 'candidates', 'vote_records', 'chain', 'vote_store',
+                    'geoip', 'results'),
+    'results_stream': ('results',),
+    'verify_vote': ('chain',),
+    'verify_batch': ('chain',),
+    'verify_chain': ('chain',),
+    'chain_head': ('chain',),
+    'chain_block': ('chain',),
+}
+WARMUP_WAIT_SECONDS = float(os.getenv('WARMUP_WAIT_SECONDS', '30'))
+VERIFY_BATCH_MAX = int(os.getenv('VERIFY_BATCH_MAX', '5000'))
+# How long submit_vote waits for the commit before answering 202 (pending)
+VOTE_COMMIT_WAIT_SECONDS = float(os.getenv('VOTE_COMMIT_WAIT_SECONDS', '30'))
+SHA256_HEX = re.compile(r'[0-9a-f]{64}')
+
+# Single writer thread that applies all vote side effects in batches
+vote_pipeline = VoteCommitPipeline(vote_processor, tamper_chain, anti_replay, excel_manager,
+                                   results=results)
+atexit.register(vote_pipeline.stop)  # Drain queued side effects on shutdown
+export_job = ExportJob('vote_results.xlsx', 'export_progress.json',
+                       tamper_chain.chain_file, vote_store.store_path)
+static_assets = StaticAssetCache(os.getenv('STATIC_ROOT', '.'))
+
+# ========== METRICS ==========
+
+HTTP_SECONDS = REGISTRY.histogram(
+    'vote_vault_http_request_seconds', 'HTTP request latency by endpoint', ('endpoint',)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'vote_vault_http_requests_total', 'HTTP requests by endpoint and status', ('endpoint', 'status')
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Endpoint names (not raw paths) keep label cardinality bounded
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.before_request
+def wait_for_warmup():
+    """Hold requests that arrive while their data is still loading"""
+    required = ENDPOINT_REQUIREMENTS.get(request.endpoint)
+    if required and not warmup.wait(required, timeout=WARMUP_WAIT_SECONDS):
+        return jsonify({
+            'success': False,
+            'error': 'Server is starting, please retry',
+            'components': warmup.status(required)
+        }), 503, {'Retry-After': '5'}
+
+# Opt-in cProfile of sampled / admin-tagged requests (see profiling.py)
+PROFILER.init_app(app)
 
 # ========== HTML ROUTES ==========
 
+def serve_asset(name):
+    """Serve an allow-listed asset from the in-memory cache"""
+    response = static_assets.response(name, request)
+    if response is None:
+        return "File not found", 404
+    return response
+
 @app.route('/')
 def index():
     """Serve the login page"""
-    return send_file('login.html')
+    return serve_asset('login.html')
 
 @app.route('/vote')
 def vote_page():
     """Serve the voting page"""
-    return send_file('voting.html')
+    return serve_asset('voting.html')
 
 @app.route('/login')
 def login_page():
     """Serve the login page"""
-    return send_file('login.html')
+    return serve_asset('login.html')
 
 @app.route('/<path:filename>')
 def serve_static(filename):
     """Serve static files (CSS, JS, etc.)"""
-    if os.path.exists(filename):
-        return send_file(filename)
-    return "File not found", 404
+    return serve_asset(filename)
 
 # ========== API ENDPOINTS ==========
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness: answers as soon as the app is imported (see /api/ready)"""
     return jsonify({'status': 'ok', 'message': 'Server is running'}), 200
 
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness (vs. /api/health liveness): which data components are loaded"""
+    ready = warmup.is_ready()
+    return jsonify({
+        'ready': ready,
+        'components': warmup.status()
+    }), 200 if ready else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Counters and latency histograms in Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/api/candidates', methods=['GET'])
 def get_candidates():
     """Get list of candidates"""
@@ -84,56 +211,130 @@ def get_candidates():
             'error': str(e)
         }), 500
 
+# The OTP endpoints are split around the email send so the same logic
+# serves the WSGI views below and the asyncio entry point (asgi_app.py):
+# begin_* returns (payload, status, otp_email); when otp_email is not None
+# the caller sends it and passes the result to finish_*.
+
+def begin_login(data):
+    """Login step 1 up to (not including) the OTP email"""
+    success, temp_token, voter_info = auth_service.validate_voter(
+        data['voter_id'],
+        data['dob'],
+        data['email']
+    )
+    
+    if not success:
+        return {
+            'success': False,
+            'error': voter_info.get('error', 'Authentication failed') if voter_info else 'Invalid credentials'
+        }, 401, None
+    
+    # Check rate limiting
+    can_request, error_msg = otp_service.can_request_otp(data['email'])
+    if not can_request:
+        return {
+            'success': False,
+            'error': error_msg
+        }, 429, None
+    
+    # Generate OTP
+    otp = otp_service.generate_otp()
+    otp_service.store_otp(data['email'], otp)
+    
+    response_data = {
+        'success': True,
+        'requires_otp': True,
+        'temp_token': temp_token,
+        'message': f'OTP sent to {data["email"][:3]}***@{data["email"].split("@")[1]}'
+    }
+    return response_data, 200, (data['email'], voter_info['name'], otp)
+
+def finish_login(response_data, test_otp):
+    # Include OTP in response for testing if email not configured
+    if test_otp:
+        response_data['test_otp'] = test_otp
+        response_data['message'] += ' (Check console for OTP)'
+    return response_data
+
+def complete_otp_verification(data):
+    """Login step 2: verify OTP and create the session"""
+    email = data.get('email')
+    otp = data.get('otp')
+    temp_token = data.get('temp_token')
+    
+    # Verify OTP
+    otp_valid, message = otp_service.verify_otp(email, otp)
+    
+    if not otp_valid:
+        return {
+            'success': False,
+            'error': message
+        }, 401
+    
+    # Complete login and create session
+    success, session_token, voter_info = auth_service.complete_login_after_otp(temp_token)
+    
+    if success:
+        return {
+            'success': True,
+            'session_token': session_token,
+            'voter_info': voter_info,
+            'message': 'Login successful'
+        }, 200
+    return {
+        'success': False,
+        'error': voter_info.get('error', 'Session creation failed')
+    }, 401
+
+def begin_resend_otp(data):
+    """Resend up to (not including) the OTP email"""
+    email = data.get('email')
+    temp_token = data.get('temp_token')
+    
+    # Verify temp_token is still valid
+    pending = auth_service.pending_otp_verifications.get(temp_token)
+    if not pending:
+        return {
+            'success': False,
+            'error': 'Session expired. Please login again.'
+        }, 401, None
+    
+    # Check rate limiting
+    can_request, error_msg = otp_service.can_request_otp(email)
+    if not can_request:
+        return {
+            'success': False,
+            'error': error_msg
+        }, 429, None
+    
+    # Generate new OTP
+    otp = otp_service.generate_otp()
+    otp_service.store_otp(email, otp)
+    
+    response_data = {
+        'success': True,
+        'message': 'New OTP sent successfully'
+    }
+    return response_data, 200, (email, pending['voter_info']['name'], otp)
+
+def finish_resend_otp(response_data, test_otp):
+    if test_otp:
+        response_data['test_otp'] = test_otp
+    return response_data
+
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """Voter authentication endpoint - Step 1: Validate credentials and send OTP"""
     try:
-        data = request.json
-        
-        success, temp_token, voter_info = auth_service.validate_voter(
-            data['voter_id'],
-            data['dob'],
-            data['email']
-        )
+        response_data, status, otp_email = begin_login(request.json)
         
-        if success:
-            # Check rate limiting
-            can_request, error_msg = otp_service.can_request_otp(data['email'])
-            if not can_request:
-                return jsonify({
-                    'success': False,
-                    'error': error_msg
-                }), 429
-            
-            # Generate and send OTP
-            otp = otp_service.generate_otp()
-            otp_service.store_otp(data['email'], otp)
-            
+        if otp_email:
             # Send OTP via email
-            email_sent, test_otp = otp_service.send_otp_email(
-                data['email'], 
-                voter_info['name'], 
-                otp
-            )
-            
-            response_data = {
-                'success': True,
-                'requires_otp': True,
-                'temp_token': temp_token,
-                'message': f'OTP sent to {data["email"][:3]}***@{data["email"].split("@")[1]}'
-            }
-            
-            # Include OTP in response for testing if email not configured
-            if test_otp:
-                response_data['test_otp'] = test_otp
-                response_data['message'] += ' (Check console for OTP)'
-            
-            return jsonify(response_data), 200
-        else:
-            return jsonify({
-                'success': False,
-                'error': voter_info.get('error', 'Authentication failed') if voter_info else 'Invalid credentials'
-            }), 401
+            email_sent, test_otp = otp_service.send_otp_email(*otp_email)
+            response_data = finish_login(response_data, test_otp)
+        
+        return jsonify(response_data), status
     except Exception as e:
         print(f"Error in login: {e}")
         return jsonify({
@@ -145,36 +346,8 @@ def login():
 def verify_otp():
     """Verify OTP and complete login - Step 2"""
     try:
-        data = request.json
-        email = data.get('email')
-        otp = data.get('otp')
-        temp_token = data.get('temp_token')
-        
-        # Verify OTP
-        otp_valid, message = otp_service.verify_otp(email, otp)
-        
-        if otp_valid:
-            # Complete login and create session
-            success, session_token, voter_info = auth_service.complete_login_after_otp(temp_token)
-            
-            if success:
-                return jsonify({
-                    'success': True,
-                    'session_token': session_token,
-                    'voter_info': voter_info,
-                    'message': 'Login successful'
-                }), 200
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': voter_info.get('error', 'Session creation failed')
-                }), 401
-        else:
-            return jsonify({
-                'success': False,
-                'error': message
-            }), 401
-            
+        response_data, status = complete_otp_verification(request.json)
+        return jsonify(response_data), status
     except Exception as e:
         print(f"Error in verify_otp: {e}")
         return jsonify({
@@ -186,48 +359,13 @@ def verify_otp():
 def resend_otp():
     """Resend OTP"""
     try:
-        data = request.json
-        email = data.get('email')
-        temp_token = data.get('temp_token')
-        
-        # Verify temp_token is still valid
-        if temp_token not in auth_service.pending_otp_verifications:
-            return jsonify({
-                'success': False,
-                'error': 'Session expired. Please login again.'
-            }), 401
-        
-        # Check rate limiting
-        can_request, error_msg = otp_service.can_request_otp(email)
-        if not can_request:
-            return jsonify({
-                'success': False,
-                'error': error_msg
-            }), 429
-        
-        # Get voter info
-        voter_info = auth_service.pending_otp_verifications[temp_token]['voter_info']
-        
-        # Generate and send new OTP
-        otp = otp_service.generate_otp()
-        otp_service.store_otp(email, otp)
-        
-        email_sent, test_otp = otp_service.send_otp_email(
-            email, 
-            voter_info['name'], 
-            otp
-        )
-        
-        response_data = {
-            'success': True,
-            'message': 'New OTP sent successfully'
-        }
-        
-        if test_otp:
-            response_data['test_otp'] = test_otp
+        response_data, status, otp_email = begin_resend_otp(request.json)
         
-        return jsonify(response_data), 200
+        if otp_email:
+            email_sent, test_otp = otp_service.send_otp_email(*otp_email)
+            response_data = finish_resend_otp(response_data, test_otp)
         
+        return jsonify(response_data), status
     except Exception as e:
         print(f"Error in resend_otp: {e}")
         return jsonify({
@@ -249,11 +387,30 @@ def upload_kyc():
             return jsonify({'error': 'No image provided'}), 400
         
         image_file = request.files['kyc_image']
-        image_bytes = image_file.read()
         timestamp = request.form.get('timestamp')
         
-        image_hash, file_path = kyc_service.process_kyc_image(
-            image_bytes,
+        # Async mode: hash on the request path, encrypt and persist on the worker pool
+        async_mode = request.form.get('async', os.getenv('KYC_ASYNC_UPLOADS', '0')) in ('1', 'true')
+        if async_mode:
+            image_bytes = image_file.stream.read(kyc_service.max_upload_bytes + 1)
+            if len(image_bytes) > kyc_service.max_upload_bytes:
+                raise KYCUploadTooLarge(f"KYC image exceeds {kyc_service.max_upload_bytes} bytes")
+            
+            queued, job = kyc_jobs.submit(image_bytes, voter_info['voter_id'], timestamp)
+            if not queued:
+                return jsonify({'success': False, 'error': job['error']}), 503
+            
+            return jsonify({
+                'success': True,
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'image_hash': job['image_hash'],
+                'status_url': f"/api/kyc/status/{job['job_id']}"
+            }), 202
+        
+        # Stream the upload in chunks instead of reading it into memory
+        image_hash, file_path = kyc_service.process_kyc_stream(
+            image_file.stream,
             voter_info['voter_id'],
             timestamp
         )
@@ -263,6 +420,22 @@ def upload_kyc():
             'image_hash': image_hash,
             'encrypted_reference': os.path.basename(file_path)
         }), 200
+    except KYCUploadTooLarge as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+    except RequestEntityTooLarge:
+        # Body over MAX_CONTENT_LENGTH, rejected before the form is parsed
+        return jsonify({
+            'success': False,
+            'error': f"KYC image exceeds {kyc_service.max_upload_bytes} bytes"
+        }), 413
+    except KYCInvalidImage as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         print(f"Error in upload_kyc: {str(e)}")
         import traceback
@@ -272,6 +445,32 @@ def upload_kyc():
             'error': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/api/kyc/config', methods=['GET'])
+def kyc_config():
+    """Capture limits for the browser: bound resolution and size before upload"""
+    response = jsonify(kyc_service.client_config())
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response, 200
+
+@app.route('/api/kyc/status/<job_id>', methods=['GET'])
+def kyc_job_status(job_id):
+    """Poll an asynchronous KYC upload job"""
+    session_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    
+    voter_info = auth_service.verify_session(session_token)
+    if not voter_info:
+        return jsonify({'error': 'Invalid session'}), 401
+    
+    job = kyc_jobs.jobs.get(job_id)
+    voter_id_hash = hashlib.sha256(voter_info['voter_id'].encode()).hexdigest()
+    if not job or job['voter_id_hash'] != voter_id_hash:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        **kyc_jobs.get_job(job_id)
+    }), 200
+
 @app.route('/api/vote/submit', methods=['POST'])
 def submit_vote():
     """Vote submission endpoint"""
@@ -289,40 +488,43 @@ def submit_vote():
         if not can_vote:
             return jsonify({'error': error}), 403
         
+        # The KYC image must be stored and referenced by this voter (async: once durable)
+        kyc_ready, error = kyc_jobs.check_image_ready(data['kyc_image_hash'], voter_id_hash)
+        if not kyc_ready:
+            return jsonify({'error': error}), 409
+        
         # Generate nonce
         nonce = anti_replay.generate_nonce(voter_info['voter_id'], data['timestamp'])
         
-        # Process vote
-        success, receipt = vote_processor.process_vote(
+        # Validate vote (front half), then hand it to the commit pipeline
+        success, prepared = vote_processor.prepare_vote(
             session_token,
             data['vote_choice'],
             data['kyc_image_hash'],
             request.remote_addr
         )
+        if not success:
+            return jsonify({
+                'success': False,
+                'error': prepared.get('error')
+            }), 400
+        
+        # Returns once the vote's block is durably on the chain
+        commit = vote_pipeline.submit(prepared, nonce, data['timestamp'])
+        try:
+            success, receipt = commit.result(timeout=VOTE_COMMIT_WAIT_SECONDS)
+        except CommitTimeout:
+            # Still queued: it will be committed (or rejected as a duplicate)
+            # later, so this is not a failure. The client polls the public
+            # verify endpoint until the vote's block shows up.
+            return jsonify({
+                'success': True,
+                'status': 'pending',
+                'voter_id_hash': voter_id_hash,
+                'status_url': f'/api/verify/{voter_id_hash}'
+            }), 202
         
         if success:
-            # Register vote (anti-replay)
-            anti_replay.register_vote(voter_id_hash, nonce, data['timestamp'])
-            
-            # Mark voter as voted in Excel
-            excel_manager.mark_voter_as_voted(voter_info['voter_id'])
-            
-            # Add vote record to vote_records.xlsx
-            excel_manager.add_vote_record(
-                voter_id=voter_info['voter_id'],
-                voter_name=voter_info.get('name', 'Unknown'),
-                candidate_voted=data['vote_choice'],
-                ip_address=request.remote_addr,
-                geolocation_city='Unknown',  # Can be enhanced with geolocation API
-                geolocation_country='Unknown',
-                kyc_image_hash=data['kyc_image_hash'],
-                block_hash=receipt.get('block_hash', 'N/A'),
-                vote_hash=receipt.get('vote_hash', 'N/A')
-            )
-            
-            # Update candidate vote count
-            excel_manager.update_candidate_vote_count(data['vote_choice'])
-            
             return jsonify({
                 'success': True,
                 'receipt': receipt
@@ -341,6 +543,51 @@ def submit_vote():
             'error': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/api/results/stream', methods=['GET'])
+def results_stream():
+    """Live tally and turnout deltas (Server-Sent Events)"""
+    return Response(
+        results.iter_events(request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/verify/batch', methods=['POST'])
+def verify_batch():
+    """
+    Verify many receipts in one request (public)
+    Body: {"hashes": [voter_id_hash or vote_hash, ...]}
+    Proofs are [block_index, block_hash, timestamp, vote_hash], keyed by
+    the submitted hash
+    """
+    data = request.get_json(silent=True) or {}
+    hashes = data.get('hashes')
+    if not isinstance(hashes, list) or not hashes:
+        return jsonify({'success': False, 'error': 'hashes must be a non-empty list'}), 400
+    if len(hashes) > VERIFY_BATCH_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'At most {VERIFY_BATCH_MAX} hashes per request'
+        }), 413
+    
+    valid = set()
+    invalid = []
+    for value in hashes:
+        if isinstance(value, str) and SHA256_HEX.fullmatch(value):
+            valid.add(value)
+        else:
+            invalid.append(value)
+    
+    proofs = tamper_chain.get_vote_proofs(valid)
+    return jsonify({
+        'success': True,
+        'chain_length': len(tamper_chain.chain),
+        'verified': len(proofs),
+        'proofs': proofs,
+        'missing': sorted(valid - proofs.keys()),
+        'invalid': invalid
+    }), 200
+
 @app.route('/api/verify/<voter_id_hash>', methods=['GET'])
 def verify_vote(voter_id_hash):
     """Vote verification endpoint (public)"""
@@ -368,39 +615,75 @@ def verify_chain():
         'error_at_block': error_index
     }), 200
 
+@app.route('/api/chain/head', methods=['GET'])
+def chain_head():
+    """Latest block (anchored into the root chain in sharded mode, see sharding.py)"""
+    chain = tamper_chain.chain
+    head = chain[-1]
+    return jsonify({
+        'shard': os.getenv('SHARD_ID'),
+        'length': len(chain),
+        'head_hash': head['hash'],
+        'timestamp': head['timestamp']
+    }), 200
+
+@app.route('/api/chain/blocks/<int:index>', methods=['GET'])
+def chain_block(index):
+    """Header of one block (hash links only, no vote data)"""
+    chain = tamper_chain.chain
+    if index >= len(chain):
+        return jsonify({'error': 'Block not found'}), 404
+    block = chain[index]
+    return jsonify({
+        'index': block['index'],
+        'hash': block['hash'],
+        'previous_hash': block['previous_hash'],
+        'timestamp': block['timestamp']
+    }), 200
+
 @app.route('/api/admin/export', methods=['POST'])
 def export_results():
-    """Export vote results to Excel (admin only)"""
+    """Start exporting vote results to Excel in the background (admin only)"""
     # TODO: Add admin authentication
     
-    # Decrypt votes and prepare export data
-    vote_records = []
-    for voter_id_hash, encrypted_vote in vote_processor.votes_encrypted.items():
-        decrypted = auth_service.cipher.decrypt(encrypted_vote)
-        vote_data = json.loads(decrypted.decode())
-        
-        # Get block info
-        proof = tamper_chain.get_vote_proof(voter_id_hash)
-        
-        vote_records.append({
-            'Timestamp': vote_data['timestamp'],
-            'VoterID': vote_data['voter_id'],
-            'Name': vote_data['voter_name'],
-            'Vote': vote_data['vote_choice'],
-            'GeolocationCity': 'Unknown',  # TODO: Extract from chain
-            'GeolocationCountry': 'Unknown',
-            'KYCImageHash': proof['vote_hash'],
-            'BlockHash': vote_data['block_hash'],
-            'VoteHash': proof['vote_hash']
-        })
+    # Runs in its own process (export_pipeline.py); the client polls progress
+    try:
+        progress = export_job.start()
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
     
-    excel_manager.export_vote_log(vote_records)
+    return jsonify({
+        'success': True,
+        'status': progress['status'],
+        'file': progress['file'],
+        'status_url': '/api/admin/export/progress'
+    }), 202
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def profile_hotspots():
+    """Rolling top-N hotspots per profiled endpoint (requires X-Profile-Token)"""
+    if not PROFILER.token_matches(request.headers.get('X-Profile-Token')):
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
     
+    endpoint = request.args.get('endpoint')
+    endpoints = PROFILER.profiled_endpoints()
+    if endpoint:
+        if endpoint not in endpoints:
+            return jsonify({'success': False, 'error': 'No profiles for this endpoint'}), 404
+        endpoints = [endpoint]
     return jsonify({
         'success': True,
-        'file': 'vote_results.xlsx',
-        'total_votes': len(vote_records)
+        'hotspots': {name: PROFILER.hotspots(name, request.args.get('limit', type=int))
+                     for name in endpoints}
     }), 200
 
+@app.route('/api/admin/export/progress', methods=['GET'])
+def export_progress():
+    """Progress of the current / last admin export"""
+    return jsonify(export_job.progress), 200
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,294 @@
+# asgi_app.py
+"""
+asyncio (ASGI) entry point exposing the same routes as app.py.
+
+- The login/OTP endpoints and /api/health are served natively: blocking
+  work (pandas lookups, Fernet) runs on a small bounded executor and the
+  SMTP conversation is awaited, so thousands of logins can be in flight
+  on a handful of threads.
+- /api/results/stream (Server-Sent Events) is served natively too: one
+  coroutine per dashboard instead of a bridge thread held open.
+- Every other route is forwarded to the Flask app through a WSGI bridge
+  running on its own bounded executor; request bodies are spooled to disk
+  past 1 MiB and responses are streamed back chunk by chunk.
+
+Run with:  uvicorn asgi_app:application --host 0.0.0.0 --port 5000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import app as server  # Builds the shared services and the Flask app
+
+BLOCKING_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASGI_BLOCKING_WORKERS', '8')),
+    thread_name_prefix='asgi-blocking'
+)
+WSGI_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASGI_WSGI_WORKERS', '16')),
+    thread_name_prefix='asgi-wsgi'
+)
+SPOOL_BYTES = 1024 * 1024
+
+class RequestTooLarge(Exception):
+    pass
+
+async def run_blocking(func, *args):
+    """Run blocking service code on the bounded executor"""
+    return await asyncio.get_running_loop().run_in_executor(BLOCKING_EXECUTOR, func, *args)
+
+async def read_body(receive, spool=False):
+    """Read the request body (into memory, or a spooled temp file if spool=True)"""
+    limit = server.app.config.get('MAX_CONTENT_LENGTH')
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) if spool else bytearray()
+    received = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        received += len(chunk)
+        if limit and received > limit:
+            raise RequestTooLarge()
+        if spool:
+            body.write(chunk)
+        else:
+            body.extend(chunk)
+        more_body = message.get('more_body', False)
+    if spool:
+        body.seek(0)
+        return body, received
+    return bytes(body)
+
+async def send_json(send, payload, status):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def wait_for_warmup(required):
+    """Non-blocking counterpart of app.wait_for_warmup; True once loaded"""
+    deadline = time.monotonic() + server.WARMUP_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        statuses = [component['status'] for component in server.warmup.status(required).values()]
+        if all(status == 'ready' for status in statuses):
+            return True
+        if 'failed' in statuses:
+            return False
+        await asyncio.sleep(0.05)
+    return False
+
+async def send_starting(send, required):
+    await send_json(send, {
+        'success': False,
+        'error': 'Server is starting, please retry',
+        'components': server.warmup.status(required)
+    }, 503)
+
+# ========== NATIVE ASYNC ENDPOINTS ==========
+
+async def health_check(data):
+    return {'status': 'ok', 'message': 'Server is running'}, 200
+
+async def login(data):
+    try:
+        response_data, status, otp_email = await run_blocking(server.begin_login, data)
+        if otp_email:
+            email_sent, test_otp = await server.otp_service.send_otp_email_async(*otp_email)
+            response_data = server.finish_login(response_data, test_otp)
+        return response_data, status
+    except Exception as e:
+        print(f"Error in login: {e}")
+        return {'success': False, 'error': 'Server error'}, 500
+
+async def verify_otp(data):
+    try:
+        return await run_blocking(server.complete_otp_verification, data)
+    except Exception as e:
+        print(f"Error in verify_otp: {e}")
+        return {'success': False, 'error': 'Verification failed'}, 500
+
+async def resend_otp(data):
+    try:
+        response_data, status, otp_email = await run_blocking(server.begin_resend_otp, data)
+        if otp_email:
+            email_sent, test_otp = await server.otp_service.send_otp_email_async(*otp_email)
+            response_data = server.finish_resend_otp(response_data, test_otp)
+        return response_data, status
+    except Exception as e:
+        print(f"Error in resend_otp: {e}")
+        return {'success': False, 'error': 'Failed to resend OTP'}, 500
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def results_stream(scope, receive, send):
+    """Live results SSE; runs until the client disconnects"""
+    last_event_id = dict(scope['headers']).get(b'last-event-id', b'').decode('latin1')
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    server.HTTP_REQUESTS.inc(endpoint='results_stream', status=200)
+
+    async def stream():
+        async for chunk in server.results.aiter_events(last_event_id or None):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    tasks = [asyncio.ensure_future(stream()), asyncio.ensure_future(wait_for_disconnect(receive))]
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+# Handlers that own the whole response (called with scope, receive, send)
+STREAMING_ROUTES = {
+    ('GET', '/api/results/stream'): results_stream,
+}
+
+NATIVE_ROUTES = {
+    ('GET', '/api/health'): health_check,
+    ('POST', '/api/auth/login'): login,
+    ('POST', '/api/auth/verify-otp'): verify_otp,
+    ('POST', '/api/auth/resend-otp'): resend_otp,
+}
+
+# ========== WSGI BRIDGE ==========
+
+def build_environ(scope, body, content_length):
+    """WSGI environ for an ASGI HTTP scope"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1')
+        value = value.decode('latin1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'content-length':
+            continue
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+async def call_wsgi(scope, receive, send):
+    """Run the Flask app for one request on the WSGI executor, streaming the response"""
+    loop = asyncio.get_running_loop()
+    body, content_length = await read_body(receive, spool=True)
+    environ = build_environ(scope, body, content_length)
+    response_start = {}
+
+    def start_response(status, headers, exc_info=None):
+        response_start['status'] = int(status.split(' ', 1)[0])
+        response_start['headers'] = [(name.lower().encode('latin1'), value.encode('latin1'))
+                                     for name, value in headers]
+        return lambda data: None  # write() callable is not supported
+
+    try:
+        result = await loop.run_in_executor(WSGI_EXECUTOR, server.app.wsgi_app,
+                                            environ, start_response)
+        iterator = iter(result)
+        done = object()
+        started = False
+        while True:
+            chunk = await loop.run_in_executor(WSGI_EXECUTOR, next, iterator, done)
+            if not started:
+                await send({'type': 'http.response.start', **response_start})
+                started = True
+            if chunk is done:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+        if hasattr(result, 'close'):
+            await loop.run_in_executor(WSGI_EXECUTOR, result.close)
+    finally:
+        body.close()
+
+# ========== ASGI APPLICATION ==========
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            server.vote_pipeline.stop(timeout=30)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    streaming = STREAMING_ROUTES.get((scope['method'], scope['path']))
+    if streaming is not None:
+        required = server.ENDPOINT_REQUIREMENTS.get(streaming.__name__)
+        if required and not await wait_for_warmup(required):
+            return await send_starting(send, required)
+        return await streaming(scope, receive, send)
+
+    try:
+        handler = NATIVE_ROUTES.get((scope['method'], scope['path']))
+        if handler is None:
+            return await call_wsgi(scope, receive, send)
+        # Wait here rather than in run_blocking, so no executor thread is held
+        required = server.ENDPOINT_REQUIREMENTS.get(handler.__name__)
+        if required and not await wait_for_warmup(required):
+            return await send_starting(send, required)
+
+        started = time.perf_counter()
+        raw = await read_body(receive)
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            return await send_json(send, {'success': False, 'error': 'Invalid JSON body'}, 400)
+        payload, status = await handler(data)
+        await send_json(send, payload, status)
+        # Same series as the Flask views (handlers share the view names)
+        server.HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=handler.__name__)
+        server.HTTP_REQUESTS.inc(endpoint=handler.__name__, status=status)
+    except RequestTooLarge:
+        await send_json(send, {'success': False, 'error': 'Request too large'}, 413)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(application, host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
@@ -0,0 +1,318 @@
+# audit_rebuild.py
+"""
+Audit and rebuild of the derived election records.
+
+The chain (vote_chain.json) and the encrypted vote store (vote_store.dat)
+are the sources of truth. vote_records.xlsx, the candidates' VoteCount and
+the registry's HasVoted are derived from them and can drift, e.g. when a
+workbook write is dropped after its PermissionError retries. This tool
+1. verifies the chain and cross-checks every vote block against the store,
+2. streams the store and decrypts it in parallel batches across cores,
+3. rebuilds the three outputs deterministically (in chain order),
+4. diffs them against the files on disk and reports every mismatch,
+5. with --apply, replaces the files (originals kept as *.bak), but only
+   when the sources are consistent: a chain vote missing from the store
+   (e.g. cast before the store existed) would otherwise be dropped from
+   the counts and its voter's HasVoted reset, letting them vote again.
+
+IPAddress and the record Timestamp (commit wall-clock time) are not in
+the sources: they are carried over from the existing row with the same
+BlockHash (else 'N/A' / the vote's own timestamp) and are not diffed.
+
+Stop the server before --apply: it keeps these workbooks in memory and
+would overwrite the rebuilt files with its next write. A plain report is
+safe next to a running server: the store is opened read-only.
+
+Usage:
+    python audit_rebuild.py                    # report, exit 1 on any mismatch
+    python audit_rebuild.py --json audit.json  # full report as JSON
+    python audit_rebuild.py --apply            # rewrite the derived files
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from collections import Counter, deque
+from datetime import datetime
+
+from blockchain_lite import TamperEvidenceChain
+from vote_store import EncryptedVoteStore
+from excel_manager import read_voter_registry, registry_snapshot_path
+from export_pipeline import make_executor
+from decrypt_worker import try_decrypt_vote_batch
+from security_config import SecurityConfig
+
+VOTE_RECORD_COLUMNS = ['VoterID', 'VoterName', 'CandidateVoted', 'Timestamp',
+                       'IPAddress', 'GeolocationCity', 'GeolocationCountry',
+                       'VotedStatus', 'KYCImageHash', 'BlockHash', 'VoteHash']
+# Columns rebuilt from the sources (the others are carried over)
+DIFFED_COLUMNS = ['VoterID', 'VoterName', 'CandidateVoted', 'GeolocationCity',
+                  'GeolocationCountry', 'VotedStatus', 'KYCImageHash', 'VoteHash']
+
+def decrypt_votes(vote_store, key, workers, batch_size):
+    """voter_id_hash -> vote data for the whole store, plus undecryptable hashes"""
+    votes, failed = {}, []
+
+    def collect(future):
+        decrypted, bad = future.result()
+        votes.update(decrypted)
+        failed.extend(bad)
+
+    with make_executor(workers) as executor:
+        in_flight = deque()
+        batch = []
+        for item in vote_store.items():
+            batch.append(item)
+            if len(batch) >= batch_size:
+                in_flight.append(executor.submit(try_decrypt_vote_batch, key, batch))
+                batch = []
+                # Bounded read-ahead: the store is streamed, not loaded at once
+                if len(in_flight) >= workers * 2:
+                    collect(in_flight.popleft())
+        if batch:
+            in_flight.append(executor.submit(try_decrypt_vote_batch, key, batch))
+        while in_flight:
+            collect(in_flight.popleft())
+    return votes, failed
+
+# ========== REBUILD ==========
+
+def rebuild(chain, votes, existing_records, candidates, registry):
+    """
+    Derived outputs from the sources
+    Returns: (records, candidates, registry DataFrames, source issues dict)
+    """
+    import pandas as pd
+
+    issues = {'duplicate_chain_votes': [], 'chain_without_vote': [], 'vote_without_block': [],
+              'block_hash_mismatch': [], 'voter_hash_mismatch': [],
+              'unknown_candidates': {}, 'unregistered_voters': []}
+    carried = {}
+    if existing_records is not None:
+        for row in existing_records.to_dict('records'):
+            carried.setdefault(str(row.get('BlockHash')), row)
+
+    records = []
+    tally = Counter()
+    voted_ids = set()
+    seen = set()
+    for block in chain:
+        data = block['data']
+        if not isinstance(data, dict) or 'voter_id_hash' not in data:
+            continue
+        voter_id_hash = data['voter_id_hash']
+        if voter_id_hash in seen:
+            issues['duplicate_chain_votes'].append(block['index'])
+            continue
+        seen.add(voter_id_hash)
+
+        vote = votes.get(voter_id_hash)
+        if vote is None:
+            issues['chain_without_vote'].append(block['index'])
+            continue
+        if vote.get('block_hash') != block['hash']:
+            issues['block_hash_mismatch'].append(block['index'])
+        if hashlib.sha256(str(vote['voter_id']).encode()).hexdigest() != voter_id_hash:
+            issues['voter_hash_mismatch'].append(block['index'])
+
+        previous = carried.get(block['hash'], {})
+        geolocation = data.get('geolocation') or {}
+        records.append({
+            'VoterID': vote['voter_id'],
+            'VoterName': vote['voter_name'],
+            'CandidateVoted': vote['vote_choice'],
+            'Timestamp': previous.get('Timestamp') or
+                datetime.fromisoformat(vote['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
+            'IPAddress': previous.get('IPAddress', 'N/A'),
+            'GeolocationCity': geolocation.get('city', 'Unknown'),
+            'GeolocationCountry': geolocation.get('country', 'Unknown'),
+            'VotedStatus': True,
+            'KYCImageHash': data.get('kyc_image_hash', 'N/A'),
+            'BlockHash': block['hash'],
+            'VoteHash': data.get('vote_hash', 'N/A')
+        })
+        tally[vote['vote_choice']] += 1
+        voted_ids.add(str(vote['voter_id']))
+
+    issues['vote_without_block'] = sorted(votes.keys() - seen)
+
+    rebuilt_candidates = candidates.copy()
+    rebuilt_candidates['VoteCount'] = [tally.get(name, 0) for name in candidates['CandidateName']]
+    issues['unknown_candidates'] = {name: count for name, count in tally.items()
+                                    if name not in set(candidates['CandidateName'])}
+
+    rebuilt_registry = registry.copy()
+    registry_ids = registry['VoterID'].astype(str)
+    rebuilt_registry['HasVoted'] = registry_ids.isin(voted_ids)
+    issues['unregistered_voters'] = sorted(voted_ids - set(registry_ids))
+
+    return (pd.DataFrame(records, columns=VOTE_RECORD_COLUMNS), rebuilt_candidates,
+            rebuilt_registry, issues)
+
+# ========== DIFF ==========
+
+def _same(a, b):
+    if isinstance(a, float) and a != a and (b is None or (isinstance(b, float) and b != b)):
+        return True  # Both empty (NaN)
+    return str(a) == str(b)
+
+def diff_records(existing, rebuilt):
+    """Vote records keyed by BlockHash: missing, extra (incl. duplicates), changed"""
+    rebuilt_rows = {row['BlockHash']: row for row in rebuilt.to_dict('records')}
+    missing = set(rebuilt_rows)
+    extra, changed = [], []
+    for position, row in enumerate(existing.to_dict('records') if existing is not None else []):
+        key = str(row.get('BlockHash'))
+        expected = rebuilt_rows.get(key)
+        if expected is None or key not in missing:
+            # Not on the chain, or a second row for the same block
+            extra.append({'row': position + 2, 'VoterID': row.get('VoterID'), 'BlockHash': key})
+            continue
+        missing.discard(key)
+        columns = [column for column in DIFFED_COLUMNS
+                   if not _same(row.get(column), expected[column])]
+        if columns:
+            changed.append({'row': position + 2, 'BlockHash': key,
+                            'columns': {column: [str(row.get(column)), str(expected[column])]
+                                        for column in columns}})
+    return {
+        'missing': [{'VoterID': rebuilt_rows[key]['VoterID'], 'BlockHash': key}
+                    for key in rebuilt['BlockHash'] if key in missing],
+        'extra': extra,
+        'changed': changed
+    }
+
+def diff_candidates(existing, rebuilt):
+    recorded = dict(zip(existing['CandidateName'], existing.get('VoteCount', [0] * len(existing))))
+    return [{'candidate': name, 'recorded': int(recorded.get(name, 0)), 'rebuilt': int(count)}
+            for name, count in zip(rebuilt['CandidateName'], rebuilt['VoteCount'])
+            if int(recorded.get(name, 0)) != int(count)]
+
+def diff_registry(existing, rebuilt):
+    recorded = (existing['HasVoted'] if 'HasVoted' in existing.columns
+                else [False] * len(existing))
+    return [{'VoterID': str(voter_id), 'recorded': bool(before), 'rebuilt': bool(after)}
+            for voter_id, before, after in zip(existing['VoterID'], recorded, rebuilt['HasVoted'])
+            if bool(before) != bool(after)]
+
+# ========== APPLY ==========
+
+def source_problems(report):
+    """Names of the source inconsistencies that make a rebuild unsafe to apply"""
+    problems = [name for name, values in report['issues'].items() if values]
+    if report['store']['undecryptable']:
+        problems.append('undecryptable_votes')
+    if not report['chain']['valid']:
+        problems.append('invalid_chain')
+    return problems
+
+def replace_workbook(frame, path):
+    """Back up the current file, then write atomically (temp + rename)"""
+    if os.path.exists(path):
+        shutil.copy2(path, path + '.bak')
+    temp_path = path + '.tmp.xlsx'
+    frame.to_excel(temp_path, index=False, engine='openpyxl')
+    os.replace(temp_path, path)
+    print(f"✓ Rewrote {path}")
+
+def print_report(report, show):
+    print(f"\nChain: {report['chain']['blocks']} blocks, "
+          f"{'valid' if report['chain']['valid'] else 'INVALID at block %s' % report['chain']['error_at_block']}")
+    print(f"Vote store: {report['store']['votes']} votes, {len(report['store']['undecryptable'])} undecryptable")
+    for name, values in report['issues'].items():
+        if values:
+            print(f"  SOURCE ISSUE {name}: {len(values)} {list(values)[:show]}")
+
+    records = report['vote_records']
+    print(f"\nvote_records.xlsx: {len(records['missing'])} missing, {len(records['extra'])} extra, "
+          f"{len(records['changed'])} changed")
+    for kind in ('missing', 'extra', 'changed'):
+        for entry in records[kind][:show]:
+            print(f"  {kind:<8} {entry}")
+    print(f"candidates.xlsx VoteCount: {len(report['candidates'])} mismatched")
+    for entry in report['candidates'][:show]:
+        print(f"  {entry['candidate']}: recorded {entry['recorded']}, rebuilt {entry['rebuilt']}")
+    print(f"voter_registry.xlsx HasVoted: {len(report['registry'])} mismatched")
+    for entry in report['registry'][:show]:
+        print(f"  {entry['VoterID']}: recorded {entry['recorded']}, rebuilt {entry['rebuilt']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit / rebuild derived election records')
+    parser.add_argument('--chain', default='vote_chain.json')
+    parser.add_argument('--store', default='vote_store.dat')
+    parser.add_argument('--registry', default='voter_registry.xlsx')
+    parser.add_argument('--records', default='vote_records.xlsx')
+    parser.add_argument('--candidates', default='candidates.xlsx')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--show', type=int, default=10, help='examples printed per mismatch kind')
+    parser.add_argument('--json', help='write the full report to this file')
+    parser.add_argument('--apply', action='store_true', help='replace the derived files with the rebuild')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    started = time.time()
+    if not os.path.exists(args.chain):
+        print(f"ERROR: {args.chain} not found")
+        sys.exit(2)
+    chain = TamperEvidenceChain(args.chain)
+    valid, error_index = chain.verify_chain_integrity()
+    # A report may run next to the live server, so it never modifies the
+    # store; --apply runs with the server stopped (see above)
+    store = EncryptedVoteStore(args.store, read_only=not args.apply)
+    # Votes are encrypted with the session key (see VoteProcessor.finalize_votes)
+    key = SecurityConfig.load_keys()['session_key']
+
+    votes, undecryptable = decrypt_votes(store, key, args.workers, args.batch_size)
+    print(f"Decrypted {len(votes):,} votes with {args.workers} workers in {time.time() - started:.1f}s")
+
+    existing_records = (pd.read_excel(args.records, engine='openpyxl')
+                        if os.path.exists(args.records) else None)
+    candidates = pd.read_excel(args.candidates, engine='openpyxl')
+    registry = read_voter_registry(args.registry)
+
+    records, rebuilt_candidates, rebuilt_registry, issues = rebuild(
+        chain.chain, votes, existing_records, candidates, registry)
+
+    report = {
+        'created': datetime.utcnow().isoformat(),
+        'chain': {'blocks': len(chain.chain), 'valid': valid, 'error_at_block': error_index},
+        'store': {'votes': len(store), 'undecryptable': undecryptable},
+        'issues': issues,
+        'vote_records': diff_records(existing_records, records),
+        'candidates': diff_candidates(candidates, rebuilt_candidates),
+        'registry': diff_registry(registry, rebuilt_registry)
+    }
+    print_report(report, args.show)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nReport written to {args.json}")
+
+    drifted = (report['vote_records']['missing'] or report['vote_records']['extra'] or
+               report['vote_records']['changed'] or report['candidates'] or report['registry'])
+    problems = source_problems(report)
+
+    if args.apply:
+        if problems:
+            print(f"\nERROR: refusing to apply, the sources are inconsistent ({', '.join(problems)}); "
+                  f"no files were changed")
+            sys.exit(2)
+        replace_workbook(records, args.records)
+        replace_workbook(rebuilt_candidates, args.candidates)
+        replace_workbook(rebuilt_registry, args.registry)
+        snapshot = registry_snapshot_path(args.registry)
+        if os.path.exists(snapshot):
+            rebuilt_registry.to_pickle(snapshot)
+        drifted = False
+
+    print(f"\n{'DRIFT' if drifted else 'OK'}: finished in {time.time() - started:.1f}s")
+    sys.exit(1 if drifted or problems else 0)
+
+if __name__ == '__main__':
+    main()
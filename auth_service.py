@@ -1,18 +1,21 @@
 # auth_service.py
-import pandas as pd
 import hashlib
 import secrets
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import json
+from metrics import timed
+from excel_manager import read_voter_registry
 
 class VoterAuthService:
-    def __init__(self, excel_path, secret_key):
-        self.voter_db = pd.read_excel(excel_path)
+    def __init__(self, excel_path, secret_key, load_registry=True):
+        # With load_registry=False the caller assigns voter_db (app.py warm-up)
+        self.voter_db = read_voter_registry(excel_path) if load_registry else None
         self.cipher = Fernet(secret_key)
         self.active_sessions = {}
         self.pending_otp_verifications = {}  # Store voter info pending OTP verification
         
+    @timed('validate_voter')
     def validate_voter(self, voter_id, dob, email):
         """
         Validate voter credentials (Step 1 - Before OTP)
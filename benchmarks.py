@@ -0,0 +1,282 @@
+# benchmarks.py
+"""
+Component micro-benchmarks with JSON baselines.
+
+Times the hot paths in isolation, in a scratch directory:
+- TamperEvidenceChain.add_vote_record / verify_chain_integrity / get_vote_proof(s)
+- VoterAuthService.validate_voter across registry sizes, verify_session
+- KYCService.process_kyc_image across image sizes
+- each ExcelManager write (vote records, registry HasVoted, candidate counts)
+
+Usage:
+    python benchmarks.py --save benchmark_baseline.json     # record a baseline
+    python benchmarks.py --compare benchmark_baseline.json  # exit 1 on regression
+    python benchmarks.py --profile full --only chain        # adds 1M-block chains
+
+A case regresses when its median per-operation time exceeds the baseline
+median by more than --tolerance (default 25%). Baselines are machine
+specific: compare only against one recorded on the same hardware.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+import pandas as pd
+from PIL import Image
+from cryptography.fernet import Fernet
+
+from auth_service import VoterAuthService
+from blockchain_lite import TamperEvidenceChain
+from excel_manager import ExcelManager
+from kyc_service import KYCService
+from stress_test_votes import create_fixture, CANDIDATES
+
+PROFILES = {
+    'quick': {
+        'chain_blocks': [1000, 10000],
+        'registry_voters': [1000, 10000],
+        'image_sizes': [(640, 480), (1920, 1080)],
+        'excel_voters': [1000],
+    },
+    'standard': {
+        'chain_blocks': [1000, 10000, 100000],
+        'registry_voters': [1000, 10000, 100000],
+        'image_sizes': [(640, 480), (1920, 1080), (4000, 3000)],
+        'excel_voters': [1000, 10000],
+    },
+    'full': {
+        'chain_blocks': [1000, 10000, 100000, 1000000],
+        'registry_voters': [1000, 10000, 100000, 1000000],
+        'image_sizes': [(640, 480), (1920, 1080), (4000, 3000)],
+        'excel_voters': [1000, 10000, 50000],
+    },
+}
+
+BENCHMARKS = []
+
+def benchmark(group):
+    """Register a benchmark: a generator yielding (case name, op, repeats)"""
+    def register(func):
+        BENCHMARKS.append((group, func))
+        return func
+    return register
+
+def measure(op, repeats):
+    """Median and minimum seconds per call (after one warm-up call)"""
+    op()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        op()
+        samples.append(time.perf_counter() - started)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'repeats': repeats}
+
+def vote_record(i):
+    return {
+        'voter_id_hash': hashlib.sha256(f'V{i}'.encode()).hexdigest(),
+        'vote_hash': hashlib.sha256(f'vote{i}'.encode()).hexdigest(),
+        'kyc_image_hash': hashlib.sha256(f'kyc{i}'.encode()).hexdigest(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'geolocation': {'city': 'Unknown', 'country': 'Unknown'}
+    }
+
+def synthetic_registry(voters):
+    return pd.DataFrame({
+        'VoterID': [f'S{i:07d}' for i in range(voters)],
+        'Name': [f'Voter {i}' for i in range(voters)],
+        'DOB': ['1990-01-01'] * voters,
+        'Email': [f'voter{i}@example.com' for i in range(voters)],
+        'HasVoted': [False] * voters
+    })
+
+# ========== BENCHMARKS ==========
+
+@benchmark('chain')
+def chain_benchmarks(workdir, profile):
+    for blocks in profile['chain_blocks']:
+        path = os.path.join(workdir, f'chain_{blocks}.json')
+        chain = TamperEvidenceChain(path)
+        chain.append_vote_records([vote_record(i) for i in range(blocks - 1)])
+        last_voter = chain.chain[-1]['data']['voter_id_hash']
+        counter = iter(range(blocks, sys.maxsize))
+
+        # Each append rewrites the whole chain file
+        yield (f'chain.add_vote_record[{blocks}]',
+               lambda: chain.add_vote_record(vote_record(next(counter))),
+               5 if blocks < 100000 else 2)
+        yield (f'chain.verify_chain_integrity[{blocks}]', chain.verify_chain_integrity,
+               5 if blocks < 100000 else 2)
+        # Worst case: the voter is in the last block before the appends above
+        yield (f'chain.get_vote_proof[{blocks}]', lambda: chain.get_vote_proof(last_voter),
+               10 if blocks < 100000 else 3)
+        # /api/verify/batch: one indexed pass for many receipts
+        receipts = [chain.chain[i]['data']['voter_id_hash']
+                    for i in range(1, len(chain.chain), max(1, len(chain.chain) // 1000))]
+        yield (f'chain.get_vote_proofs[{blocks}, {len(receipts)} hashes]',
+               lambda: chain.get_vote_proofs(receipts), 10)
+        del chain
+        os.remove(path)
+
+@benchmark('auth')
+def auth_benchmarks(workdir, profile):
+    create_fixture(workdir, 10)
+    key = Fernet.generate_key()
+    service = VoterAuthService(os.path.join(workdir, 'voter_registry.xlsx'), key)
+
+    for voters in profile['registry_voters']:
+        service.voter_db = synthetic_registry(voters)
+        target = service.voter_db.iloc[voters // 2]
+        yield (f'auth.validate_voter[{voters}]',
+               lambda: service.validate_voter(target['VoterID'], target['DOB'], target['Email']),
+               20)
+        service.pending_otp_verifications.clear()
+
+    service.voter_db = synthetic_registry(1000)
+    voter = service.voter_db.iloc[0]
+    tokens = []
+    for _ in range(1000):
+        _, temp_token, _ = service.validate_voter(voter['VoterID'], voter['DOB'], voter['Email'])
+        tokens.append(service.complete_login_after_otp(temp_token)[1])
+    yield ('auth.verify_session[1000 sessions]', lambda: service.verify_session(tokens[500]), 200)
+
+@benchmark('kyc')
+def kyc_benchmarks(workdir, profile):
+    service = KYCService(os.path.join(workdir, 'kyc_storage'), Fernet.generate_key())
+    for width, height in profile['image_sizes']:
+        repeats = 5
+        # Distinct noise images (one per call) so nothing is deduplicated
+        images = []
+        for _ in range(repeats + 1):
+            buffer = io.BytesIO()
+            Image.frombytes('RGB', (width, height), os.urandom(width * height * 3)).save(
+                buffer, 'JPEG', quality=90)
+            images.append(buffer.getvalue())
+        pending = iter(images)
+        size_kb = len(images[0]) // 1024
+        yield (f'kyc.process_kyc_image[{width}x{height}, ~{size_kb}KB]',
+               lambda: service.process_kyc_image(next(pending), 'V0001', datetime.utcnow().isoformat()),
+               repeats)
+
+@benchmark('excel')
+def excel_benchmarks(workdir, profile):
+    for voters in profile['excel_voters']:
+        directory = os.path.join(workdir, f'excel_{voters}')
+        os.makedirs(directory)
+        create_fixture(directory, 1)
+        synthetic_registry(voters).to_excel(os.path.join(directory, 'voter_registry.xlsx'),
+                                            index=False, engine='openpyxl')
+        manager = ExcelManager(os.path.join(directory, 'voter_registry.xlsx'),
+                               os.path.join(directory, 'vote_records.xlsx'),
+                               os.path.join(directory, 'candidates.xlsx'))
+        manager.load_voter_registry()
+        manager.load_candidates()
+        manager.load_vote_records()
+        # Vote records grow to the registry size, as on election day
+        manager.add_vote_records([{
+            'voter_id': f'S{i:07d}', 'voter_name': f'Voter {i}', 'candidate_voted': CANDIDATES[0],
+            'ip_address': '127.0.0.1', 'geolocation_city': 'Unknown',
+            'geolocation_country': 'Unknown', 'kyc_image_hash': 'N/A',
+            'block_hash': 'N/A', 'vote_hash': 'N/A'
+        } for i in range(voters - 1)])
+        counter = iter(range(sys.maxsize))
+
+        yield (f'excel.add_vote_records[{voters} rows]',
+               lambda: manager.add_vote_records([{
+                   'voter_id': f'X{next(counter)}', 'voter_name': 'Bench', 'candidate_voted': CANDIDATES[0],
+                   'ip_address': '127.0.0.1', 'geolocation_city': 'Unknown',
+                   'geolocation_country': 'Unknown', 'kyc_image_hash': 'N/A',
+                   'block_hash': 'N/A', 'vote_hash': 'N/A'
+               }]), 3)
+        yield (f'excel.mark_voters_as_voted[{voters} voters]',
+               lambda: manager.mark_voters_as_voted([f'S{voters // 2:07d}']), 3)
+        yield (f'excel.update_candidate_vote_counts[{voters} voters]',
+               lambda: manager.update_candidate_vote_counts([CANDIDATES[1]]), 5)
+
+# ========== RUNNER ==========
+
+def run(profile_name, only):
+    profile = PROFILES[profile_name]
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='vote-bench-')
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        for group, func in BENCHMARKS:
+            if only and not any(group.startswith(o) or o in group for o in only):
+                continue
+            group_dir = os.path.join(workdir, group)
+            os.makedirs(group_dir)
+            for name, op, repeats in func(group_dir, profile):
+                results[name] = measure(op, repeats)
+                print(f"{name:<55} {results[name]['median_s'] * 1000:>10.3f} ms "
+                      f"(min {results[name]['min_s'] * 1000:.3f} ms)")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'created': datetime.utcnow().isoformat(),
+        'profile': profile_name,
+        'python': platform.python_version(),
+        'machine': f'{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs',
+        'results': results
+    }
+
+def compare(report, baseline, tolerance):
+    """Print current vs baseline medians; returns the names that regressed"""
+    regressions = []
+    print(f"\nAgainst baseline from {baseline['created']} ({baseline['machine']}), "
+          f"tolerance {tolerance:.0%}:")
+    for name, current in report['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"  NEW         {name}")
+            continue
+        ratio = current['median_s'] / previous['median_s'] if previous['median_s'] else 1.0
+        if ratio > 1 + tolerance:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / (1 + tolerance):
+            status = 'faster'
+        else:
+            status = 'ok'
+        print(f"  {status:<11} {name:<55} {ratio:>6.2f}x "
+              f"({previous['median_s'] * 1000:.3f} -> {current['median_s'] * 1000:.3f} ms)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Component micro-benchmarks')
+    parser.add_argument('--profile', choices=list(PROFILES), default='standard')
+    parser.add_argument('--only', nargs='*', help='benchmark groups to run (chain, auth, kyc, excel)')
+    parser.add_argument('--save', help='write results as a JSON baseline')
+    parser.add_argument('--compare', help='compare against a JSON baseline, exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown of the median before failing (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    report = run(args.profile, args.only)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nFAIL: {len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nOK: no regressions")
+
+if __name__ == '__main__':
+    main()
@@ -3,19 +3,36 @@ import hashlib
 import json
 from datetime import datetime
 import os
+import threading
+from metrics import timed
 
 class TamperEvidenceChain:
     """
     Append-only, cryptographically linked log (blockchain-like)
     Each block contains: vote_hash, previous_hash, timestamp, nonce
     """
-    def __init__(self, chain_file='vote_chain.json'):
+    def __init__(self, chain_file='vote_chain.json', load=True):
         self.chain_file = chain_file
+        self._link_lock = threading.Lock()  # Held only while linking new blocks
+        self._save_lock = threading.Lock()
+        self._file_signature = None  # (mtime_ns, size) of the chain file last loaded/saved
+        # voter_id_hash / vote_hash -> block position, extended lazily
+        self._index = {}
+        self._indexed_chain = None  # Chain list the index was built from
+        self._indexed = 0           # Blocks of it already indexed
+        self._index_lock = threading.Lock()
+        self.chain = []
+        if load:
+            self.load()
+    
+    def load(self):
+        """Load the chain file, or start a new chain (deferred with load=False)"""
         self.chain = self.load_chain()
         
         if not self.chain:
             self.chain = [self.create_genesis_block()]
             self.save_chain()
+        return True, len(self.chain)
     
     def create_genesis_block(self):
         return {
@@ -37,10 +54,14 @@ class TamperEvidenceChain:
         Add tamper-evident vote record
         vote_data contains ONLY hashed/anonymized info, NO PII
         """
-        previous_block = self.chain[-1]
-        index = len(self.chain)
-        timestamp = datetime.utcnow().isoformat()
-        
+        return self.append_vote_records([vote_data])[0]
+    
+    @timed('chain_append')
+    def append_vote_records(self, vote_data_list):
+        """
+        Append several vote records and persist them with a single save
+        Returns: list of block hashes (same order as vote_data_list)
+        """
         # vote_data structure (all hashed/encrypted references):
         # {
         #   'voter_id_hash': sha256(voter_id),
@@ -49,21 +70,33 @@ class TamperEvidenceChain:
         #   'timestamp': ISO timestamp,
         #   'ip_geolocation': city/country only (not exact IP)
         # }
+        # Serialize outside the critical section
+        payloads = [json.dumps(vote_data, sort_keys=True) for vote_data in vote_data_list]
         
-        new_block = {
-            'index': index,
-            'timestamp': timestamp,
-            'data': vote_data,
-            'previous_hash': previous_block['hash'],
-            'hash': self.calculate_hash(index, timestamp, 
-                                       json.dumps(vote_data, sort_keys=True), 
-                                       previous_block['hash'])
-        }
+        block_hashes = []
+        # Short critical section: read the tail and link, so concurrent
+        # appends can never fork the chain with duplicate indexes
+        with self._link_lock:
+            for vote_data, payload in zip(vote_data_list, payloads):
+                previous_block = self.chain[-1]
+                index = len(self.chain)
+                timestamp = datetime.utcnow().isoformat()
+                
+                new_block = {
+                    'index': index,
+                    'timestamp': timestamp,
+                    'data': vote_data,
+                    'previous_hash': previous_block['hash'],
+                    'hash': self.calculate_hash(index, timestamp, payload,
+                                               previous_block['hash'])
+                }
+                
+                self.chain.append(new_block)
+                block_hashes.append(new_block['hash'])
         
-        self.chain.append(new_block)
         self.save_chain()
         
-        return new_block['hash']
+        return block_hashes
     
     def verify_chain_integrity(self):
         """
@@ -91,29 +124,96 @@ class TamperEvidenceChain:
         
         return True, None
     
+    @timed('chain_save')
     def save_chain(self):
         """Append-only save (never modify existing blocks)"""
-        with open(self.chain_file, 'w') as f:
-            json.dump(self.chain, f, indent=2)
+        # Write to a temp file, fsync and rename so a crash never leaves a
+        # truncated chain and callers can treat the append as durable
+        # The snapshot is taken under the save lock, so a later save always
+        # writes at least as many blocks as an earlier one
+        with self._save_lock:
+            snapshot = list(self.chain)
+            temp_file = self.chain_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.chain_file)
+            self._file_signature = self._stat_signature()
     
     def load_chain(self):
         if os.path.exists(self.chain_file):
+            signature = self._stat_signature()
             with open(self.chain_file, 'r') as f:
-                return json.load(f)
+                chain = json.load(f)
+            self._file_signature = signature
+            return chain
         return None
     
+    def _stat_signature(self):
+        stat = os.stat(self.chain_file)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def refresh(self):
+        """
+        Reload the chain if another process saved a newer one
+        (read-only replicas, e.g. launcher.py workers)
+        Returns: True if the chain was reloaded
+        """
+        if not os.path.exists(self.chain_file) or self._stat_signature() == self._file_signature:
+            return False
+        chain = self.load_chain()
+        with self._link_lock:
+            if len(chain) >= len(self.chain):
+                self.chain = chain
+        return True
+    
+    def _lookup_index(self):
+        """
+        Hash -> block position index, covering every block appended so far.
+        Appends only extend it; a reloaded chain (new list) rebuilds it.
+        """
+        with self._index_lock:
+            chain = self.chain
+            if chain is not self._indexed_chain:
+                self._index, self._indexed_chain, self._indexed = {}, chain, 0
+            for position in range(self._indexed, len(chain)):
+                data = chain[position]['data']
+                if isinstance(data, dict):
+                    self._index.setdefault(data.get('voter_id_hash'), position)
+                    self._index.setdefault(data.get('vote_hash'), position)
+            self._indexed = len(chain)
+            return self._index, chain
+    
     def get_vote_proof(self, voter_id_hash):
         """
         Provide cryptographic proof of vote (for voter verification)
         Returns block containing their vote hash
         """
-        for block in self.chain:
-            if isinstance(block['data'], dict):
-                if block['data'].get('voter_id_hash') == voter_id_hash:
-                    return {
-                        'block_index': block['index'],
-                        'block_hash': block['hash'],
-                        'timestamp': block['timestamp'],
-                        'vote_hash': block['data']['vote_hash']
-                    }
-        return None
\ No newline at end of file
+        index, chain = self._lookup_index()
+        position = index.get(voter_id_hash)
+        if position is None or chain[position]['data'].get('voter_id_hash') != voter_id_hash:
+            return None
+        block = chain[position]
+        return {
+            'block_index': block['index'],
+            'block_hash': block['hash'],
+            'timestamp': block['timestamp'],
+            'vote_hash': block['data']['vote_hash']
+        }
+    
+    def get_vote_proofs(self, hashes):
+        """
+        Batch lookup of voter_id_hashes and/or vote_hashes
+        Returns: {hash: (block_index, block_hash, timestamp, vote_hash)} for
+        the hashes found on the chain
+        """
+        index, chain = self._lookup_index()
+        proofs = {}
+        for value in hashes:
+            position = index.get(value)
+            if position is not None:
+                block = chain[position]
+                proofs[value] = (block['index'], block['hash'], block['timestamp'],
+                                 block['data']['vote_hash'])
+        return proofs
\ No newline at end of file
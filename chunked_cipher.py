@@ -0,0 +1,114 @@
+# chunked_cipher.py
+import os
+import struct
+import base64
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
+
+class ChunkedCipher:
+    """
+    Streaming authenticated encryption (AES-256-GCM, one tag per chunk).
+
+    File layout:
+        header  = MAGIC | version (1 byte) | nonce prefix (8 bytes)
+        records = ciphertext length (4 bytes, big-endian) | ciphertext
+
+    Each chunk's nonce is the prefix plus a 4-byte counter, and the
+    associated data binds the header, the counter and a final-chunk flag,
+    so reordered, dropped or truncated chunks fail authentication.
+    """
+    MAGIC = b'KYCS'
+    VERSION = 1
+    CHUNK_SIZE = 64 * 1024
+    HEADER_SIZE = len(MAGIC) + 1 + 8
+
+    def __init__(self, fernet_key, context=b'kyc-chunked-stream'):
+        # Derive a dedicated AES key from the existing Fernet key
+        master = base64.urlsafe_b64decode(fernet_key)
+        key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=context
+        ).derive(master)
+        self.aead = AESGCM(key)
+
+    def _aad(self, header, counter, final):
+        return header + struct.pack('>IB', counter, 1 if final else 0)
+
+    def encrypt_stream(self, chunks, dst):
+        """
+        Encrypt an iterable of plaintext chunks into the file object dst
+        Returns: number of ciphertext bytes written
+        """
+        prefix = os.urandom(8)
+        header = self.MAGIC + bytes([self.VERSION]) + prefix
+        dst.write(header)
+        written = len(header)
+
+        counter = 0
+        pending = None
+        # Hold back one chunk so the last one can be flagged as final
+        for chunk in chunks:
+            if pending is not None:
+                written += self._write_record(dst, header, prefix, counter, pending, False)
+                counter += 1
+            pending = chunk
+
+        written += self._write_record(dst, header, prefix, counter, pending or b'', True)
+        return written
+
+    def _write_record(self, dst, header, prefix, counter, plaintext, final):
+        nonce = prefix + struct.pack('>I', counter)
+        ciphertext = self.aead.encrypt(nonce, plaintext, self._aad(header, counter, final))
+        dst.write(struct.pack('>I', len(ciphertext)))
+        dst.write(ciphertext)
+        return 4 + len(ciphertext)
+
+    def decrypt_stream(self, src):
+        """
+        Decrypt a chunked file object, yielding plaintext chunks
+        Raises ValueError if the stream is malformed, tampered or truncated
+        """
+        header = src.read(self.HEADER_SIZE)
+        if len(header) != self.HEADER_SIZE or not self.is_chunked(header):
+            raise ValueError("Not a chunked encrypted stream")
+        prefix = header[-8:]
+
+        counter = 0
+        record = self._read_record(src)
+        if record is None:
+            raise ValueError("Encrypted stream truncated")
+
+        while record is not None:
+            # Look ahead one record: the chunk is final when nothing follows
+            following = self._read_record(src)
+            final = following is None
+
+            nonce = prefix + struct.pack('>I', counter)
+            try:
+                yield self.aead.decrypt(nonce, record, self._aad(header, counter, final))
+            except InvalidTag:
+                raise ValueError(f"Chunk {counter} failed authentication")
+
+            record = following
+            counter += 1
+
+    def _read_record(self, src):
+        length_bytes = src.read(4)
+        if not length_bytes:
+            return None
+        if len(length_bytes) != 4:
+            raise ValueError("Encrypted stream truncated")
+        (length,) = struct.unpack('>I', length_bytes)
+        ciphertext = src.read(length)
+        if len(ciphertext) != length:
+            raise ValueError("Encrypted stream truncated")
+        return ciphertext
+
+    @classmethod
+    def is_chunked(cls, data):
+        """True if data starts with the chunked stream header"""
+        return data[:len(cls.MAGIC)] == cls.MAGIC
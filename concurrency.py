@@ -0,0 +1,17 @@
+# concurrency.py
+import hashlib
+import threading
+
+class LockStripes:
+    """
+    Fixed pool of locks selected by key hash.
+    Operations on the same key serialize, while operations on different
+    keys almost never contend, without keeping one lock per key alive.
+    """
+    def __init__(self, count=256):
+        self.locks = [threading.Lock() for _ in range(count)]
+
+    def lock_for(self, key):
+        """Lock guarding key (use as a context manager)"""
+        digest = hashlib.blake2b(str(key).encode(), digest_size=4).digest()
+        return self.locks[int.from_bytes(digest, 'big') % len(self.locks)]
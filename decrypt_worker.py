@@ -0,0 +1,32 @@
+# decrypt_worker.py
+"""
+Vote decryption tasks for the process pools of export_pipeline.py and
+audit_rebuild.py. The pools use the spawn start method, so a worker
+imports only this module (plus the __main__ script): keep its imports
+to the standard library and cryptography.
+"""
+import json
+from cryptography.fernet import Fernet, InvalidToken
+
+def decrypt_vote_batch(key, batch):
+    """
+    Decrypt a batch of (voter_id_hash, token) pairs
+    Returns: list of (voter_id_hash, vote_data)
+    """
+    cipher = Fernet(key)
+    return [(voter_id_hash, json.loads(cipher.decrypt(token).decode()))
+            for voter_id_hash, token in batch]
+
+def try_decrypt_vote_batch(key, batch):
+    """
+    Like decrypt_vote_batch, but collects undecryptable entries instead of failing
+    Returns: (list of (voter_id_hash, vote_data), list of undecryptable hashes)
+    """
+    cipher = Fernet(key)
+    decrypted, failed = [], []
+    for voter_id_hash, token in batch:
+        try:
+            decrypted.append((voter_id_hash, json.loads(cipher.decrypt(token).decode())))
+        except (InvalidToken, ValueError):
+            failed.append(voter_id_hash)
+    return decrypted, failed
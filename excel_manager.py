@@ -1,7 +1,27 @@
 # excel_manager.py
-import pandas as pd
 from datetime import datetime
 import os
+import threading
+from metrics import timed
+
+def registry_snapshot_path(excel_path):
+    """voter_registry.xlsx -> voter_registry.pkl (written by generate_registry.py import)"""
+    return os.path.splitext(excel_path)[0] + '.pkl'
+
+def read_voter_registry(excel_path):
+    """
+    Load the voter registry, preferring the pickled snapshot when it is at
+    least as new as the workbook (parsing a million-row workbook takes
+    minutes, unpickling it about a second)
+    """
+    import pandas as pd  # Deferred: keeps app import (and /api/health) fast
+    snapshot = registry_snapshot_path(excel_path)
+    try:
+        if os.path.getmtime(snapshot) >= os.path.getmtime(excel_path):
+            return pd.read_pickle(snapshot)
+    except OSError:
+        pass
+    return pd.read_excel(excel_path, engine='openpyxl')
 
 class ExcelManager:
     def __init__(self, voter_registry_excel, vote_records_excel, candidates_excel):
@@ -11,6 +31,9 @@ class ExcelManager:
         self.voter_db = None
         self.vote_records_db = None
         self.candidates_db = None
+        self.candidates_mtime = None
+        # Guards DataFrame mutation + rewrite (pandas objects are not thread-safe)
+        self._lock = threading.RLock()
     
     def load_voter_registry(self):
         """
@@ -18,8 +41,7 @@ class ExcelManager:
         Expected columns: VoterID, Name, DOB, Email, Phone, Address
         """
         try:
-            # Use openpyxl engine with read_only=False for better file handling
-            self.voter_db = pd.read_excel(self.voter_registry_excel, engine='openpyxl')
+            self.voter_db = read_voter_registry(self.voter_registry_excel)
             required_cols = ['VoterID', 'Name', 'DOB', 'Email']
             
             if not all(col in self.voter_db.columns for col in required_cols):
@@ -38,8 +60,11 @@ class ExcelManager:
     
     def load_candidates(self):
         """Load candidates from Excel"""
+        import pandas as pd
         try:
+            mtime = os.path.getmtime(self.candidates_excel)
             self.candidates_db = pd.read_excel(self.candidates_excel, engine='openpyxl')
+            self.candidates_mtime = mtime
             required_cols = ['CandidateID', 'CandidateName', 'PoliticalParty']
             
             if not all(col in self.candidates_db.columns for col in required_cols):
@@ -50,15 +75,46 @@ class ExcelManager:
             print(f"Error loading candidates: {e}")
             return False, str(e)
     
+    def refresh_candidates(self):
+        """
+        Reload candidates if another process rewrote the workbook
+        (read-only replicas, e.g. launcher.py workers). A read that races
+        a rewrite keeps the previous data.
+        """
+        try:
+            if os.path.getmtime(self.candidates_excel) == self.candidates_mtime:
+                return False
+        except OSError:
+            return False
+        
+        with self._lock:
+            previous = self.candidates_db
+            success, _ = self.load_candidates()
+            if not success:
+                self.candidates_db = previous
+            return success
+    
     def get_candidates(self):
         """Return list of candidates"""
-        if self.candidates_db is None:
-            self.load_candidates()
-        
-        return self.candidates_db.to_dict('records')
+        with self._lock:
+            if self.candidates_db is None:
+                self.load_candidates()
+            
+            return self.candidates_db.to_dict('records')
+    
+    def get_vote_tallies(self):
+        """Candidate name -> persisted vote count"""
+        with self._lock:
+            if self.candidates_db is None:
+                self.load_candidates()
+            if 'VoteCount' not in self.candidates_db.columns:
+                return {name: 0 for name in self.candidates_db['CandidateName']}
+            return {name: int(count) for name, count in
+                    zip(self.candidates_db['CandidateName'], self.candidates_db['VoteCount'])}
     
     def load_vote_records(self):
         """Load existing vote records"""
+        import pandas as pd
         try:
             if os.path.exists(self.vote_records_excel):
                 self.vote_records_db = pd.read_excel(self.vote_records_excel, engine='openpyxl')
@@ -80,6 +136,7 @@ class ExcelManager:
         vote_records format: list of dicts with:
         - Name, VoterID, Vote, Timestamp, Geolocation, KYCImageHash
         """
+        import pandas as pd
         df = pd.DataFrame(vote_records)
         
         # Reorder columns for clarity
@@ -128,106 +185,149 @@ class ExcelManager:
         """
         Add a new vote record to the vote_records.xlsx file
         """
-        try:
-            # Load existing records
-            if self.vote_records_db is None:
-                self.load_vote_records()
-            
-            # Create new record
-            new_record = {
-                'VoterID': voter_id,
-                'VoterName': voter_name,
-                'CandidateVoted': candidate_voted,
-                'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'IPAddress': ip_address,
-                'GeolocationCity': geolocation_city,
-                'GeolocationCountry': geolocation_country,
-                'VotedStatus': True,
-                'KYCImageHash': kyc_image_hash,
-                'BlockHash': block_hash,
-                'VoteHash': vote_hash
-            }
-            
-            # Append to dataframe
-            self.vote_records_db = pd.concat([
-                self.vote_records_db, 
-                pd.DataFrame([new_record])
-            ], ignore_index=True)
-            
-            # Save to Excel with retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    self.vote_records_db.to_excel(self.vote_records_excel, index=False, engine='openpyxl')
-                    print(f"✓ Vote record added for {voter_id}")
-                    return True
-                except PermissionError as e:
-                    if attempt < max_retries - 1:
-                        import time
-                        time.sleep(0.5)
-                        continue
-                    else:
-                        print(f"Warning: Could not update vote records Excel: {e}")
-                        return False
-        except Exception as e:
-            print(f"Error adding vote record: {e}")
-            return False
+        return self.add_vote_records([{
+            'voter_id': voter_id,
+            'voter_name': voter_name,
+            'candidate_voted': candidate_voted,
+            'ip_address': ip_address,
+            'geolocation_city': geolocation_city,
+            'geolocation_country': geolocation_country,
+            'kyc_image_hash': kyc_image_hash,
+            'block_hash': block_hash,
+            'vote_hash': vote_hash
+        }])
+    
+    @timed('excel_vote_records_write')
+    def add_vote_records(self, records):
+        """
+        Add several vote records with a single write of vote_records.xlsx
+        records: list of dicts with the add_vote_record keyword arguments
+        """
+        import pandas as pd
+        with self._lock:
+            try:
+                # Load existing records
+                if self.vote_records_db is None:
+                    self.load_vote_records()
+                
+                # Create new records
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                new_records = [{
+                    'VoterID': record['voter_id'],
+                    'VoterName': record['voter_name'],
+                    'CandidateVoted': record['candidate_voted'],
+                    'Timestamp': timestamp,
+                    'IPAddress': record['ip_address'],
+                    'GeolocationCity': record['geolocation_city'],
+                    'GeolocationCountry': record['geolocation_country'],
+                    'VotedStatus': True,
+                    'KYCImageHash': record['kyc_image_hash'],
+                    'BlockHash': record['block_hash'],
+                    'VoteHash': record['vote_hash']
+                } for record in records]
+                
+                # Append to dataframe
+                self.vote_records_db = pd.concat([
+                    self.vote_records_db, 
+                    pd.DataFrame(new_records)
+                ], ignore_index=True)
+                
+                # Save to Excel with retry logic
+                max_retries = 3
+                for attempt in range(max_retries):
+                    try:
+                        self.vote_records_db.to_excel(self.vote_records_excel, index=False, engine='openpyxl')
+                        for record in records:
+                            print(f"✓ Vote record added for {record['voter_id']}")
+                        return True
+                    except PermissionError as e:
+                        if attempt < max_retries - 1:
+                            import time
+                            time.sleep(0.5)
+                            continue
+                        else:
+                            print(f"Warning: Could not update vote records Excel: {e}")
+                            return False
+            except Exception as e:
+                print(f"Error adding vote record: {e}")
+                return False
     
     def mark_voter_as_voted(self, voter_id):
         """Update voter registry to prevent duplicate votes"""
-        try:
-            self.voter_db.loc[
-                self.voter_db['VoterID'] == voter_id, 
-                'HasVoted'
-            ] = True
-            
-            # Save updated registry with retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    self.voter_db.to_excel(self.voter_registry_excel, index=False, engine='openpyxl')
-                    return True
-                except PermissionError as e:
-                    if attempt < max_retries - 1:
-                        import time
-                        time.sleep(0.5)  # Wait 500ms before retry
-                        continue
-                    else:
-                        # If all retries fail, log but don't crash
-                        print(f"Warning: Could not update Excel file: {e}")
-                        print("Vote is still recorded in memory and blockchain")
-                        return False
-        except Exception as e:
-            print(f"Error in mark_voter_as_voted: {e}")
-            return False
+        return self.mark_voters_as_voted([voter_id])
     
-    def update_candidate_vote_count(self, candidate_name):
-        """Update vote count for a candidate"""
-        try:
-            if self.candidates_db is None:
-                self.load_candidates()
-            
-            # Find and increment vote count
-            mask = self.candidates_db['CandidateName'] == candidate_name
-            if mask.any():
-                self.candidates_db.loc[mask, 'VoteCount'] = \
-                    self.candidates_db.loc[mask, 'VoteCount'] + 1
+    @timed('excel_voter_registry_write')
+    def mark_voters_as_voted(self, voter_ids):
+        """Mark several voters as voted with a single registry write"""
+        with self._lock:
+            try:
+                self.voter_db.loc[
+                    self.voter_db['VoterID'].isin(voter_ids), 
+                    'HasVoted'
+                ] = True
                 
-                # Save with retry logic
+                # Save updated registry with retry logic
                 max_retries = 3
                 for attempt in range(max_retries):
                     try:
-                        self.candidates_db.to_excel(self.candidates_excel, index=False, engine='openpyxl')
+                        self.voter_db.to_excel(self.voter_registry_excel, index=False, engine='openpyxl')
+                        # Keep an imported snapshot current so restarts stay fast
+                        snapshot = registry_snapshot_path(self.voter_registry_excel)
+                        if os.path.exists(snapshot):
+                            self.voter_db.to_pickle(snapshot)
                         return True
-                    except PermissionError:
+                    except PermissionError as e:
                         if attempt < max_retries - 1:
                             import time
-                            time.sleep(0.5)
+                            time.sleep(0.5)  # Wait 500ms before retry
                             continue
                         else:
-                            print(f"Warning: Could not update candidates Excel")
+                            # If all retries fail, log but don't crash
+                            print(f"Warning: Could not update Excel file: {e}")
+                            print("Vote is still recorded in memory and blockchain")
                             return False
-            return False
-        except Exception as e:
-            print(f"Error updating candidate vote count: {e}")
-            return False
\ No newline at end of file
+            except Exception as e:
+                print(f"Error in mark_voter_as_voted: {e}")
+                return False
+    
+    def update_candidate_vote_count(self, candidate_name):
+        """Update vote count for a candidate"""
+        return self.update_candidate_vote_counts([candidate_name])
+    
+    @timed('excel_candidates_write')
+    def update_candidate_vote_counts(self, candidate_names):
+        """
+        Increment vote counts for a batch of votes (one name per vote)
+        with a single candidates write
+        """
+        import pandas as pd
+        with self._lock:
+            try:
+                if self.candidates_db is None:
+                    self.load_candidates()
+                
+                # Find and increment vote counts
+                tally = pd.Series(candidate_names).value_counts()
+                increments = self.candidates_db['CandidateName'].map(tally).fillna(0)
+                if increments.sum() > 0:
+                    self.candidates_db['VoteCount'] = \
+                        self.candidates_db['VoteCount'] + increments.astype(int)
+                    
+                    # Save with retry logic
+                    max_retries = 3
+                    for attempt in range(max_retries):
+                        try:
+                            self.candidates_db.to_excel(self.candidates_excel, index=False, engine='openpyxl')
+                            return True
+                        except PermissionError:
+                            if attempt < max_retries - 1:
+                                import time
+                                time.sleep(0.5)
+                                continue
+                            else:
+                                print(f"Warning: Could not update candidates Excel")
+                                return False
+                return False
+            except Exception as e:
+                print(f"Error updating candidate vote count: {e}")
+                return False
@@ -0,0 +1,260 @@
+# export_pipeline.py
+"""
+Admin vote export. The server starts it as a background process
+(ExportJob); it can also be run by hand:
+
+    python export_pipeline.py [--output vote_results.xlsx] [--workers N]
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from decrypt_worker import decrypt_vote_batch
+
+EXPORT_COLUMNS = [
+    'Timestamp',
+    'VoterID',
+    'Name',
+    'Vote',
+    'GeolocationCity',
+    'GeolocationCountry',
+    'KYCImageHash',
+    'BlockHash',
+    'VoteHash'
+]
+
+def idle_progress():
+    return {'status': 'idle', 'processed': 0, 'total': 0,
+            'started': None, 'finished': None, 'file': None, 'pid': None}
+
+def write_progress(progress_path, progress):
+    """Replace the progress file atomically so readers never see half of it"""
+    temp_file = f"{progress_path}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(progress, f)
+    os.replace(temp_file, progress_path)
+
+def build_chain_index(chain):
+    """
+    Single pass over the chain: voter_id_hash -> block data.
+    The first block per voter wins, as in TamperEvidenceChain.get_vote_proof,
+    so the export shows the same block a voter's receipt verifies against.
+    """
+    index = {}
+    for block in chain:
+        if isinstance(block['data'], dict) and 'voter_id_hash' in block['data']:
+            index.setdefault(block['data']['voter_id_hash'], block['data'])
+    return index
+
+def make_executor(workers):
+    """
+    Process pool for the CPU-bound decryption (tasks in decrypt_worker.py).
+    Uses spawn, never fork, and spawned workers re-import the __main__
+    script: only create it from an entry point without import-time setup
+    (this module's CLI, audit_rebuild.py). The server never does; it runs
+    exports through ExportJob.
+    """
+    return ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context('spawn'))
+
+class VoteExportPipeline:
+    """
+    Linear-time admin export.
+    Joins the encrypted vote store against a one-pass chain index,
+    decrypts in parallel batches and streams rows into a write-only
+    workbook in store order as batches complete.
+    """
+    def __init__(self, vote_store, tamper_chain, vote_key, batch_size=2000, workers=None,
+                 progress_path=None):
+        self.vote_store = vote_store
+        self.tamper_chain = tamper_chain
+        self.vote_key = vote_key
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 2
+        self.progress = idle_progress()
+        # If set, every progress update is mirrored there (read by ExportJob)
+        self.progress_path = progress_path
+        self._lock = threading.Lock()
+
+    def _update_progress(self, **changes):
+        self.progress.update(changes)
+        if self.progress_path:
+            write_progress(self.progress_path, self.progress)
+
+    def _batches(self):
+        batch = []
+        for item in self.vote_store.items():
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, output_path):
+        """
+        Export all votes to output_path
+        Returns: number of rows written
+        """
+        from openpyxl import Workbook  # Deferred: keeps app import fast
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("An export is already running")
+
+        try:
+            self._update_progress(
+                status='running', processed=0, total=len(self.vote_store),
+                started=datetime.utcnow().isoformat(), finished=None,
+                file=output_path, pid=os.getpid()
+            )
+            chain_index = build_chain_index(self.tamper_chain.chain)
+
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet('Vote Log')
+            worksheet.append(EXPORT_COLUMNS)
+
+            written = 0
+            with make_executor(self.workers) as executor:
+                # Keep a bounded number of batches in flight, consume in order
+                in_flight = deque()
+                for batch in self._batches():
+                    in_flight.append(executor.submit(decrypt_vote_batch, self.vote_key, batch))
+                    if len(in_flight) >= self.workers * 2:
+                        written += self._write_rows(worksheet, in_flight.popleft().result(), chain_index)
+                while in_flight:
+                    written += self._write_rows(worksheet, in_flight.popleft().result(), chain_index)
+
+            workbook.save(output_path)
+            self._update_progress(status='complete', finished=datetime.utcnow().isoformat())
+            return written
+        except Exception:
+            self._update_progress(status='failed', finished=datetime.utcnow().isoformat())
+            raise
+        finally:
+            self._lock.release()
+
+    def _write_rows(self, worksheet, decrypted, chain_index):
+        for voter_id_hash, vote_data in decrypted:
+            block = chain_index.get(voter_id_hash, {})
+            geolocation = block.get('geolocation') or {}
+            worksheet.append([
+                datetime.fromisoformat(vote_data['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
+                vote_data['voter_id'],
+                vote_data['voter_name'],
+                vote_data['vote_choice'],
+                geolocation.get('city', 'Unknown'),
+                geolocation.get('country', 'Unknown'),
+                block.get('kyc_image_hash', 'N/A'),
+                vote_data['block_hash'],
+                block.get('vote_hash', 'N/A')
+            ])
+
+        # /api/admin/export/progress
+        self._update_progress(processed=self.progress['processed'] + len(decrypted))
+        return len(decrypted)
+
+class ExportJob:
+    """
+    Background admin export, as started by POST /api/admin/export.
+    Runs this module's CLI in a separate process instead of exporting
+    inside the server: the request returns at once, and the decrypt pool
+    is spawned from this side-effect-free script, so its workers never
+    re-import app.py (or asgi_app.py) and re-run the server's setup.
+    The child reads the chain and the vote store (read-only) from disk
+    and mirrors its progress to progress_path, which every server
+    process, launcher.py workers included, can poll.
+    """
+    def __init__(self, output_path, progress_path, chain_file, store_file, workers=None):
+        self.output_path = output_path
+        self.progress_path = progress_path
+        self.chain_file = chain_file
+        self.store_file = store_file
+        self.workers = workers or os.cpu_count() or 2
+        self._lock = threading.Lock()
+
+    @property
+    def progress(self):
+        """Progress of the current / last export (see VoteExportPipeline)"""
+        try:
+            with open(self.progress_path) as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return idle_progress()
+        if progress['status'] in ('starting', 'running') and progress['pid'] \
+                and not self._is_alive(progress['pid']):
+            progress['status'] = 'failed'  # Killed without reporting
+        return progress
+
+    def start(self):
+        """
+        Start an export in the background
+        Returns: progress snapshot; raises RuntimeError if one is running
+        """
+        with self._lock:
+            if self.progress['status'] in ('starting', 'running'):
+                raise RuntimeError("An export is already running")
+
+            progress = dict(idle_progress(), status='starting', file=self.output_path,
+                            started=datetime.utcnow().isoformat())
+            write_progress(self.progress_path, progress)
+            process = subprocess.Popen([
+                sys.executable, os.path.abspath(__file__),
+                '--output', self.output_path, '--progress', self.progress_path,
+                '--chain', self.chain_file, '--store', self.store_file,
+                '--workers', str(self.workers)
+            ])
+            threading.Thread(target=self._wait, args=(process,),
+                             name='vote-export', daemon=True).start()
+            return progress
+
+    def _wait(self, process):
+        # Reaps the child; records a failure it could not report itself
+        if process.wait() != 0 and self.progress['status'] in ('starting', 'running'):
+            write_progress(self.progress_path, dict(
+                self.progress, status='failed', finished=datetime.utcnow().isoformat()))
+
+    @staticmethod
+    def _is_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+def main():
+    from blockchain_lite import TamperEvidenceChain
+    from vote_store import EncryptedVoteStore
+    from security_config import SecurityConfig
+
+    parser = argparse.ArgumentParser(description='Export all votes to Excel (admin)')
+    parser.add_argument('--output', default='vote_results.xlsx')
+    parser.add_argument('--progress', help='mirror progress to this JSON file')
+    parser.add_argument('--chain', default='vote_chain.json')
+    parser.add_argument('--store', default='vote_store.dat')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.chain):
+        print(f"ERROR: {args.chain} not found")
+        sys.exit(2)
+    # Store first: every vote it indexes is already on the chain loaded next
+    store = EncryptedVoteStore(args.store, read_only=True)
+    chain = TamperEvidenceChain(args.chain)
+    # Votes are encrypted with the session key (see VoteProcessor.finalize_votes)
+    key = SecurityConfig.load_keys()['session_key']
+
+    pipeline = VoteExportPipeline(store, chain, key, args.batch_size, args.workers,
+                                  progress_path=args.progress)
+    total = pipeline.run(args.output)
+    print(f"✓ Exported {total} votes to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# generate_registry.py
+"""
+Synthetic voter registry generator and bulk importer.
+
+generate: streams a registry of any size in chunks, deterministically
+          (same --seed, same registry; each chunk has its own derived
+          seed). Output format follows the extension:
+            .xlsx  openpyxl write-only workbook (constant memory)
+            .csv   plain CSV
+            .pkl   registry snapshot read directly by the server
+import:   streams an existing .xlsx/.csv registry (read-only mode),
+          validates it, fills derived columns (voter_id_hash, HasVoted,
+          ISO DOB strings) and writes the snapshot next to the workbook
+          (voter_registry.xlsx -> voter_registry.pkl). The server loads
+          the snapshot instead of parsing the workbook while it is at
+          least as new as the workbook (see read_voter_registry).
+
+Usage:
+    python generate_registry.py generate --voters 1000000 --seed 7 --output voter_registry.xlsx
+    python generate_registry.py import voter_registry.xlsx
+"""
+import os
+import sys
+import csv
+import time
+import random
+import hashlib
+import argparse
+from datetime import date, datetime, timedelta
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from excel_manager import registry_snapshot_path
+
+COLUMNS = ['VoterID', 'Name', 'DOB', 'Email', 'Phone', 'Address', 'HasVoted', 'voter_id_hash']
+REQUIRED_COLUMNS = ['VoterID', 'Name', 'DOB', 'Email']
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Reyansh', 'Ishaan', 'Rohan', 'Kabir', 'Vihaan',
+    'Ananya', 'Diya', 'Aadhya', 'Saanvi', 'Priya', 'Isha', 'Kavya', 'Meera', 'Riya', 'Neha',
+    'John', 'James', 'Robert', 'Michael', 'David', 'Mary', 'Patricia', 'Jennifer', 'Linda', 'Sarah',
+    'Mohammed', 'Ali', 'Fatima', 'Aisha', 'Omar', 'Wei', 'Li', 'Chen', 'Mei', 'Yuki'
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Patel', 'Mathur', 'Iyer', 'Reddy', 'Nair',
+    'Das', 'Haldar', 'Joshi', 'Mehta', 'Chopra', 'Smith', 'Johnson', 'Brown', 'Wilson', 'Taylor',
+    'Khan', 'Ahmed', 'Wang', 'Zhang', 'Tanaka', 'Garcia', 'Martin', 'Lee', 'Thomas', 'White'
+]
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Elm St', 'Maple Dr', 'MG Road', 'Station Rd',
+           'Park Lane', 'Lake View', 'Church St', 'Nehru Nagar', 'Gandhi Marg', 'Hill Rd']
+EMAIL_DOMAINS = [('gmail.com', 55), ('outlook.com', 15), ('yahoo.com', 12),
+                 ('example.com', 10), ('proton.me', 5), ('icloud.com', 3)]
+# Adult population by age band (relative weights)
+AGE_BANDS = [((18, 24), 13), ((25, 34), 20), ((35, 44), 19), ((45, 54), 17),
+             ((55, 64), 15), ((65, 74), 10), ((75, 95), 6)]
+
+def voter_id_width(voters):
+    return max(3, len(str(voters)))
+
+def generate_chunk(seed, start, count, voters, reference_date):
+    """Rows start..start+count-1; depends only on (seed, start, count)"""
+    rng = random.Random(f'{seed}:{start}')
+    width = voter_id_width(voters)
+    domains, domain_weights = zip(*EMAIL_DOMAINS)
+    bands, band_weights = zip(*AGE_BANDS)
+
+    rows = []
+    for i in range(start, start + count):
+        voter_id = f'V{i + 1:0{width}d}'
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        low, high = rng.choices(bands, band_weights)[0]
+        dob = reference_date - timedelta(days=rng.randint(low * 365, high * 365 + 364))
+        rows.append([
+            voter_id,
+            f'{first} {last}',
+            dob.isoformat(),
+            # The index keeps every address unique
+            f'{first.lower()}.{last.lower()}{i + 1}@{rng.choices(domains, domain_weights)[0]}',
+            f'+91-{rng.randint(70000, 99999)}-{rng.randint(10000, 99999)}',
+            f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+            False,
+            hashlib.sha256(voter_id.encode()).hexdigest()
+        ])
+    return rows
+
+def chunks(voters, chunk_size, seed):
+    reference_date = date(2026, 1, 1)  # Fixed, so output does not depend on the day it runs
+    for start in range(0, voters, chunk_size):
+        yield generate_chunk(seed, start, min(chunk_size, voters - start), voters, reference_date)
+
+def write_rows(output, row_chunks, columns):
+    """Stream row chunks to .xlsx / .csv / .pkl; returns the row count"""
+    written = 0
+    extension = os.path.splitext(output)[1].lower()
+
+    if extension == '.xlsx':
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Sheet1')
+        worksheet.append(columns)
+        for rows in row_chunks:
+            for row in rows:
+                worksheet.append(row)
+            written += len(rows)
+            print(f"  {written:,} rows", end='\r')
+        workbook.save(output)
+    elif extension == '.csv':
+        with open(output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for rows in row_chunks:
+                writer.writerows(rows)
+                written += len(rows)
+                print(f"  {written:,} rows", end='\r')
+    elif extension == '.pkl':
+        frames = []
+        for rows in row_chunks:
+            frames.append(pd.DataFrame(rows, columns=columns))
+            written += len(rows)
+            print(f"  {written:,} rows", end='\r')
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        frame.to_pickle(output)
+    else:
+        raise ValueError(f"Unsupported output format: {output}")
+
+    print()
+    return written
+
+# ========== IMPORT ==========
+
+def read_rows(path, chunk_size):
+    """Stream (header, rows chunk) from .xlsx (read-only) or .csv"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        workbook = load_workbook(path, read_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) for cell in next(rows)]
+    elif extension == '.csv':
+        handle = open(path, newline='')
+        rows = csv.reader(handle)
+        header = next(rows)
+    else:
+        raise ValueError(f"Unsupported input format: {path}")
+
+    chunk = []
+    for row in rows:
+        if not any(cell not in (None, '') for cell in row):
+            continue
+        chunk.append(list(row))
+        if len(chunk) >= chunk_size:
+            yield header, chunk
+            chunk = []
+    if chunk:
+        yield header, chunk
+
+def normalize_chunk(header, rows):
+    """Validated rows in COLUMNS order (+ any extra columns), derived columns filled"""
+    index = {name: i for i, name in enumerate(header)}
+    missing = [name for name in REQUIRED_COLUMNS if name not in index]
+    if missing:
+        raise ValueError(f"Registry must contain columns: {REQUIRED_COLUMNS} (missing {missing})")
+    extra = [name for name in header if name not in COLUMNS]
+
+    normalized = []
+    for row in rows:
+        row = row + [None] * (len(header) - len(row))
+        value = lambda name: row[index[name]] if name in index else None
+        voter_id = str(value('VoterID')).strip()
+        dob = value('DOB')
+        if isinstance(dob, (datetime, date)):
+            dob = dob.strftime('%Y-%m-%d')  # Logins compare DOB as an ISO string
+        has_voted = value('HasVoted')
+        if isinstance(has_voted, str):
+            has_voted = has_voted.strip().lower() in ('true', '1', 'yes')
+        normalized.append([
+            voter_id,
+            value('Name'),
+            str(dob) if dob is not None else None,
+            value('Email'),
+            value('Phone'),
+            value('Address'),
+            bool(has_voted),
+            value('voter_id_hash') or hashlib.sha256(voter_id.encode()).hexdigest()
+        ] + [value(name) for name in extra])
+    return normalized, extra
+
+def import_registry(path, output, chunk_size):
+    frames = []
+    seen = set()
+    duplicates = 0
+    extra = []
+    for header, rows in read_rows(path, chunk_size):
+        normalized, extra = normalize_chunk(header, rows)
+        for row in normalized:
+            if row[0] in seen:
+                duplicates += 1
+            seen.add(row[0])
+        frames.append(pd.DataFrame(normalized, columns=COLUMNS + extra))
+        print(f"  {len(seen):,} voters", end='\r')
+    print()
+
+    if duplicates:
+        raise ValueError(f"{duplicates} duplicate VoterIDs in {path}")
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    frame.to_pickle(output)
+    return len(frame)
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic voter registry generator / importer')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='generate a synthetic registry')
+    generate.add_argument('--voters', type=int, default=100000)
+    generate.add_argument('--seed', type=int, default=42)
+    generate.add_argument('--chunk-size', type=int, default=50000)
+    generate.add_argument('--output', default='voter_registry.xlsx', help='.xlsx, .csv or .pkl')
+    generate.add_argument('--snapshot', action='store_true',
+                          help='also write the server snapshot next to an .xlsx output')
+
+    importer = commands.add_parser('import', help='import a registry into the server snapshot')
+    importer.add_argument('input', help='.xlsx or .csv registry')
+    importer.add_argument('--output', help='snapshot path (default: next to the input)')
+    importer.add_argument('--chunk-size', type=int, default=50000)
+
+    args = parser.parse_args()
+    started = time.time()
+
+    if args.command == 'generate':
+        print(f"Generating {args.voters:,} voters (seed {args.seed}) -> {args.output}")
+        written = write_rows(args.output, chunks(args.voters, args.chunk_size, args.seed), COLUMNS)
+        print(f"✓ {written:,} voters written in {time.time() - started:.1f}s")
+        if args.snapshot and args.output.endswith('.xlsx'):
+            write_rows(registry_snapshot_path(args.output),
+                       chunks(args.voters, args.chunk_size, args.seed), COLUMNS)
+            print(f"✓ Snapshot {registry_snapshot_path(args.output)} written")
+    else:
+        output = args.output or registry_snapshot_path(args.input)
+        print(f"Importing {args.input} -> {output}")
+        try:
+            imported = import_registry(args.input, output, args.chunk_size)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        print(f"✓ {imported:,} voters imported in {time.time() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# geoip.py
+import os
+import csv
+import bisect
+import ipaddress
+from array import array
+from functools import lru_cache
+
+UNKNOWN_LOCATION = {'city': 'Unknown', 'country': 'Unknown'}
+
+class GeoIPLookup:
+    """
+    Offline IP -> city/country lookup.
+
+    Loads a CSV of IP ranges (columns: start_ip, end_ip, city, country; IPs
+    either dotted/colon notation or integers) into sorted integer arrays and
+    answers lookups with a binary search. Recent IPs are served from an LRU
+    cache. Only city/country is ever returned, never the exact IP.
+    """
+    def __init__(self, csv_path=None, cache_size=4096, load=True):
+        self.csv_path = csv_path
+        # (locations, ranges), replaced as a whole by load_csv so lookups
+        # never see a half-loaded dataset; see _empty_dataset
+        self._dataset = self._empty_dataset()
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+        if load:
+            self.load()
+
+    @staticmethod
+    def _empty_dataset():
+        locations = []  # distinct (city, country) pairs
+        # Per IP version: range starts, range ends, index into locations
+        ranges = {
+            4: (array('I'), array('I'), array('I')),
+            6: ([], [], array('I'))
+        }
+        return locations, ranges
+
+    def load(self):
+        """Load csv_path if configured (deferred with load=False)"""
+        if not self.csv_path:
+            return True, 0
+        if not os.path.exists(self.csv_path):
+            print(f"Warning: GeoIP dataset {self.csv_path} not found; locations will be 'Unknown'")
+            return True, 0
+        return True, self.load_csv(self.csv_path)
+
+    def load_csv(self, csv_path):
+        """
+        Load IP ranges from CSV (header row required), replacing any
+        previously loaded dataset
+        Returns: number of ranges loaded
+        """
+        locations, ranges = self._empty_dataset()
+        location_ids = {}  # (city, country) -> index in locations
+        rows = {4: [], 6: []}
+        skipped = 0
+
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    start = self._parse_ip(row['start_ip'])
+                    end = self._parse_ip(row['end_ip'])
+                    if start.version != end.version or int(start) > int(end):
+                        raise ValueError("invalid range")
+                except (KeyError, ValueError):
+                    skipped += 1
+                    continue
+
+                location = (row.get('city') or 'Unknown', row.get('country') or 'Unknown')
+                if location not in location_ids:
+                    location_ids[location] = len(locations)
+                    locations.append(location)
+                rows[start.version].append((int(start), int(end), location_ids[location]))
+
+        for version, version_rows in rows.items():
+            version_rows.sort()
+            starts, ends, range_locations = ranges[version]
+            for start, end, location_id in version_rows:
+                starts.append(start)
+                ends.append(end)
+                range_locations.append(location_id)
+
+        self._dataset = (locations, ranges)
+        self.lookup.cache_clear()
+        loaded = len(rows[4]) + len(rows[6])
+        print(f"✓ Loaded {loaded} GeoIP ranges ({skipped} skipped)")
+        return loaded
+
+    def _parse_ip(self, value):
+        value = value.strip()
+        if value.isdigit():
+            number = int(value)
+            return ipaddress.ip_address(number) if number <= 0xFFFFFFFF \
+                else ipaddress.IPv6Address(number)
+        return ipaddress.ip_address(value)
+
+    def _lookup(self, ip_address):
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except (ValueError, TypeError):
+            return UNKNOWN_LOCATION
+
+        # IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) use the IPv4 table
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        locations, ranges = self._dataset
+        starts, ends, location_ids = ranges[ip.version]
+        value = int(ip)
+        i = bisect.bisect_right(starts, value) - 1
+        if i < 0 or value > ends[i]:
+            return UNKNOWN_LOCATION
+
+        city, country = locations[location_ids[i]]
+        return {'city': city, 'country': country}
@@ -1,17 +1,42 @@
 // kyc.js
+
+// Used when /api/kyc/config is unreachable (matches the server defaults)
+const DEFAULT_KYC_CONFIG = {
+    max_dimension: 1024,
+    max_upload_bytes: 10 * 1024 * 1024,
+    target_upload_bytes: 250 * 1024,
+    quality: 0.8,
+    formats: ['image/jpeg']
+};
+
 class KYCCapture {
     constructor() {
         this.stream = null;
         this.capturedImageBlob = null;
         this.kycImageHash = null;
+        this.config = DEFAULT_KYC_CONFIG;
+    }
+    
+    async loadConfig() {
+        try {
+            const response = await fetch('http://localhost:5000/api/kyc/config');
+            if (response.ok) {
+                this.config = { ...DEFAULT_KYC_CONFIG, ...(await response.json()) };
+            }
+        } catch (error) {
+            console.warn('Using default KYC capture settings:', error);
+        }
+        return this.config;
     }
     
     async initWebcam() {
         try {
+            // No point capturing more pixels than the server keeps
+            const idealWidth = Math.min(1280, this.config.max_dimension);
             this.stream = await navigator.mediaDevices.getUserMedia({
                 video: {
-                    width: { ideal: 1280 },
-                    height: { ideal: 720 },
+                    width: { ideal: idealWidth },
+                    height: { ideal: Math.round(idealWidth * 9 / 16) },
                     facingMode: 'user'
                 }
             });
@@ -27,28 +52,78 @@ class KYCCapture {
         }
     }
     
-    capturePhoto() {
+    async capturePhoto() {
         const video = document.getElementById('webcam');
         const canvas = document.getElementById('snapshot');
-        const context = canvas.getContext('2d');
         
-        canvas.width = video.videoWidth;
-        canvas.height = video.videoHeight;
-        context.drawImage(video, 0, 0);
+        const blob = await this.encodeFrame(video, canvas);
+        this.capturedImageBlob = blob;
         
-        // Convert to blob for upload
-        canvas.toBlob((blob) => {
-            this.capturedImageBlob = blob;
-            
-            // Show preview
-            const preview = document.getElementById('capturedImage');
-            preview.src = URL.createObjectURL(blob);
-            
-            // Hide camera, show preview
-            document.getElementById('cameraContainer').style.display = 'none';
-            document.getElementById('previewContainer').classList.remove('hidden');
-            document.getElementById('captureBtn').classList.add('hidden');
-        }, 'image/jpeg', 0.85);
+        // Show preview
+        const preview = document.getElementById('capturedImage');
+        preview.src = URL.createObjectURL(blob);
+        
+        // Hide camera, show preview
+        document.getElementById('cameraContainer').style.display = 'none';
+        document.getElementById('previewContainer').classList.remove('hidden');
+        document.getElementById('captureBtn').classList.add('hidden');
+    }
+    
+    // Bounded-resolution, compact encoding of the current video frame:
+    // scale so the longest side fits max_dimension, encode in the first
+    // advertised format the browser supports, then step quality (and, as
+    // a last resort, resolution) down until it fits target_upload_bytes
+    async encodeFrame(video, canvas) {
+        const { max_dimension, max_upload_bytes, target_upload_bytes, quality } = this.config;
+        const type = this.pickFormat(canvas);
+        let scale = Math.min(1, max_dimension / Math.max(video.videoWidth, video.videoHeight));
+        let blob = null;
+        
+        for (let attempt = 0; attempt < 3; attempt++) {
+            this.drawScaled(video, canvas, scale);
+            for (let q = quality; q >= 0.5; q -= 0.1) {
+                blob = await this.toBlob(canvas, type, q);
+                if (blob.size <= target_upload_bytes) {
+                    return blob;
+                }
+            }
+            scale *= 0.75;
+        }
+        
+        // Smallest encoding tried; only fail if the server would reject it
+        if (blob.size > max_upload_bytes) {
+            throw new Error('Photo is too large, please retake it');
+        }
+        return blob;
+    }
+    
+    drawScaled(video, canvas, scale) {
+        canvas.width = Math.max(1, Math.round(video.videoWidth * scale));
+        canvas.height = Math.max(1, Math.round(video.videoHeight * scale));
+        const context = canvas.getContext('2d');
+        context.imageSmoothingEnabled = true;
+        context.imageSmoothingQuality = 'high';
+        context.drawImage(video, 0, 0, canvas.width, canvas.height);
+    }
+    
+    pickFormat(canvas) {
+        // Browsers fall back to PNG for types they cannot encode
+        for (const type of this.config.formats) {
+            if (type === 'image/jpeg' || canvas.toDataURL(type).startsWith(`data:${type}`)) {
+                return type;
+            }
+        }
+        return 'image/jpeg';
+    }
+    
+    toBlob(canvas, type, quality) {
+        return new Promise((resolve, reject) => {
+            canvas.toBlob(
+                (blob) => blob ? resolve(blob) : reject(new Error('Image encoding failed')),
+                type,
+                quality
+            );
+        });
     }
     
     async uploadKYCImage(sessionToken) {
@@ -57,7 +132,8 @@ class KYCCapture {
         }
         
         const formData = new FormData();
-        formData.append('kyc_image', this.capturedImageBlob, 'kyc_photo.jpg');
+        const extension = this.capturedImageBlob.type === 'image/webp' ? 'webp' : 'jpg';
+        formData.append('kyc_image', this.capturedImageBlob, `kyc_photo.${extension}`);
         formData.append('timestamp', new Date().toISOString());
         
         try {
@@ -75,6 +151,11 @@ class KYCCapture {
                 throw new Error(data.error || 'Upload failed');
             }
             
+            // Async uploads: wait until the server has stored the image
+            if (data.job_id) {
+                await this.waitForKYCJob(data.status_url, sessionToken);
+            }
+            
             this.kycImageHash = data.image_hash;
             
             return {
@@ -90,6 +171,33 @@ class KYCCapture {
         }
     }
     
+    async waitForKYCJob(statusUrl, sessionToken, timeoutMs = 30000) {
+        const deadline = Date.now() + timeoutMs;
+        
+        while (Date.now() < deadline) {
+            const response = await fetch(`http://localhost:5000${statusUrl}`, {
+                headers: {
+                    'Authorization': `Bearer ${sessionToken}`
+                }
+            });
+            const job = await response.json();
+            
+            if (!response.ok) {
+                throw new Error(job.error || 'KYC status check failed');
+            }
+            if (job.status === 'durable') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'KYC processing failed');
+            }
+            
+            await new Promise(resolve => setTimeout(resolve, 250));
+        }
+        
+        throw new Error('KYC processing timed out');
+    }
+    
     stopWebcam() {
         if (this.stream) {
             this.stream.getTracks().forEach(track => track.stop());
@@ -97,6 +205,21 @@ class KYCCapture {
     }
 }
 
+async function waitForVoteCommit(statusUrl, timeoutMs = 60000) {
+    const deadline = Date.now() + timeoutMs;
+    
+    while (Date.now() < deadline) {
+        const response = await fetch(`http://localhost:5000${statusUrl}`);
+        if (response.ok && (await response.json()).verified) {
+            return true;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+    
+    return false;
+}
+
 // Initialize KYC on page load
 let kycCapture;
 let sessionToken;
@@ -151,8 +274,9 @@ document.addEventListener('DOMContentLoaded', async () => {
         return;
     }
     
-    // Initialize webcam
+    // Initialize webcam (capture settings first: they bound the resolution)
     kycCapture = new KYCCapture();
+    await kycCapture.loadConfig();
     const webcamStarted = await kycCapture.initWebcam();
     
     if (!webcamStarted) {
@@ -163,8 +287,14 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
     
     // Capture button event
-    document.getElementById('captureBtn').addEventListener('click', () => {
-        kycCapture.capturePhoto();
+    document.getElementById('captureBtn').addEventListener('click', async () => {
+        try {
+            await kycCapture.capturePhoto();
+        } catch (error) {
+            const errorDiv = document.getElementById('error-message');
+            errorDiv.querySelector('p').textContent = 'Failed to capture photo: ' + error.message;
+            errorDiv.classList.remove('hidden');
+        }
     });
     
     // Retake button event
@@ -250,6 +380,15 @@ document.addEventListener('DOMContentLoaded', async () => {
             
             const data = await response.json();
             
+            // 202: the commit is still queued; poll until the vote's block is on the chain
+            if (response.status === 202 && !(await waitForVoteCommit(data.status_url))) {
+                const errorDiv = document.getElementById('error-message');
+                errorDiv.querySelector('p').textContent = 'Your vote is still being recorded. ' +
+                    'Check it later at /api/verify/' + data.voter_id_hash + ' before voting again.';
+                errorDiv.classList.remove('hidden');
+                return;
+            }
+            
             if (response.ok && data.success) {
                 const messageDiv = document.getElementById('voteMessage');
                 messageDiv.className = 'bg-green-50 dark:bg-green-950/30 border border-green-200 dark:border-green-800 text-green-700 dark:text-green-300 font-medium';
@@ -0,0 +1,115 @@
+# kyc_jobs.py
+import os
+import hashlib
+import secrets
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+class KYCJobQueue:
+    """
+    Asynchronous KYC processing.
+    The request path only hashes the upload; encryption and persistence
+    run on a bounded worker pool and clients poll the job status.
+    Job states: queued -> processing -> durable | failed
+    """
+    def __init__(self, kyc_service, max_workers=None, max_pending=None,
+                 retention_minutes=60):
+        self.kyc_service = kyc_service
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('KYC_JOB_WORKERS', '4')),
+            thread_name_prefix='kyc-job'
+        )
+        self.max_pending = max_pending or int(os.getenv('KYC_JOB_MAX_PENDING', '256'))
+        self.retention = timedelta(minutes=retention_minutes)
+        self.jobs = {}          # job_id -> job dict
+        self.jobs_by_hash = {}  # image_hash -> latest job_id
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, image_bytes, voter_id, timestamp):
+        """
+        Hash the image and queue it for encryption and storage
+        Returns: (success, job_or_error)
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False, {'error': 'KYC processing queue is full. Please retry shortly.'}
+            self.pending += 1
+
+        job = {
+            'job_id': secrets.token_urlsafe(16),
+            'status': 'queued',
+            'image_hash': hashlib.sha256(image_bytes).hexdigest(),
+            'voter_id_hash': hashlib.sha256(voter_id.encode()).hexdigest(),
+            'created': datetime.utcnow(),
+            'completed': None,
+            'error': None
+        }
+
+        with self._lock:
+            self._prune_finished()
+            self.jobs[job['job_id']] = job
+            self.jobs_by_hash[job['image_hash']] = job['job_id']
+
+        self.pool.submit(self._run, job, image_bytes, voter_id, timestamp)
+        return True, job
+
+    def _run(self, job, image_bytes, voter_id, timestamp):
+        # Every status change is assigned back, so a shared job table
+        # (launcher.py) sees it from other processes
+        job['status'] = 'processing'
+        self.jobs[job['job_id']] = job
+        try:
+            self.kyc_service.process_kyc_image(image_bytes, voter_id, timestamp)
+            job['status'] = 'durable'
+        except Exception as e:
+            print(f"Error in KYC job {job['job_id']}: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            job['completed'] = datetime.utcnow()
+            self.jobs[job['job_id']] = job
+            with self._lock:
+                self.pending -= 1
+
+    def get_job(self, job_id):
+        """Public view of a job (None if unknown or expired)"""
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+        return {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'image_hash': job['image_hash'],
+            'error': job['error']
+        }
+
+    def check_image_ready(self, image_hash, voter_id_hash):
+        """
+        Whether a KYC hash can back this voter's vote: the image must be
+        durably stored and referenced by the voter (KYC metadata store).
+        Job state only refines the error while an upload is in flight.
+        Returns: (ready, error)
+        """
+        if self.kyc_service.metadata.has_reference(image_hash, voter_id_hash):
+            return True, None
+
+        job_id = self.jobs_by_hash.get(image_hash)
+        job = self.jobs.get(job_id) if job_id else None
+        if job and job['voter_id_hash'] == voter_id_hash:
+            if job['status'] == 'failed':
+                return False, 'KYC image processing failed. Please upload again.'
+            if job['status'] != 'durable':
+                return False, 'KYC image is still being processed'
+        return False, 'KYC image not found. Please upload again.'
+
+    def _prune_finished(self):
+        """Forget finished jobs past the retention window (caller holds lock)"""
+        cutoff = datetime.utcnow() - self.retention
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['completed'] and job['completed'] < cutoff]
+        for job_id in expired:
+            job = self.jobs.pop(job_id)
+            if self.jobs_by_hash.get(job['image_hash']) == job_id:
+                del self.jobs_by_hash[job['image_hash']]
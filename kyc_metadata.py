@@ -0,0 +1,211 @@
+# kyc_metadata.py
+import os
+import hmac
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from cryptography.fernet import Fernet
+
+class KYCMetadataStore:
+    """
+    Indexed SQLite store for KYC image metadata and references.
+
+    Field-level protection:
+    - image details (sizes, normalized hash, format, ...) are Fernet-encrypted
+    - voter_id_hash is stored encrypted, and indexed through a keyed HMAC
+      blind index so low-entropy voter IDs cannot be confirmed by hashing
+    - image_hash, location and timestamps stay in clear for lookups and
+      range queries (they carry no PII)
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kyc_images (
+            image_hash TEXT PRIMARY KEY,
+            location   TEXT NOT NULL,
+            created    TEXT NOT NULL,
+            details    BLOB
+        );
+        CREATE TABLE IF NOT EXISTS kyc_references (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_hash    TEXT NOT NULL REFERENCES kyc_images(image_hash),
+            voter_index   TEXT NOT NULL,
+            voter_id_hash BLOB NOT NULL,
+            timestamp     TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_ref_image ON kyc_references(image_hash);
+        CREATE INDEX IF NOT EXISTS idx_ref_voter ON kyc_references(voter_index);
+        CREATE INDEX IF NOT EXISTS idx_ref_timestamp ON kyc_references(timestamp);
+    """
+
+    def __init__(self, db_path, encryption_key):
+        self.db_path = db_path
+        self.cipher = Fernet(encryption_key)
+        self.index_key = hashlib.sha256(b'kyc-voter-index' + encryption_key).digest()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        """One connection per thread and process (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def voter_index(self, voter_id_hash):
+        """Keyed blind index for voter_id_hash lookups"""
+        return hmac.new(self.index_key, voter_id_hash.encode(), hashlib.sha256).hexdigest()
+
+    # ========== IMAGES ==========
+
+    def get_location(self, image_hash):
+        row = self._conn().execute(
+            'SELECT location FROM kyc_images WHERE image_hash = ?', (image_hash,)
+        ).fetchone()
+        return row['location'] if row else None
+
+    def add_image(self, image_hash, location, details, voter_id_hash, timestamp):
+        """
+        Record a newly stored image together with its first reference
+        Returns: False if the image was already recorded (reference still added)
+        """
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO kyc_images (image_hash, location, created, details) '
+                'VALUES (?, ?, ?, ?)',
+                (image_hash, location, datetime.utcnow().isoformat(),
+                 self.cipher.encrypt(json.dumps(details).encode()))
+            )
+            self._insert_reference(conn, image_hash, voter_id_hash, timestamp)
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def get_image(self, image_hash):
+        """Decrypted metadata for one image (None if unknown)"""
+        row = self._conn().execute(
+            'SELECT * FROM kyc_images WHERE image_hash = ?', (image_hash,)
+        ).fetchone()
+        if not row:
+            return None
+        return self._image_record(row)
+
+    def delete_image(self, image_hash):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute('DELETE FROM kyc_references WHERE image_hash = ?', (image_hash,))
+            conn.execute('DELETE FROM kyc_images WHERE image_hash = ?', (image_hash,))
+            conn.commit()
+
+    def unreferenced_images(self):
+        """Image hashes with no remaining references"""
+        rows = self._conn().execute(
+            'SELECT i.image_hash FROM kyc_images i '
+            'LEFT JOIN kyc_references r ON r.image_hash = i.image_hash '
+            'WHERE r.id IS NULL'
+        ).fetchall()
+        return [row['image_hash'] for row in rows]
+
+    def count_images(self):
+        return self._conn().execute('SELECT COUNT(*) FROM kyc_images').fetchone()[0]
+
+    # ========== REFERENCES ==========
+
+    def _insert_reference(self, conn, image_hash, voter_id_hash, timestamp):
+        conn.execute(
+            'INSERT INTO kyc_references (image_hash, voter_index, voter_id_hash, timestamp) '
+            'VALUES (?, ?, ?, ?)',
+            (image_hash, self.voter_index(voter_id_hash),
+             self.cipher.encrypt(voter_id_hash.encode()), timestamp)
+        )
+
+    def add_reference(self, image_hash, voter_id_hash, timestamp):
+        """
+        Add a reference to an already stored image
+        Returns: False if the image is unknown
+        """
+        with self._write_lock:
+            conn = self._conn()
+            if not conn.execute('SELECT 1 FROM kyc_images WHERE image_hash = ?',
+                                (image_hash,)).fetchone():
+                return False
+            self._insert_reference(conn, image_hash, voter_id_hash, timestamp)
+            conn.commit()
+            return True
+
+    def remove_reference(self, image_hash, voter_id_hash, timestamp=None):
+        """
+        Drop one reference (matched by voter and, if given, timestamp)
+        Returns: remaining reference count
+        """
+        query = 'SELECT id FROM kyc_references WHERE image_hash = ? AND voter_index = ?'
+        params = [image_hash, self.voter_index(voter_id_hash)]
+        if timestamp is not None:
+            query += ' AND timestamp = ?'
+            params.append(timestamp)
+
+        with self._write_lock:
+            conn = self._conn()
+            row = conn.execute(query + ' LIMIT 1', params).fetchone()
+            if row:
+                conn.execute('DELETE FROM kyc_references WHERE id = ?', (row['id'],))
+                conn.commit()
+        return self.reference_count(image_hash)
+
+    def has_reference(self, image_hash, voter_id_hash):
+        """Whether the image is stored and referenced by this voter"""
+        return self._conn().execute(
+            'SELECT 1 FROM kyc_references WHERE image_hash = ? AND voter_index = ? LIMIT 1',
+            (image_hash, self.voter_index(voter_id_hash))
+        ).fetchone() is not None
+
+    def reference_count(self, image_hash):
+        return self._conn().execute(
+            'SELECT COUNT(*) FROM kyc_references WHERE image_hash = ?', (image_hash,)
+        ).fetchone()[0]
+
+    # ========== AUDIT QUERIES ==========
+
+    def find_by_voter(self, voter_id_hash):
+        """All KYC uploads referenced by one voter, oldest first"""
+        rows = self._conn().execute(
+            'SELECT r.timestamp AS ref_timestamp, r.voter_id_hash AS ref_voter, i.* '
+            'FROM kyc_references r JOIN kyc_images i ON i.image_hash = r.image_hash '
+            'WHERE r.voter_index = ? ORDER BY r.timestamp',
+            (self.voter_index(voter_id_hash),)
+        ).fetchall()
+        return [self._reference_record(row) for row in rows]
+
+    def find_by_time_range(self, start, end):
+        """All KYC uploads with start <= timestamp < end (ISO strings)"""
+        rows = self._conn().execute(
+            'SELECT r.timestamp AS ref_timestamp, r.voter_id_hash AS ref_voter, i.* '
+            'FROM kyc_references r JOIN kyc_images i ON i.image_hash = r.image_hash '
+            'WHERE r.timestamp >= ? AND r.timestamp < ? ORDER BY r.timestamp',
+            (start, end)
+        ).fetchall()
+        return [self._reference_record(row) for row in rows]
+
+    def _image_record(self, row):
+        record = {
+            'image_hash': row['image_hash'],
+            'location': row['location'],
+            'created': row['created']
+        }
+        if row['details']:
+            record.update(json.loads(self.cipher.decrypt(row['details']).decode()))
+        return record
+
+    def _reference_record(self, row):
+        record = self._image_record(row)
+        record['voter_id_hash'] = self.cipher.decrypt(row['ref_voter']).decode()
+        record['timestamp'] = row['ref_timestamp']
+        return record
@@ -1,66 +1,403 @@
 # kyc_service.py
 import os
+import ast
 import hashlib
+import uuid
 from datetime import datetime
 from cryptography.fernet import Fernet
-from PIL import Image
 import io
+from chunked_cipher import ChunkedCipher
+from kyc_metadata import KYCMetadataStore
+from concurrency import LockStripes
+from metrics import timed
+
+class KYCUploadTooLarge(ValueError):
+    """Raised when a KYC upload exceeds the configured size cap"""
+    pass
+
+class KYCInvalidImage(ValueError):
+    """Raised when a KYC upload cannot be decoded as an image"""
+    pass
 
 class KYCService:
-    def __init__(self, storage_path, encryption_key):
+    """
+    Content-addressed KYC image store.
+    Images live at <storage>/<hash[0:2]>/<hash[2:4]>/<hash>.enc so no single
+    directory grows past a few thousand entries. Locations, image details
+    and voter references are kept in one indexed metadata database.
+    """
+    METADATA_DB = 'kyc_metadata.db'
+    LEGACY_INDEX_FILE = 'index.log'
+    STAGING_DIR = '.staging'
+    SHARD_DEPTH = 2
+    SHARD_WIDTH = 2
+
+    def __init__(self, storage_path, encryption_key, max_upload_bytes=None):
         self.storage_path = storage_path
         self.cipher = Fernet(encryption_key)
-        os.makedirs(storage_path, exist_ok=True)
-    
+        self.stream_cipher = ChunkedCipher(encryption_key)
+        self.max_upload_bytes = max_upload_bytes or int(
+            os.getenv('KYC_MAX_UPLOAD_BYTES', str(10 * 1024 * 1024))
+        )
+        self.staging_path = os.path.join(storage_path, self.STAGING_DIR)
+        # Serializes the exists-check / write / reference update per blob
+        self._blob_locks = LockStripes(64)
+
+        # Normalization: decode, bound resolution, strip metadata, re-encode
+        self.normalize = os.getenv('KYC_NORMALIZE', '1') == '1'
+        self.max_dimension = int(os.getenv('KYC_MAX_DIMENSION', '1024'))
+        self.output_format = os.getenv('KYC_OUTPUT_FORMAT', 'JPEG').upper()
+        self.output_quality = int(os.getenv('KYC_OUTPUT_QUALITY', '80'))
+        # Size the browser aims for when encoding the capture (kyc.js)
+        self.client_target_bytes = int(os.getenv('KYC_CLIENT_TARGET_BYTES', str(250 * 1024)))
+
+        os.makedirs(self.staging_path, exist_ok=True)
+        self.metadata = KYCMetadataStore(
+            os.path.join(storage_path, self.METADATA_DB), encryption_key
+        )
+        # Migration rewrites the storage tree, so it is never run implicitly
+        legacy = self.count_legacy_files()
+        if legacy:
+            print(f"Warning: {legacy} KYC files use the legacy flat layout and cannot be "
+                  f"retrieved by hash; run `python migrate_kyc_storage.py` once to migrate them")
+
+    def client_config(self):
+        """Capture settings advertised to kyc.js (GET /api/kyc/config)"""
+        from PIL import features
+        formats = ['image/jpeg']
+        if features.check('webp'):
+            formats.insert(0, 'image/webp')  # Preferred: smaller at equal quality
+        return {
+            'max_dimension': self.max_dimension,
+            'max_upload_bytes': self.max_upload_bytes,
+            'target_upload_bytes': min(self.client_target_bytes, self.max_upload_bytes),
+            'quality': self.output_quality / 100,
+            'formats': formats
+        }
+
+    def shard_path(self, image_hash):
+        """Deterministic location of an image inside the sharded layout"""
+        parts = [image_hash[i * self.SHARD_WIDTH:(i + 1) * self.SHARD_WIDTH]
+                 for i in range(self.SHARD_DEPTH)]
+        return os.path.join(*parts, f"{image_hash}.enc")
+
     def process_kyc_image(self, image_bytes, voter_id, timestamp):
         """
-        Process KYC image: encrypt, store, return hash reference
+        Process KYC image: encrypt, store, return hash reference.
+        Content that is already stored only gets a new (voter, timestamp)
+        reference and is never encrypted again.
+        Raises KYCUploadTooLarge above max_upload_bytes, KYCInvalidImage
+        if normalization cannot decode the upload.
         Returns: (image_hash, encrypted_file_path)
         """
-        # Generate SHA-256 hash of original image
-        image_hash = hashlib.sha256(image_bytes).hexdigest()
-        
-        # Encrypt image data
-        encrypted_data = self.cipher.encrypt(image_bytes)
-        
-        # Create privacy-preserving filename (hash-based, no PII)
-        filename = f"{image_hash[:16]}_{timestamp.replace(':', '-')}.enc"
-        filepath = os.path.join(self.storage_path, filename)
-        
-        # Store encrypted image
-        with open(filepath, 'wb') as f:
-            f.write(encrypted_data)
-        
-        # Create metadata (also encrypted)
-        metadata = {
-            'image_hash': image_hash,
-            'voter_id_hash': hashlib.sha256(voter_id.encode()).hexdigest(),
-            'timestamp': timestamp,
-            'file_path': filepath
-        }
-        
-        metadata_path = filepath + '.meta'
-        with open(metadata_path, 'wb') as f:
-            f.write(self.cipher.encrypt(str(metadata).encode()))
-        
+        if len(image_bytes) > self.max_upload_bytes:
+            raise KYCUploadTooLarge(f"KYC image exceeds {self.max_upload_bytes} bytes")
+
+        # image_hash is always the SHA-256 of the original upload
+        with timed('kyc_hash'):
+            image_hash = hashlib.sha256(image_bytes).hexdigest()
+        existing = self._add_reference_if_stored(image_hash, voter_id, timestamp)
+        if existing:
+            return image_hash, existing
+
+        voter_id_hash = hashlib.sha256(voter_id.encode()).hexdigest()
+        # Content-addressed, privacy-preserving location (hash-based, no PII)
+        relpath = self.shard_path(image_hash)
+        filepath = os.path.join(self.storage_path, relpath)
+
+        # Normalize the plaintext before the one encryption of what is kept.
+        # This runs on the calling thread: Pillow releases the GIL while it
+        # decodes and resamples, so request threads already normalize in
+        # parallel, and a synchronous request would only block on a pool
+        # future. Uploads that should not hold the request go through
+        # KYCJobQueue (KYC_ASYNC_UPLOADS), which calls this on its workers.
+        normalized = None
+        stored = image_bytes
+        if self.normalize:
+            normalized = self.normalize_image(image_bytes)
+            stored = normalized['data']
+
+        details = {'size': len(image_bytes)}
+        if normalized:
+            details.update({
+                'normalized_hash': normalized['hash'],
+                'normalized_size': len(normalized['data']),
+                'format': normalized['format'],
+                'dimensions': list(normalized['dimensions'])
+            })
+
+        staging_file = self._stage_bytes(stored)
+        try:
+            with self._blob_lock(image_hash), timed('kyc_write'):
+                # A concurrent upload of the same image may have won the race
+                if self.metadata.add_reference(image_hash, voter_id_hash, timestamp):
+                    return image_hash, filepath
+
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                os.replace(staging_file, filepath)
+                self.metadata.add_image(image_hash, relpath, details,
+                                        voter_id_hash, timestamp)
+        finally:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+
         return image_hash, filepath
-    
+
+    def process_kyc_stream(self, stream, voter_id, timestamp):
+        """
+        Variant of process_kyc_image for a file-like upload: reads it in
+        chunks, stopping with KYCUploadTooLarge as soon as more than
+        max_upload_bytes arrive, so at most that much is ever held.
+        Returns: (image_hash, encrypted_file_path)
+        """
+        return self.process_kyc_image(self._read_upload(stream), voter_id, timestamp)
+
+    # ========== REFERENCE COUNTING ==========
+
+    def _blob_lock(self, image_hash):
+        return self._blob_locks.lock_for(image_hash)
+
+    def _image_path(self, image_hash):
+        relpath = self.metadata.get_location(image_hash) or self.shard_path(image_hash)
+        return os.path.join(self.storage_path, relpath)
+
+    def _add_reference_if_stored(self, image_hash, voter_id, timestamp):
+        """Returns the stored path if the image exists (reference added), else None"""
+        voter_id_hash = hashlib.sha256(voter_id.encode()).hexdigest()
+        with self._blob_lock(image_hash):
+            if not self.metadata.add_reference(image_hash, voter_id_hash, timestamp):
+                return None
+        return self._image_path(image_hash)
+
+    def get_reference_count(self, image_hash):
+        """Number of uploads referring to a stored image (0 if not stored)"""
+        return self.metadata.reference_count(image_hash)
+
+    def release_reference(self, image_hash, voter_id_hash, timestamp=None):
+        """
+        Drop one reference to an image (matched by voter and, if given, timestamp)
+        Returns: remaining reference count
+        """
+        with self._blob_lock(image_hash):
+            return self.metadata.remove_reference(image_hash, voter_id_hash, timestamp)
+
+    def collect_garbage(self):
+        """
+        Delete stored images that no longer have any references
+        Returns: number of images removed
+        """
+        removed = 0
+        for image_hash in self.metadata.unreferenced_images():
+            with self._blob_lock(image_hash):
+                if self.metadata.reference_count(image_hash):
+                    continue
+                filepath = self._image_path(image_hash)
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                self.metadata.delete_image(image_hash)
+            removed += 1
+        return removed
+
+    # ========== AUDIT QUERIES ==========
+
+    def find_kyc_by_voter(self, voter_id_hash):
+        """All KYC uploads for one voter (metadata only, no image data)"""
+        return self.metadata.find_by_voter(voter_id_hash)
+
+    def find_kyc_by_time_range(self, start, end):
+        """All KYC uploads with start <= timestamp < end (metadata only)"""
+        return self.metadata.find_by_time_range(start, end)
+
+    def _read_upload(self, stream):
+        """Read an upload into memory, refusing more than max_upload_bytes"""
+        chunks = []
+        received = 0
+        while True:
+            chunk = stream.read(ChunkedCipher.CHUNK_SIZE)
+            if not chunk:
+                return b''.join(chunks)
+            received += len(chunk)
+            if received > self.max_upload_bytes:
+                raise KYCUploadTooLarge(
+                    f"KYC image exceeds {self.max_upload_bytes} bytes"
+                )
+            chunks.append(chunk)
+
+    @timed('kyc_encrypt')
+    def _stage_bytes(self, data):
+        """
+        Encrypt data into a new staging file (the final name depends on
+        the hash, so the blob is moved into place once it is complete)
+        Returns: staging file path
+        """
+        staging_file = os.path.join(self.staging_path, f"{uuid.uuid4().hex}.part")
+        try:
+            with open(staging_file, 'wb') as f:
+                self.stream_cipher.encrypt_stream(
+                    (data[i:i + ChunkedCipher.CHUNK_SIZE]
+                     for i in range(0, len(data), ChunkedCipher.CHUNK_SIZE)),
+                    f
+                )
+        except BaseException:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+            raise
+        return staging_file
+
+    @timed('kyc_normalize')
+    def normalize_image(self, image_bytes):
+        """
+        Decode an image, bound its resolution, drop EXIF/ICC/text metadata
+        and re-encode it in the configured compact format
+        Returns: dict with data, hash, format, dimensions
+        """
+        from PIL import Image, ImageOps  # Deferred: keeps app import fast
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as img:
+                # Let JPEG decode at reduced scale instead of full resolution
+                img.draft('RGB', (self.max_dimension, self.max_dimension))
+                img = ImageOps.exif_transpose(img)
+                img = img.convert('RGB')
+                img.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+            raise KYCInvalidImage("Could not decode KYC image") from e
+
+        # Rebuild from raw pixels so no ancillary metadata survives
+        clean = Image.frombytes('RGB', img.size, img.tobytes())
+
+        output = io.BytesIO()
+        clean.save(output, format=self.output_format,
+                   quality=self.output_quality, optimize=True)
+        data = output.getvalue()
+
+        return {
+            'data': data,
+            'hash': hashlib.sha256(data).hexdigest(),
+            'format': self.output_format,
+            'dimensions': clean.size
+        }
+
+    def _open_image(self, image_hash):
+        try:
+            return open(self._image_path(image_hash), 'rb')
+        except FileNotFoundError:
+            return None
+
     def retrieve_kyc_image(self, image_hash, authorized=True):
         """
         Retrieve and decrypt KYC image (only for authorized audit)
         """
+        chunks = self.stream_kyc_image(image_hash, authorized)
+        if chunks is None:
+            return None
+        return b''.join(chunks)
+
+    def stream_kyc_image(self, image_hash, authorized=True):
+        """
+        Retrieve a KYC image as a generator of decrypted chunks
+        (only for authorized audit). Returns None if the image is unknown.
+        """
         if not authorized:
             raise PermissionError("Unauthorized access to PII")
-        
-        # Search for file by hash prefix
-        for filename in os.listdir(self.storage_path):
-            if filename.startswith(image_hash[:16]) and filename.endswith('.enc'):
-                filepath = os.path.join(self.storage_path, filename)
-                
-                with open(filepath, 'rb') as f:
-                    encrypted_data = f.read()
-                
-                decrypted_data = self.cipher.decrypt(encrypted_data)
-                return decrypted_data
-        
-        return None
\ No newline at end of file
+
+        f = self._open_image(image_hash)
+        if f is None:
+            return None
+
+        def chunks():
+            with f:
+                if ChunkedCipher.is_chunked(f.read(len(ChunkedCipher.MAGIC))):
+                    f.seek(0)
+                    yield from self.stream_cipher.decrypt_stream(f)
+                else:
+                    # Images stored before chunked encryption are single Fernet tokens
+                    f.seek(0)
+                    yield self.cipher.decrypt(f.read())
+
+        return chunks()
+
+    def count_legacy_files(self):
+        """Number of flat-layout .enc files (plus a leftover index.log) awaiting migration"""
+        count = 0
+        with os.scandir(self.storage_path) as entries:
+            for entry in entries:
+                if entry.is_file() and (entry.name.endswith('.enc')
+                                        or entry.name == self.LEGACY_INDEX_FILE):
+                    count += 1
+        return count
+
+    def migrate_legacy_layout(self):
+        """
+        Import KYC metadata written by earlier versions into the metadata database
+        (one-off, see migrate_kyc_storage.py):
+        - flat '<hash16>_<timestamp>.enc' files are moved into the sharded layout
+        - per-image encrypted .meta files (str(dict)) are imported and removed
+        - the old index.log is removed once every entry is imported
+        Returns: number of images migrated
+        """
+        candidates = []  # (current .enc path, is_flat)
+        with os.scandir(self.storage_path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.enc'):
+                    candidates.append((entry.path, True))
+
+        legacy_index = os.path.join(self.storage_path, self.LEGACY_INDEX_FILE)
+        if os.path.exists(legacy_index):
+            with open(legacy_index, 'r') as f:
+                for line in f:
+                    entry = line.strip().split(' ', 1)
+                    if len(entry) == 2:
+                        candidates.append((os.path.join(self.storage_path, entry[1]), False))
+
+        migrated = 0
+        failed = False
+        for old_path, is_flat in candidates:
+            if not os.path.exists(old_path + '.meta'):
+                continue
+            try:
+                with open(old_path + '.meta', 'rb') as f:
+                    metadata = ast.literal_eval(
+                        self.cipher.decrypt(f.read()).decode()
+                    )
+                image_hash = metadata['image_hash']
+            except Exception as e:
+                print(f"Warning: Could not migrate KYC file {os.path.basename(old_path)}: {e}")
+                failed = True
+                continue
+
+            relpath = self.shard_path(image_hash)
+            new_path = os.path.join(self.storage_path, relpath)
+            references = metadata.get('references') or [{
+                'voter_id_hash': metadata.get('voter_id_hash'),
+                'timestamp': metadata.get('timestamp')
+            }]
+            details = {key: list(value) if isinstance(value, tuple) else value
+                       for key, value in metadata.items()
+                       if key in ('size', 'normalized_hash', 'normalized_size',
+                                  'format', 'dimensions')}
+
+            if self.metadata.get_location(image_hash):
+                # Same image uploaded more than once: keep one blob, merge references
+                for ref in references:
+                    self.metadata.add_reference(image_hash, ref['voter_id_hash'], ref['timestamp'])
+                if old_path != new_path:
+                    os.remove(old_path)
+            else:
+                if is_flat:
+                    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                    os.replace(old_path, new_path)
+                first, rest = references[0], references[1:]
+                self.metadata.add_image(image_hash, relpath, details,
+                                        first['voter_id_hash'], first['timestamp'])
+                for ref in rest:
+                    self.metadata.add_reference(image_hash, ref['voter_id_hash'], ref['timestamp'])
+
+            os.remove(old_path + '.meta')
+            migrated += 1
+
+        if os.path.exists(legacy_index) and not failed:
+            os.remove(legacy_index)
+
+        if migrated:
+            print(f"✓ Migrated {migrated} KYC images into the metadata database")
+        return migrated
@@ -0,0 +1,348 @@
+# launcher.py
+"""
+Preload-and-fork production launcher.
+
+The parent imports app.py once: registry, candidates, chain and vote
+store index are parsed a single time, the heap is frozen (gc.freeze) and
+then the parent forks:
+- N workers serving HTTP from one shared listening socket. They share
+  the preloaded data copy-on-write, so starting one costs a fork() and
+  total RSS does not grow with the worker count.
+- one committer process running VoteCommitPipeline: it stays the only
+  writer of the chain, the vote store and the workbooks. Workers validate
+  votes locally and forward them over a Unix socket.
+
+Mutable per-request state (sessions, OTPs, anti-replay, KYC jobs) moves
+to a SQLite shared-state store (shared_state.py) so any worker can serve
+any step of a flow. Workers pick up the committer's writes lazily
+(vote store tail, chain file, candidates workbook).
+
+The parent stays single-threaded and only supervises: a worker or the
+committer that dies is forked again from the preloaded image.
+
+Usage: python launcher.py [--workers 4] [--host 0.0.0.0] [--port 5000]
+"""
+import os
+import gc
+import sys
+import time
+import random
+import signal
+import socket
+import secrets
+import argparse
+import itertools
+import threading
+from functools import partial
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, Client
+
+from shared_state import SharedStateStore
+
+SHARED_STATE_DB = os.getenv('SHARED_STATE_DB', 'shared_state.db')
+COMMIT_SOCKET = os.getenv('COMMIT_SOCKET', 'vote_commit.sock')
+
+class ShutdownRequested(Exception):
+    pass
+
+class RemoteCommitPipeline:
+    """
+    Worker-side stand-in for VoteCommitPipeline: same submit() contract,
+    but the vote is committed by the committer process.
+    """
+    def __init__(self, address, authkey, vote_processor):
+        self.address = address
+        self.authkey = authkey
+        self.vote_processor = vote_processor
+        self.futures = {}  # request_id -> (connection, future)
+        self.request_ids = itertools.count()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Connect (or reconnect) to the committer (caller holds lock)"""
+        if self._conn is None:
+            self._conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            threading.Thread(target=self._receive, args=(self._conn,),
+                             name='vote-commit-client', daemon=True).start()
+        return self._conn
+
+    def submit(self, prepared_vote, nonce, timestamp):
+        """
+        Forward a validated vote (from VoteProcessor.prepare_vote)
+        Returns: Future resolving to (success, receipt_or_error)
+        """
+        future = Future()
+        future.add_done_callback(partial(self._settled, prepared_vote))
+        with self._lock:
+            request_id = next(self.request_ids)
+            try:
+                conn = self._connection()
+                self.futures[request_id] = (conn, future)
+                conn.send((request_id, prepared_vote, nonce, timestamp))
+            except (OSError, EOFError) as e:
+                self.futures.pop(request_id, None)
+                self._conn = None
+                future.set_exception(e)
+        return future
+
+    def _receive(self, conn):
+        while True:
+            try:
+                request_id, ok, result = conn.recv()
+            except (OSError, EOFError):
+                break
+            with self._lock:
+                _, future = self.futures.pop(request_id, (None, None))
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+        # Committer went away: fail whatever was still waiting on it
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            lost = [request_id for request_id, (owner, _) in self.futures.items() if owner is conn]
+            futures = [self.futures.pop(request_id)[1] for request_id in lost]
+        for future in futures:
+            future.set_exception(ConnectionError('Vote committer connection lost'))
+
+    def _settled(self, prepared_vote, future):
+        # Release the local reservation and pick up the stored vote
+        self.vote_processor.abandon_vote(prepared_vote)
+        self.vote_processor.votes_encrypted.refresh()
+
+    def stop(self, timeout=None):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# ========== COMMITTER PROCESS ==========
+
+def serve_worker(conn, pipeline):
+    """Commit votes sent by one worker, replying as each one settles"""
+    send_lock = threading.Lock()
+
+    def reply(request_id, future):
+        try:
+            ok, result = True, future.result()
+        except Exception as e:
+            ok, result = False, str(e)
+        with send_lock:
+            try:
+                conn.send((request_id, ok, result))
+            except OSError:
+                pass  # Worker is gone; the vote itself is committed
+
+    while True:
+        try:
+            request_id, prepared_vote, nonce, timestamp = conn.recv()
+        except (OSError, EOFError):
+            return
+        pipeline.submit(prepared_vote, nonce, timestamp).add_done_callback(
+            partial(reply, request_id)
+        )
+
+def accept_workers(listener, pipeline):
+    while True:
+        try:
+            conn = listener.accept()
+        except OSError:
+            return
+        except Exception as e:
+            print(f"Rejected commit connection: {e}")
+            continue
+        threading.Thread(target=serve_worker, args=(conn, pipeline),
+                         name='vote-commit-worker', daemon=True).start()
+
+def run_committer(server, commit_listener):
+    from vote_pipeline import VoteCommitPipeline
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    # A restarted committer must start from what is on disk, not the preload
+    server.tamper_chain.refresh()
+    server.vote_store.refresh()
+    server.excel_manager.load_voter_registry()
+    server.excel_manager.load_candidates()
+    server.excel_manager.load_vote_records()
+
+    pipeline = VoteCommitPipeline(server.vote_processor, server.tamper_chain,
+                                  server.anti_replay, server.excel_manager)
+    threading.Thread(target=accept_workers, args=(commit_listener, pipeline),
+                     name='vote-commit-accept', daemon=True).start()
+    print(f"Committer {os.getpid()} ready")
+
+    while not stop.wait(1):
+        pass
+    pipeline.stop(timeout=30)
+
+# ========== WORKER PROCESS ==========
+
+def replica_results(server):
+    """Totals for a worker's results stream: it sees commits only on disk"""
+    server.vote_store.refresh()
+    server.excel_manager.refresh_candidates()
+    return server.excel_manager.get_vote_tallies(), len(server.vote_store)
+
+def run_worker(server, listen_sock, authkey):
+    from werkzeug.serving import make_server
+
+    # OTPs come from `random`: never share the parent's PRNG state
+    random.seed()
+    server.vote_pipeline = RemoteCommitPipeline(COMMIT_SOCKET, authkey, server.vote_processor)
+    server.results.source = partial(replica_results, server)
+
+    httpd = make_server(listen_sock.getsockname()[0], listen_sock.getsockname()[1],
+                        server.app, threaded=True, fd=listen_sock.fileno())
+    # shutdown() blocks until serve_forever returns, so call it off the main thread
+    signal.signal(signal.SIGTERM,
+                  lambda *_: threading.Thread(target=httpd.shutdown, daemon=True).start())
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+# ========== PARENT ==========
+
+# Everything in the shared store is per-run state that a single-process
+# server would keep in memory; double votes are stopped by the vote store
+VOLATILE_NAMESPACES = ('sessions', 'pending_otp', 'otp', 'otp_rate_limit', 'used_nonces',
+                       'voted_ids', 'vote_timestamps', 'kyc_jobs', 'kyc_jobs_by_hash')
+
+def share_mutable_state(server, state):
+    """Point the services' mutable dicts/sets at the shared store (emptied first)"""
+    for namespace in VOLATILE_NAMESPACES:
+        state.clear(namespace)
+    server.auth_service.active_sessions = state.dict('sessions')
+    server.auth_service.pending_otp_verifications = state.dict('pending_otp')
+    server.otp_service.otp_storage = state.dict('otp')
+    server.otp_service.rate_limit = state.dict('otp_rate_limit')
+    server.anti_replay.used_nonces = state.set('used_nonces')
+    server.anti_replay.voted_ids = state.set('voted_ids')
+    server.anti_replay.vote_timestamps = state.dict('vote_timestamps')
+    server.kyc_jobs.jobs = state.dict('kyc_jobs')
+    server.kyc_jobs.jobs_by_hash = state.dict('kyc_jobs_by_hash')
+
+def install_replica_refresh(server):
+    """Workers catch up with the committer's writes before serving reads"""
+    from flask import request
+
+    refresh_for_endpoint = {
+        'get_candidates': server.excel_manager.refresh_candidates,
+        'verify_vote': server.tamper_chain.refresh,
+        'verify_batch': server.tamper_chain.refresh,
+        'verify_chain': server.tamper_chain.refresh,
+        'chain_head': server.tamper_chain.refresh,
+        'chain_block': server.tamper_chain.refresh,
+    }
+
+    @server.app.before_request
+    def refresh_replica():
+        server.vote_store.refresh()  # Cheap: reads only the appended tail
+        refresh = refresh_for_endpoint.get(request.endpoint)
+        if refresh:
+            refresh()
+
+def main():
+    parser = argparse.ArgumentParser(description='Preload-and-fork Vote Vault server')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', os.cpu_count() or 2)))
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    args = parser.parse_args()
+
+    started = time.time()
+    import app as server
+
+    # Children must inherit fully loaded data (and no warm-up threads)
+    if not server.warmup.wait():
+        print(f"Warm-up failed: {server.warmup.status()}")
+        sys.exit(1)
+
+    # The preload started an in-process commit pipeline; the committer
+    # process runs its own, so stop this one before forking
+    server.vote_pipeline.stop()
+    share_mutable_state(server, SharedStateStore(SHARED_STATE_DB))
+    install_replica_refresh(server)
+
+    listen_sock = socket.create_server((args.host, args.port), backlog=1024)
+    authkey = secrets.token_bytes(32)
+    if os.path.exists(COMMIT_SOCKET):
+        os.unlink(COMMIT_SOCKET)
+    commit_listener = Listener(COMMIT_SOCKET, family='AF_UNIX', authkey=authkey)
+
+    # Move the preloaded heap out of the collector's reach, so GC passes in
+    # the workers do not touch (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded in {time.time() - started:.2f}s, forking {args.workers} workers "
+          f"on http://{args.host}:{args.port}")
+
+    children = {}  # pid -> role
+
+    def spawn(role):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                if role == 'committer':
+                    listen_sock.close()
+                    run_committer(server, commit_listener)
+                else:
+                    run_worker(server, listen_sock, authkey)
+            except BaseException as e:
+                print(f"{role} {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        children[pid] = role
+
+    def request_shutdown(*_):
+        raise ShutdownRequested()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    try:
+        spawn('committer')
+        for _ in range(args.workers):
+            spawn('worker')
+
+        while True:
+            pid, status = os.wait()
+            role = children.pop(pid, None)
+            if role is None:
+                continue
+            print(f"{role} {pid} exited ({os.waitstatus_to_exitcode(status)}), restarting")
+            time.sleep(1)
+            spawn(role)
+    except ShutdownRequested:
+        pass
+
+    # Stop workers first (no new votes), then let the committer drain
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for role in ('worker', 'committer'):
+        pids = [pid for pid, r in children.items() if r == role]
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+    commit_listener.close()
+    print("Shutdown complete")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+# loadtest.py
+"""
+End-to-end election load test.
+
+Generates a synthetic registry in a scratch directory, starts a local
+server on it (Flask dev server, launcher.py or asgi_app.py) with a
+stand-in SMTP sink, then drives N concurrent simulated voters through
+the whole flow:
+
+    login -> verify-otp (test_otp fallback) -> KYC upload -> vote submit
+
+The SMTP sink accepts connections but refuses STARTTLS, so every OTP
+send does a real SMTP round trip and then falls back to returning
+test_otp. At the end it reports voters/s, requests/s, p50/p95/p99 per
+endpoint, error rates and the server's slowest stages (/api/metrics).
+
+Usage:
+    python loadtest.py --voters 500 --concurrency 50 [--server launcher --workers 4]
+    python loadtest.py --url http://host:5000 ...   (existing server; it must
+                                                    already serve a registry
+                                                    made by this tool's fixture)
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from PIL import Image
+
+from stress_test_votes import create_fixture, CANDIDATES
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ['login', 'verify_otp', 'kyc_upload', 'kyc_status', 'vote_submit']
+
+# ========== SMTP SINK ==========
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue without STARTTLS: senders fall back to test_otp"""
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b'220 loadtest-sink ESMTP\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().split(b' ', 1)[0].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.wfile.write(b'250-loadtest-sink\r\n250 SIZE 10485760\r\n')
+            elif command == b'STARTTLS':
+                self.wfile.write(b'454 TLS not available\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connections = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+# ========== SERVER ==========
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(kind, workdir, port, smtp_port, workers):
+    """Start the server under test in workdir (all data paths are relative)"""
+    env = dict(os.environ,
+               PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''),
+               SMTP_SERVER='127.0.0.1', SMTP_PORT=str(smtp_port),
+               SMTP_USERNAME='loadtest@example.com', SMTP_PASSWORD='loadtest')
+    if kind == 'launcher':
+        command = [sys.executable, os.path.join(REPO_DIR, 'launcher.py'),
+                   '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers)]
+    elif kind == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi_app:application',
+                   '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-c',
+                   f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited early, see {log.name}")
+        try:
+            if requests.get(f'{url}/api/health', timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 120s")
+
+# ========== SIMULATED VOTER ==========
+
+class Recorder:
+    """Per-endpoint latencies and errors, shared by all voter threads"""
+    def __init__(self):
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.error_samples = {}
+        self._lock = threading.Lock()
+
+    def call(self, endpoint, method, *args, expect=200, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = method(*args, timeout=60, **kwargs)
+            ok = response.status_code == expect
+            detail = f'{response.status_code} {response.text[:120]}'
+        except requests.RequestException as e:
+            response, ok, detail = None, False, str(e)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+        if not ok:
+            self.fail(endpoint, detail)
+        return response if ok else None
+
+    def fail(self, endpoint, detail):
+        with self._lock:
+            self.errors[endpoint] += 1
+            self.error_samples.setdefault(endpoint, detail)
+
+def kyc_image(voter_index):
+    """Small JPEG, unique per voter so uploads are not deduplicated"""
+    image = Image.new('RGB', (320, 240), ((voter_index * 37) % 256, (voter_index * 91) % 256,
+                                          (voter_index // 256) % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+def run_voter(url, voter, voter_index, recorder, async_kyc):
+    """One voter through the full flow; True if the vote was accepted"""
+    http = requests.Session()
+
+    response = recorder.call('login', http.post, f'{url}/api/auth/login', json={
+        'voter_id': voter['VoterID'], 'dob': voter['DOB'], 'email': voter['Email']
+    })
+    if response is None:
+        return False
+    login = response.json()
+    if 'test_otp' not in login:
+        recorder.fail('login', 'no test_otp in response (SMTP sink not used?)')
+        return False
+
+    response = recorder.call('verify_otp', http.post, f'{url}/api/auth/verify-otp', json={
+        'email': voter['Email'], 'otp': login['test_otp'], 'temp_token': login['temp_token']
+    })
+    if response is None:
+        return False
+    auth = {'Authorization': f"Bearer {response.json()['session_token']}"}
+
+    form = {'timestamp': datetime.utcnow().isoformat()}
+    if async_kyc:
+        form['async'] = '1'
+    response = recorder.call('kyc_upload', http.post, f'{url}/api/kyc/upload', headers=auth,
+                             data=form, files={'kyc_image': ('kyc.jpg', kyc_image(voter_index), 'image/jpeg')},
+                             expect=202 if async_kyc else 200)
+    if response is None:
+        return False
+    upload = response.json()
+
+    if async_kyc:
+        while True:
+            response = recorder.call('kyc_status', http.get, f"{url}/api/kyc/status/{upload['job_id']}",
+                                     headers=auth)
+            if response is None or response.json()['status'] == 'failed':
+                return False
+            if response.json()['status'] == 'durable':
+                break
+            time.sleep(0.05)
+
+    response = recorder.call('vote_submit', http.post, f'{url}/api/vote/submit', headers=auth, json={
+        'vote_choice': CANDIDATES[voter_index % len(CANDIDATES)],
+        'kyc_image_hash': upload['image_hash'],
+        'timestamp': datetime.utcnow().isoformat()
+    })
+    return response is not None
+
+# ========== REPORT ==========
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(recorder, elapsed, voters, accepted):
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        values = sorted(recorder.latencies[endpoint])
+        if not values:
+            continue
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'errors': recorder.errors[endpoint],
+            'error_rate': recorder.errors[endpoint] / len(values),
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000
+        }
+    requests_total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'voters': voters,
+        'votes_accepted': accepted,
+        'elapsed_seconds': elapsed,
+        'voters_per_second': accepted / elapsed if elapsed else 0.0,
+        'requests_per_second': requests_total / elapsed if elapsed else 0.0,
+        'endpoints': endpoints,
+        'error_samples': recorder.error_samples
+    }
+
+def stage_summary(url, top=10):
+    """Slowest server stages by total time, from /api/metrics"""
+    try:
+        text = requests.get(f'{url}/api/metrics', timeout=10).text
+    except requests.RequestException:
+        return []
+    sums, counts = {}, {}
+    for line in text.splitlines():
+        for suffix, target in (('_sum{', sums), ('_count{', counts)):
+            prefix = 'vote_vault_stage_seconds' + suffix
+            if line.startswith(prefix):
+                labels, value = line[len(prefix):].split('} ')
+                target[labels.split('"')[1]] = float(value)
+    stages = [(stage, total, counts.get(stage, 0)) for stage, total in sums.items()]
+    return sorted(stages, key=lambda s: s[1], reverse=True)[:top]
+
+def print_report(report, stages):
+    print(f"\nVoters: {report['voters']}, accepted votes: {report['votes_accepted']}, "
+          f"elapsed: {report['elapsed_seconds']:.1f}s")
+    print(f"Throughput: {report['voters_per_second']:.1f} voters/s, "
+          f"{report['requests_per_second']:.1f} requests/s\n")
+    print(f"{'endpoint':<12} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<12} {stats['requests']:>8} {stats['error_rate']:>6.1%} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} "
+              f"{stats['max_ms']:>9.1f}")
+    for endpoint, sample in report['error_samples'].items():
+        print(f"  first {endpoint} error: {sample}")
+    if stages:
+        print("\nServer stages by total time (this process / worker only):")
+        for stage, total, count in stages:
+            mean = total / count * 1000 if count else 0.0
+            print(f"  {stage:<28} {total:>8.2f}s  {int(count):>7} calls  {mean:>8.2f} ms avg")
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end election load test')
+    parser.add_argument('--voters', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32, help='simultaneous voters')
+    parser.add_argument('--server', choices=['flask', 'launcher', 'asgi'], default='flask')
+    parser.add_argument('--workers', type=int, default=4, help='launcher.py workers')
+    parser.add_argument('--async-kyc', action='store_true', help='use async KYC uploads + status polling')
+    parser.add_argument('--url', help='target an already running server instead of starting one')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch directory')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vote-loadtest-')
+    registry = create_fixture(workdir, args.voters)
+    voters = registry.to_dict('records')
+
+    process = None
+    smtp = None
+    try:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            smtp = SMTPSink()
+            process, url = start_server(args.server, workdir, free_port(), smtp.port, args.workers)
+            print(f"Server ({args.server}) up at {url}, data in {workdir}")
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(
+                lambda item: run_voter(url, item[1], item[0], recorder, args.async_kyc),
+                enumerate(voters)
+            ))
+        elapsed = time.perf_counter() - started
+
+        report = summarize(recorder, elapsed, len(voters), sum(results))
+        report['server'] = 'external' if args.url else args.server
+        print_report(report, stage_summary(url))
+        if smtp:
+            print(f"\nSMTP sink connections: {smtp.connections}")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=60)
+        if smtp:
+            smtp.shutdown()
+        if args.keep:
+            print(f"Scratch directory kept: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
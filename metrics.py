@@ -0,0 +1,145 @@
+# metrics.py
+"""
+Low-overhead in-process metrics, exposed in Prometheus text format.
+
+    from metrics import timed
+    with timed('chain_append'):
+        ...
+
+    @timed('validate_voter')
+    def validate_voter(...): ...
+
+Every timed stage feeds one histogram family (vote_vault_stage_seconds,
+labelled by stage) and, on exception, vote_vault_stage_errors_total.
+Recording is a perf_counter() pair, a bisect and a short per-series lock.
+Values are per process (under launcher.py each worker keeps its own).
+"""
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+
+# Seconds; covers in-memory lookups up to slow SMTP round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+class Counter:
+    """Monotonic counter family, one series per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}  # label values tuple -> float
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(dict(zip(self.label_names, key)))} {value}'
+
+class Histogram:
+    """Cumulative-bucket histogram family, one series per label combination"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values tuple -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self.series.items()}
+        for key, series in sorted(snapshot.items()):
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield f'{self.name}_bucket{_format_labels({**labels, "le": bound})} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(labels)} {series[-1]}'
+            yield f'{self.name}_count{_format_labels(labels)} {cumulative}'
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'vote_vault_stage_seconds', 'Latency of internal processing stages', ('stage',)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'vote_vault_stage_errors_total', 'Processing stages that raised', ('stage',)
+)
+
+class timed(ContextDecorator):
+    """Time a stage (context manager or decorator)"""
+    def __init__(self, stage):
+        self.stage = stage
+        self._local = threading.local()
+
+    def __enter__(self):
+        # Thread-local start, so one decorator instance can be shared
+        starts = getattr(self._local, 'starts', None)
+        if starts is None:
+            starts = self._local.starts = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._local.starts.pop()
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
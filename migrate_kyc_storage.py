@@ -0,0 +1,41 @@
+# migrate_kyc_storage.py
+"""
+One-off migration of a KYC store written by earlier versions.
+
+Moves flat '<hash16>_<timestamp>.enc' images into the sharded
+<hash[0:2]>/<hash[2:4]>/<hash>.enc layout, imports their encrypted .meta
+files (and index.log) into kyc_metadata.db and removes them. The server
+never does this on its own since it rewrites the storage tree; stop the
+server, back up the directory and run:
+
+    python migrate_kyc_storage.py [--storage kyc_storage] [--dry-run]
+"""
+import sys
+import argparse
+from dotenv import load_dotenv
+
+from kyc_service import KYCService
+from security_config import SecurityConfig
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate legacy KYC storage to the sharded layout')
+    parser.add_argument('--storage', default='kyc_storage')
+    parser.add_argument('--dry-run', action='store_true', help='only count the legacy files')
+    args = parser.parse_args()
+
+    load_dotenv()
+    keys = SecurityConfig.load_keys()
+    kyc_service = KYCService(args.storage, keys['pii_encryption_key'])
+
+    legacy = kyc_service.count_legacy_files()
+    print(f"{legacy} legacy KYC files in {args.storage}")
+    if args.dry_run or not legacy:
+        return
+
+    migrated = kyc_service.migrate_legacy_layout()
+    remaining = kyc_service.count_legacy_files()
+    print(f"Migrated {migrated} images, {remaining} legacy files left")
+    sys.exit(1 if remaining else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 # otp_service.py
 import random
+import asyncio
 import hashlib
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import os
+from metrics import timed, STAGE_ERRORS
+
+try:
+    import aiosmtplib  # Optional: native asyncio SMTP for asgi_app.py
+except ImportError:
+    aiosmtplib = None
 
 class OTPService:
     def __init__(self):
@@ -50,13 +57,14 @@ class OTPService:
             'attempts': 0
         }
         
-        # Track rate limiting
-        if email not in self.rate_limit:
-            self.rate_limit[email] = []
-        self.rate_limit[email].append(datetime.now())
+        # Track rate limiting (assigned back so a shared store sees it)
+        timestamps = self.rate_limit.get(email, [])
+        timestamps.append(datetime.now())
+        self.rate_limit[email] = timestamps
         
         return True
     
+    @timed('otp_verify')
     def verify_otp(self, email, otp):
         """Verify OTP"""
         if email not in self.otp_storage:
@@ -81,104 +89,157 @@ class OTPService:
             return True, "OTP verified successfully"
         else:
             stored['attempts'] += 1
+            self.otp_storage[email] = stored
             return False, f"Invalid OTP. {self.max_attempts - stored['attempts']} attempts remaining."
     
+    def smtp_settings(self):
+        """SMTP configuration from the environment (username/password may be empty)"""
+        return {
+            'server': os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+            'port': int(os.getenv('SMTP_PORT', '587')),
+            'username': os.getenv('SMTP_USERNAME', ''),
+            'password': os.getenv('SMTP_PASSWORD', '')
+        }
+    
+    def build_otp_message(self, email, voter_name, otp, sender):
+        """Build the OTP email"""
+        # Create message
+        message = MIMEMultipart('alternative')
+        message['Subject'] = 'Your Voting OTP Code'
+        message['From'] = sender
+        message['To'] = email
+        
+        # HTML content
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; background: #f4f4f4; padding: 20px; }}
+                .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; }}
+                .header {{ text-align: center; color: #667eea; }}
+                .otp-box {{ 
+                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                    color: white; 
+                    padding: 20px; 
+                    text-align: center;
+                    font-size: 36px;
+                    letter-spacing: 8px;
+                    border-radius: 10px;
+                    margin: 20px 0;
+                    font-weight: bold;
+                }}
+                .info {{ background: #f0f8ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
+                .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <h1 class="header">🗳️ Secure Voting Portal</h1>
+                <p>Hello <strong>{voter_name}</strong>,</p>
+                <p>Your One-Time Password (OTP) for voting authentication is:</p>
+                
+                <div class="otp-box">
+                    {otp}
+                </div>
+                
+                <div class="info">
+                    <strong>⏱️ Valid for {self.otp_validity_minutes} minutes</strong><br>
+                    <small>Expires at: {(datetime.now() + timedelta(minutes=self.otp_validity_minutes)).strftime('%I:%M %p')}</small>
+                </div>
+                
+                <p>⚠️ <strong>Important Security Notes:</strong></p>
+                <ul>
+                    <li>Never share this OTP with anyone</li>
+                    <li>Our staff will never ask for your OTP</li>
+                    <li>If you didn't request this, please ignore this email</li>
+                </ul>
+                
+                <div class="footer">
+                    <hr>
+                    <p>Secure Voting System | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                    <p>This is an automated message. Please do not reply.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # Attach HTML content
+        html_part = MIMEText(html_content, 'html')
+        message.attach(html_part)
+        
+        return message
+    
+    @timed('otp_send')
     def send_otp_email(self, email, voter_name, otp):
         """Send OTP via email"""
         try:
             # Email configuration
-            smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-            smtp_port = int(os.getenv('SMTP_PORT', '587'))
-            smtp_username = os.getenv('SMTP_USERNAME', '')
-            smtp_password = os.getenv('SMTP_PASSWORD', '')
+            smtp = self.smtp_settings()
             
             # Check if email is configured
-            if not smtp_username or not smtp_password:
+            if not smtp['username'] or not smtp['password']:
                 print("⚠️  Email not configured. OTP would be sent to:", email)
                 print(f"🔐 OTP (for testing): {otp}")
                 return True, otp  # Return OTP for testing
             
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['Subject'] = 'Your Voting OTP Code'
-            message['From'] = smtp_username
-            message['To'] = email
-            
-            # HTML content
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; background: #f4f4f4; padding: 20px; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; }}
-                    .header {{ text-align: center; color: #667eea; }}
-                    .otp-box {{ 
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white; 
-                        padding: 20px; 
-                        text-align: center;
-                        font-size: 36px;
-                        letter-spacing: 8px;
-                        border-radius: 10px;
-                        margin: 20px 0;
-                        font-weight: bold;
-                    }}
-                    .info {{ background: #f0f8ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                    .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1 class="header">🗳️ Secure Voting Portal</h1>
-                    <p>Hello <strong>{voter_name}</strong>,</p>
-                    <p>Your One-Time Password (OTP) for voting authentication is:</p>
-                    
-                    <div class="otp-box">
-                        {otp}
-                    </div>
-                    
-                    <div class="info">
-                        <strong>⏱️ Valid for {self.otp_validity_minutes} minutes</strong><br>
-                        <small>Expires at: {(datetime.now() + timedelta(minutes=self.otp_validity_minutes)).strftime('%I:%M %p')}</small>
-                    </div>
-                    
-                    <p>⚠️ <strong>Important Security Notes:</strong></p>
-                    <ul>
-                        <li>Never share this OTP with anyone</li>
-                        <li>Our staff will never ask for your OTP</li>
-                        <li>If you didn't request this, please ignore this email</li>
-                    </ul>
-                    
-                    <div class="footer">
-                        <hr>
-                        <p>Secure Voting System | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        <p>This is an automated message. Please do not reply.</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Attach HTML content
-            html_part = MIMEText(html_content, 'html')
-            message.attach(html_part)
+            message = self.build_otp_message(email, voter_name, otp, smtp['username'])
             
             # Send email
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
+            with smtplib.SMTP(smtp['server'], smtp['port']) as server:
                 server.starttls()
-                server.login(smtp_username, smtp_password)
+                server.login(smtp['username'], smtp['password'])
                 server.send_message(message)
             
             print(f"✅ OTP sent successfully to {email}")
             return True, None
             
         except Exception as e:
+            STAGE_ERRORS.inc(stage='otp_send')
             print(f"❌ Error sending email: {e}")
             # For development: print OTP to console
             print(f"🔐 OTP (for testing): {otp}")
             return True, otp  # Return OTP for testing even if email fails
     
+    async def send_otp_email_async(self, email, voter_name, otp):
+        """
+        asyncio variant of send_otp_email (same return contract).
+        Awaits the SMTP conversation natively when aiosmtplib is installed,
+        otherwise runs the blocking sender on the default executor.
+        """
+        if aiosmtplib is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.send_otp_email, email, voter_name, otp
+            )
+        
+        try:
+            smtp = self.smtp_settings()
+            
+            if not smtp['username'] or not smtp['password']:
+                print("⚠️  Email not configured. OTP would be sent to:", email)
+                print(f"🔐 OTP (for testing): {otp}")
+                return True, otp
+            
+            message = self.build_otp_message(email, voter_name, otp, smtp['username'])
+            with timed('otp_send'):
+                await aiosmtplib.send(
+                    message,
+                    hostname=smtp['server'],
+                    port=smtp['port'],
+                    username=smtp['username'],
+                    password=smtp['password'],
+                    start_tls=True
+                )
+            
+            print(f"✅ OTP sent successfully to {email}")
+            return True, None
+            
+        except Exception as e:
+            print(f"❌ Error sending email: {e}")
+            print(f"🔐 OTP (for testing): {otp}")
+            return True, otp
+    
     def cleanup_expired_otps(self):
         """Clean up expired OTPs (optional maintenance)"""
         now = datetime.now()
@@ -0,0 +1,175 @@
+# profiling.py
+"""
+Opt-in, in-situ request profiling.
+
+A request is profiled with cProfile when either
+- PROFILE_REQUESTS=1 and it wins the PROFILE_SAMPLE_RATE draw, or
+- it carries `X-Profile-Token: <PROFILE_TOKEN>` (admin only; ignored when
+  PROFILE_TOKEN is unset), optionally with `X-Profile-Rate: 0.1` so a
+  proxy can tag all traffic and only a fraction is profiled.
+
+Each profile is dumped to PROFILE_DIR/<endpoint>/<time>-<ms>ms.prof
+(open with `python -m pstats` or snakeviz); the newest PROFILE_KEEP
+dumps per endpoint are kept and PROFILE_DIR/<endpoint>/hotspots.txt is
+rewritten with the top-N functions over those dumps. A vote submitted by
+a profiled request also gets its commit batch (chain append, vote store,
+Excel writes on the pipeline thread) profiled as `vote_commit_batch`.
+"""
+import os
+import io
+import hmac
+import time
+import random
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+_state = threading.local()
+
+def is_profiling():
+    """True while the current thread is inside a profiled request"""
+    return getattr(_state, 'active', False)
+
+class RequestProfiler:
+    def __init__(self, output_dir='profiles', sample_rate=0.0, token=None, keep=20, top_n=25):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.token = token
+        self.keep = keep
+        self.top_n = top_n
+        self._summary_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        enabled = os.getenv('PROFILE_REQUESTS', '0') in ('1', 'true')
+        return cls(
+            output_dir=os.getenv('PROFILE_DIR', 'profiles'),
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0.01')) if enabled else 0.0,
+            token=os.getenv('PROFILE_TOKEN') or None,
+            keep=int(os.getenv('PROFILE_KEEP', '20')),
+            top_n=int(os.getenv('PROFILE_TOP_N', '25'))
+        )
+
+    def token_matches(self, value):
+        """Constant-time check of an X-Profile-Token value (never matches when unset)"""
+        if not self.token or not value:
+            return False
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    def should_profile(self, headers):
+        """Sampling decision for one request"""
+        if self.token_matches(headers.get('X-Profile-Token')):
+            try:
+                rate = float(headers.get('X-Profile-Rate', '1'))
+            except ValueError:
+                rate = 1.0
+            return random.random() < rate
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ========== FLASK INTEGRATION ==========
+
+    def init_app(self, app):
+        from flask import g, request
+
+        @app.before_request
+        def start_profile():
+            if not self.should_profile(request.headers):
+                return
+            profiler = self._start()
+            if profiler:
+                g.profiler = profiler
+                g.profile_started = time.perf_counter()
+                _state.active = True
+
+        @app.after_request
+        def tag_profiled_response(response):
+            if 'profiler' in g:
+                response.headers['X-Profiled'] = request.endpoint or 'unmatched'
+            return response
+
+        @app.teardown_request
+        def finish_profile(exc):
+            profiler = g.pop('profiler', None)
+            if profiler is None:
+                return
+            _state.active = False
+            profiler.disable()
+            elapsed = time.perf_counter() - g.pop('profile_started')
+            self._save(profiler, request.endpoint or 'unmatched', elapsed)
+
+    # ========== PROFILING ==========
+
+    def _start(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: only one cProfile can be active per interpreter
+            return None
+        return profiler
+
+    @contextmanager
+    def profile(self, name):
+        """Profile a block outside the request thread (e.g. the commit pipeline)"""
+        profiler = self._start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                self._save(profiler, name, time.perf_counter() - started)
+
+    def _save(self, profiler, name, elapsed):
+        directory = os.path.join(self.output_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{elapsed * 1000:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(directory, filename))
+
+        with self._summary_lock:
+            dumps = sorted(f for f in os.listdir(directory) if f.endswith('.prof'))
+            for old in dumps[:-self.keep]:
+                os.remove(os.path.join(directory, old))
+            self._write_hotspots(directory, name, dumps[-self.keep:])
+
+    def _write_hotspots(self, directory, name, dumps):
+        """Top-N functions by own and cumulative time over the kept dumps"""
+        output = io.StringIO()
+        stats = pstats.Stats(*(os.path.join(directory, f) for f in dumps), stream=output)
+        output.write(f"Hotspots for {name} over the last {len(dumps)} profiled requests\n")
+        output.write(f"Updated {datetime.utcnow().isoformat()}\n\n")
+        stats.sort_stats('tottime').print_stats(self.top_n)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        with open(os.path.join(directory, 'hotspots.txt'), 'w') as f:
+            f.write(output.getvalue())
+
+    def hotspots(self, name, limit=None):
+        """Top functions (by own time) over the kept dumps of one endpoint"""
+        # Only names listed from output_dir, never a client-supplied path
+        if name not in self.profiled_endpoints():
+            return []
+        directory = os.path.join(self.output_dir, name)
+        dumps = sorted(f for f in os.listdir(directory) if f.endswith('.prof'))
+        if not dumps:
+            return []
+        stats = pstats.Stats(*(os.path.join(directory, f) for f in dumps), stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f'{function} ({os.path.basename(filename)}:{line})',
+                'calls': calls,
+                'tottime': round(tottime, 6),
+                'cumtime': round(cumtime, 6)
+            })
+        rows.sort(key=lambda row: row['tottime'], reverse=True)
+        return rows[:limit or self.top_n]
+
+    def profiled_endpoints(self):
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted(d for d in os.listdir(self.output_dir)
+                      if os.path.isdir(os.path.join(self.output_dir, d)))
+
+PROFILER = RequestProfiler.from_env()
@@ -0,0 +1,247 @@
+# results_stream.py
+"""
+Live results and turnout over Server-Sent Events (/api/results/stream).
+
+ResultsBroadcaster keeps the tally in memory. The commit pipeline calls
+record() once per committed batch (a few dict increments under a lock);
+nothing is serialized on the vote path. A ticker thread wakes every
+RESULTS_TICK_SECONDS and, if anything changed, renders ONE delta event
+and the matching snapshot event. Every connected client is handed the
+same bytes, so a tick costs one json.dumps whatever the number of
+dashboards or votes.
+
+Events:
+    event: snapshot   full state; sent on connect, or when a client fell
+                      further behind than the delta backlog
+    event: delta      {"version", "tally": {candidate: +n}, "votes_cast",
+                       "votes_delta", "eligible", "turnout"}
+    : keepalive       comment after RESULTS_KEEPALIVE_SECONDS without changes
+Event ids are <stream>-<version>: a reconnecting EventSource sends the
+last one back as Last-Event-ID and, if it reached the same process and
+the deltas are still in the backlog, only the missed ones are replayed.
+
+WSGI clients block a server thread each (iter_events); asgi_app.py serves
+the stream natively (aiter_events), which costs one coroutine per client.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+
+class ResultsBroadcaster:
+    def __init__(self, tick=1.0, keepalive=15.0, backlog=300):
+        self.tick = tick
+        self.keepalive = keepalive
+        self.tallies = {}
+        self.votes_cast = 0
+        self.eligible = 0
+        self.version = 0
+        # Optional callable -> (tallies, votes_cast), polled every tick by
+        # processes that do not commit votes themselves (launcher workers)
+        self.source = None
+        self._pending = {}
+        self._pending_votes = 0
+        self._lock = threading.Lock()
+        self._published = threading.Condition()
+        self._deltas = deque(maxlen=backlog)  # (version, event bytes)
+        self._loops = {}  # event loop -> asyncio.Event for async clients
+        self._ticker_pid = None
+        self._stream = _new_stream_id()
+        self._snapshot = self._render_snapshot()
+        self._snapshot_version = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            tick=float(os.getenv('RESULTS_TICK_SECONDS', '1.0')),
+            keepalive=float(os.getenv('RESULTS_KEEPALIVE_SECONDS', '15'))
+        )
+
+    def load(self, tallies, votes_cast, eligible):
+        """Baseline from the persisted results (startup)"""
+        with self._lock:
+            self.tallies = {name: int(count) for name, count in tallies.items()}
+            self.votes_cast = int(votes_cast)
+            self.eligible = int(eligible)
+            self._pending.clear()
+            self._pending_votes = 0
+            self.version += 1  # Connected clients get the new baseline as a snapshot
+            snapshot = self._render_snapshot()
+        self._reset_stream(snapshot, self.version)
+
+    def _reset_stream(self, snapshot, version):
+        with self._published:
+            self._deltas.clear()
+            self._snapshot, self._snapshot_version = snapshot, version
+            self._published.notify_all()
+
+    # ========== UPDATES ==========
+
+    def record(self, vote_choices):
+        """Committed votes (one candidate name per vote); called by the pipeline"""
+        with self._lock:
+            for name in vote_choices:
+                self._pending[name] = self._pending.get(name, 0) + 1
+            self._pending_votes += len(vote_choices)
+
+    def set_totals(self, tallies, votes_cast):
+        """Absolute totals from another process; the difference becomes the next delta"""
+        with self._lock:
+            self._pending = {}
+            for name in set(tallies) | set(self.tallies):
+                change = int(tallies.get(name, 0)) - self.tallies.get(name, 0)
+                if change:
+                    self._pending[name] = change
+            self._pending_votes = int(votes_cast) - self.votes_cast
+
+    def _flush(self):
+        """Fold pending changes into the tally and render the tick's events"""
+        with self._lock:
+            if not self._pending and not self._pending_votes:
+                return False
+            delta, votes_delta = self._pending, self._pending_votes
+            self._pending, self._pending_votes = {}, 0
+            for name, change in delta.items():
+                self.tallies[name] = self.tallies.get(name, 0) + change
+            self.votes_cast += votes_delta
+            self.version += 1
+            version = self.version
+            event = self._render('delta', {
+                'tally': delta,
+                'votes_cast': self.votes_cast,
+                'votes_delta': votes_delta,
+                **self._turnout()
+            })
+            snapshot = self._render_snapshot()
+
+        with self._published:
+            self._deltas.append((version, event))
+            self._snapshot, self._snapshot_version = snapshot, version
+            self._published.notify_all()
+        for loop in list(self._loops):
+            try:
+                loop.call_soon_threadsafe(self._wake_async, loop)
+            except RuntimeError:
+                self._loops.pop(loop, None)  # Loop closed
+        return True
+
+    # ========== RENDERING ==========
+
+    def _turnout(self):
+        return {
+            'eligible': self.eligible,
+            'turnout': round(self.votes_cast / self.eligible, 6) if self.eligible else 0.0
+        }
+
+    def _render(self, kind, payload):
+        data = json.dumps({'version': self.version, **payload}, separators=(',', ':'))
+        return f'id: {self._stream}-{self.version}\nevent: {kind}\ndata: {data}\n\n'.encode()
+
+    def _render_snapshot(self):
+        return self._render('snapshot', {
+            'tally': dict(self.tallies),
+            'votes_cast': self.votes_cast,
+            **self._turnout()
+        })
+
+    # ========== TICKER ==========
+
+    def _ensure_ticker(self):
+        # Started lazily and per process: launcher.py forks after import.
+        # Each process numbers its own ticks, so it also gets its own
+        # stream id and never replays deltas for another process's ids.
+        with self._lock:
+            if self._ticker_pid == os.getpid():
+                return
+            self._ticker_pid = os.getpid()
+            self._stream = _new_stream_id()
+            snapshot = self._render_snapshot()
+        self._reset_stream(snapshot, self.version)
+        threading.Thread(target=self._run_ticker, name='results-ticker', daemon=True).start()
+
+    def _run_ticker(self):
+        while True:
+            time.sleep(self.tick)
+            try:
+                if self.source:
+                    totals = self.source()
+                    if totals:
+                        self.set_totals(*totals)
+                self._flush()
+            except Exception as e:
+                print(f"Error in results ticker: {e}")
+
+    # ========== SUBSCRIBERS ==========
+
+    def _backlog_since(self, last_version):
+        """
+        Events taking a client from last_version to now, and the version
+        they end at (caller holds _published)
+        """
+        latest = self._snapshot_version
+        if last_version == latest:
+            return [], latest
+        if (last_version is None or last_version > latest or not self._deltas
+                or last_version < self._deltas[0][0] - 1):
+            return [self._snapshot], latest
+        return [event for version, event in self._deltas if version > last_version], latest
+
+    def _parse_event_id(self, value):
+        """Last-Event-ID -> version, or None unless it is from this stream"""
+        stream, _, version = (value or '').rpartition('-')
+        if stream != self._stream or not version.isdigit():
+            return None
+        return int(version)
+
+    def iter_events(self, last_event_id=None):
+        """Blocking SSE byte stream (WSGI)"""
+        self._ensure_ticker()
+        last_version = self._parse_event_id(last_event_id)
+        yield f'retry: {int(self.tick * 1000) + 1000}\n\n'.encode()
+        while True:
+            with self._published:
+                events, version = self._backlog_since(last_version)
+                if not events:
+                    self._published.wait(self.keepalive)
+                    events, version = self._backlog_since(last_version)
+            if events:
+                last_version = version
+                yield b''.join(events)
+            else:
+                yield b': keepalive\n\n'
+
+    def _wake_async(self, loop):
+        # Runs on the loop's own thread; the next waiters get a fresh Event
+        event = self._loops.get(loop)
+        if event is not None:
+            self._loops[loop] = asyncio.Event()
+            event.set()
+
+    async def aiter_events(self, last_event_id=None):
+        """Non-blocking SSE byte stream (asyncio)"""
+        self._ensure_ticker()
+        loop = asyncio.get_running_loop()
+        last_version = self._parse_event_id(last_event_id)
+        yield f'retry: {int(self.tick * 1000) + 1000}\n\n'.encode()
+        while True:
+            with self._published:
+                events, version = self._backlog_since(last_version)
+            if not events:
+                # One Event per loop: all of its clients wake on the same set()
+                event = self._loops.setdefault(loop, asyncio.Event())
+                # Re-check: a tick may have landed before the Event was registered
+                with self._published:
+                    events, version = self._backlog_since(last_version)
+                if not events:
+                    try:
+                        await asyncio.wait_for(event.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        yield b': keepalive\n\n'
+                    continue
+            last_version = version
+            yield b''.join(events)
+
+def _new_stream_id():
+    return f'{os.getpid():x}{int(time.time() * 1000):x}'
@@ -0,0 +1,342 @@
+# sharding.py
+"""
+Sharded deployment: voters partitioned by voter_id_hash across N nodes.
+
+Each shard node is an ordinary server (app.py, or launcher.py for several
+workers) running in its own directory, so it has its own registry slice,
+chain, vote store, workbooks and session / anti-replay state. A voter
+only exists in one shard's registry, so double voting across shards is
+impossible without any cross-shard coordination on the vote path.
+
+The coordinator only anchors: every ANCHOR_INTERVAL seconds it reads each
+shard's chain head (/api/chain/head) and, when a head moved, appends one
+block listing the shard heads to the root chain (root_chain.json, itself a
+TamperEvidenceChain). Global integrity = a valid root chain + every shard
+chain valid + each shard's last anchored head still being the block at
+that height (/api/chain/blocks/<n>), i.e. no shard rewrote anchored history.
+
+    python sharding.py split --shards 3 --registry voter_registry.xlsx --dir shards
+    python sharding.py run --dir shards --base-port 5100 [--workers 2]
+
+`run` starts every shard node as a local process (ports base+1..base+N)
+and serves the coordinator on the base port:
+    GET  /api/shards                      shard map
+    GET  /api/shards/lookup/<voter_id_hash>  which node serves a voter
+    GET  /api/root/head                   latest anchor
+    POST /api/root/anchor                 anchor now (X-Anchor-Token: <ANCHOR_TOKEN>)
+    GET  /api/root/verify                 global integrity check
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+import requests
+
+from blockchain_lite import TamperEvidenceChain
+
+MANIFEST = 'shards.json'
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def shard_for(voter_id_hash, shard_count):
+    """Shard owning a voter (voter_id_hash is uniform, so the prefix is too)"""
+    return int(voter_id_hash[:16], 16) % shard_count
+
+def shard_for_voter(voter_id, shard_count):
+    return shard_for(hashlib.sha256(str(voter_id).encode()).hexdigest(), shard_count)
+
+# ========== SPLIT ==========
+
+def split_registry(registry_path, shard_count, output_dir, candidates_path='candidates.xlsx'):
+    """
+    Write one node directory per shard: registry slice (+ fast snapshot),
+    candidates with zeroed counts and the shared keys file
+    Returns: the manifest dict (also written to output_dir/shards.json)
+    """
+    import pandas as pd
+    from excel_manager import read_voter_registry, registry_snapshot_path
+
+    registry = read_voter_registry(registry_path)
+    if 'voter_id_hash' not in registry.columns:
+        registry['voter_id_hash'] = [hashlib.sha256(str(v).encode()).hexdigest()
+                                     for v in registry['VoterID']]
+    shard_ids = registry['voter_id_hash'].map(lambda h: shard_for(h, shard_count))
+
+    candidates = pd.read_excel(candidates_path, engine='openpyxl')
+    candidates['VoteCount'] = 0  # Each shard counts its own votes
+
+    manifest = {'shard_count': shard_count, 'created': datetime.utcnow().isoformat(), 'shards': []}
+    for shard in range(shard_count):
+        directory = os.path.join(output_dir, f'shard-{shard}')
+        os.makedirs(directory, exist_ok=True)
+        part = registry[shard_ids == shard].reset_index(drop=True)
+        part_path = os.path.join(directory, 'voter_registry.xlsx')
+        part.to_excel(part_path, index=False, engine='openpyxl')
+        part.to_pickle(registry_snapshot_path(part_path))
+        candidates.to_excel(os.path.join(directory, 'candidates.xlsx'), index=False, engine='openpyxl')
+        # One key set for all shards, so any shard's votes decrypt with it
+        if os.path.exists('.env.keys'):
+            shutil.copy2('.env.keys', os.path.join(directory, '.env.keys'))
+        manifest['shards'].append({'id': shard, 'dir': f'shard-{shard}', 'voters': len(part)})
+        print(f"  shard {shard}: {len(part):,} voters")
+
+    with open(os.path.join(output_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# ========== COORDINATOR ==========
+
+class ShardCoordinator:
+    """Anchors shard chain heads into a root chain and checks them"""
+    def __init__(self, shard_urls, root_chain_path='root_chain.json', interval=10.0,
+                 token=None):
+        self.shard_urls = shard_urls  # shard id -> base URL
+        self.root = TamperEvidenceChain(root_chain_path)
+        self.interval = interval
+        # Admin token for POST /api/root/anchor (disabled when unset)
+        self.token = token if token is not None else os.getenv('ANCHOR_TOKEN') or None
+        self._anchor_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def token_matches(self, value):
+        """Constant-time check of an X-Anchor-Token value (never matches when unset)"""
+        if not self.token or not value:
+            return False
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    def fetch_heads(self):
+        """shard id -> head dict ({'error': ...} if unreachable)"""
+        heads = {}
+        for shard, url in self.shard_urls.items():
+            try:
+                response = requests.get(f'{url}/api/chain/head', timeout=5)
+                response.raise_for_status()
+                heads[shard] = response.json()
+            except (requests.RequestException, ValueError) as e:
+                heads[shard] = {'error': str(e)}
+        return heads
+
+    def anchored_heads(self):
+        """shard id -> latest anchored {'length', 'head_hash', 'root_block'}"""
+        latest = {}
+        for block in self.root.chain:
+            data = block['data']
+            if isinstance(data, dict) and data.get('type') == 'shard_anchor':
+                for head in data['shards']:
+                    latest[head['shard']] = {'length': head['length'], 'head_hash': head['head_hash'],
+                                             'root_block': block['index']}
+        return latest
+
+    def anchor_once(self):
+        """
+        Anchor every reachable shard whose head moved since its last anchor
+        Returns: (anchored, root block hash or None)
+        """
+        with self._anchor_lock:
+            anchored = self.anchored_heads()
+            changed = []
+            for shard, head in sorted(self.fetch_heads().items()):
+                if 'error' in head:
+                    print(f"Anchor: shard {shard} unreachable ({head['error']})")
+                    continue
+                previous = anchored.get(shard)
+                if previous and previous['head_hash'] == head['head_hash']:
+                    continue
+                changed.append({'shard': shard, 'length': head['length'], 'head_hash': head['head_hash']})
+            if not changed:
+                return False, None
+            block_hash = self.root.add_vote_record({
+                'type': 'shard_anchor',
+                'shards': changed,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+            return True, block_hash
+
+    def verify(self):
+        """Global integrity: root chain, each shard chain, anchored heads unchanged"""
+        root_valid, root_error = self.root.verify_chain_integrity()
+        report = {'root': {'valid': root_valid, 'error_at_block': root_error,
+                           'total_blocks': len(self.root.chain)},
+                  'shards': {}}
+        anchored = self.anchored_heads()
+
+        for shard, url in sorted(self.shard_urls.items()):
+            result = {'anchor': anchored.get(shard)}
+            try:
+                chain = requests.get(f'{url}/api/chain/verify', timeout=60).json()
+                result['chain_valid'] = chain['valid']
+                result['total_blocks'] = chain['total_blocks']
+                anchor = anchored.get(shard)
+                if anchor:
+                    response = requests.get(f"{url}/api/chain/blocks/{anchor['length'] - 1}", timeout=5)
+                    result['anchor_matches'] = (response.status_code == 200 and
+                                                response.json()['hash'] == anchor['head_hash'])
+                else:
+                    result['anchor_matches'] = None  # Nothing anchored yet
+            except (requests.RequestException, ValueError, KeyError) as e:
+                result['error'] = str(e)
+            report['shards'][shard] = result
+
+        report['valid'] = root_valid and all(
+            'error' not in result and result['chain_valid'] and result['anchor_matches'] is not False
+            for result in report['shards'].values()
+        )
+        return report
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.anchor_once()
+            except Exception as e:
+                print(f"Error anchoring shard heads: {e}")
+
+    def start(self):
+        threading.Thread(target=self.run, name='shard-anchor', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+def create_coordinator_app(coordinator):
+    from flask import Flask, jsonify, request
+
+    app = Flask(__name__)
+
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        return jsonify({'status': 'ok', 'role': 'coordinator'}), 200
+
+    @app.route('/api/shards', methods=['GET'])
+    def shard_map():
+        return jsonify({'shard_count': len(coordinator.shard_urls),
+                        'shards': coordinator.shard_urls}), 200
+
+    @app.route('/api/shards/lookup/<voter_id_hash>', methods=['GET'])
+    def shard_lookup(voter_id_hash):
+        try:
+            shard = shard_for(voter_id_hash, len(coordinator.shard_urls))
+        except ValueError:
+            return jsonify({'error': 'Invalid voter_id_hash'}), 400
+        return jsonify({'shard': shard, 'url': coordinator.shard_urls[shard]}), 200
+
+    @app.route('/api/root/head', methods=['GET'])
+    def root_head():
+        head = coordinator.root.chain[-1]
+        return jsonify({'length': len(coordinator.root.chain), 'head_hash': head['hash'],
+                        'anchored': coordinator.anchored_heads()}), 200
+
+    @app.route('/api/root/anchor', methods=['POST'])
+    def root_anchor():
+        # Each anchor appends a root block; the interval loop needs no token
+        if not coordinator.token_matches(request.headers.get('X-Anchor-Token')):
+            return jsonify({'error': 'Forbidden'}), 403
+        anchored, block_hash = coordinator.anchor_once()
+        return jsonify({'anchored': anchored, 'block_hash': block_hash}), 200
+
+    @app.route('/api/root/verify', methods=['GET'])
+    def root_verify():
+        report = coordinator.verify()
+        return jsonify(report), 200 if report['valid'] else 409
+
+    return app
+
+# ========== LOCAL RUNNER ==========
+
+def start_shard_node(directory, shard, host, port, workers):
+    """One shard node as a child process serving from its own directory"""
+    env = dict(os.environ,
+               PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''),
+               SHARD_ID=str(shard), STATIC_ROOT=REPO_DIR)
+    geoip_csv = os.path.join(REPO_DIR, os.getenv('GEOIP_CSV', 'geoip.csv'))
+    if os.path.exists(geoip_csv):
+        env['GEOIP_CSV'] = geoip_csv
+    if workers:
+        command = [sys.executable, os.path.join(REPO_DIR, 'launcher.py'),
+                   '--host', host, '--port', str(port), '--workers', str(workers)]
+    else:
+        command = [sys.executable, '-c',
+                   f"import app; app.app.run(host='{host}', port={port}, threaded=True)"]
+    log = open(os.path.join(directory, 'node.log'), 'ab')
+    return subprocess.Popen(command, cwd=directory, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def wait_until_ready(url, process, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(f'{url}/api/ready', timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    return False
+
+def run_local(output_dir, host, base_port, workers, interval):
+    with open(os.path.join(output_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    processes = []
+    shard_urls = {}
+    try:
+        for entry in manifest['shards']:
+            port = base_port + 1 + entry['id']
+            directory = os.path.join(output_dir, entry['dir'])
+            process = start_shard_node(directory, entry['id'], host, port, workers)
+            processes.append(process)
+            shard_urls[entry['id']] = f'http://{host}:{port}'
+
+        for (shard, url), process in zip(shard_urls.items(), processes):
+            if not wait_until_ready(url, process):
+                raise RuntimeError(f"Shard {shard} did not start, see "
+                                   f"{os.path.join(output_dir, f'shard-{shard}', 'node.log')}")
+            print(f"✓ Shard {shard} ready at {url}")
+
+        coordinator = ShardCoordinator(shard_urls, os.path.join(output_dir, 'root_chain.json'), interval)
+        coordinator.anchor_once()
+        coordinator.start()
+        print(f"✓ Coordinator on http://{host}:{base_port} (anchoring every {interval:g}s)")
+        create_coordinator_app(coordinator).run(host=host, port=base_port, threaded=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded deployment tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    split = commands.add_parser('split', help='partition a registry into shard node directories')
+    split.add_argument('--shards', type=int, required=True)
+    split.add_argument('--registry', default='voter_registry.xlsx')
+    split.add_argument('--candidates', default='candidates.xlsx')
+    split.add_argument('--dir', default='shards')
+
+    run = commands.add_parser('run', help='run every shard node locally plus the coordinator')
+    run.add_argument('--dir', default='shards')
+    run.add_argument('--host', default='127.0.0.1')
+    run.add_argument('--base-port', type=int, default=5100)
+    run.add_argument('--workers', type=int, default=0, help='launcher.py workers per shard (0: single process)')
+    run.add_argument('--interval', type=float, default=float(os.getenv('ANCHOR_INTERVAL', '10')))
+
+    args = parser.parse_args()
+    if args.command == 'split':
+        print(f"Splitting {args.registry} into {args.shards} shards under {args.dir}/")
+        split_registry(args.registry, args.shards, args.dir, args.candidates)
+        print(f"✓ Manifest written to {os.path.join(args.dir, MANIFEST)}")
+    else:
+        run_local(args.dir, args.host, args.base_port, args.workers, args.interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# shared_state.py
+import os
+import pickle
+import sqlite3
+import threading
+from collections.abc import MutableMapping, MutableSet
+
+class SharedStateStore:
+    """
+    SQLite-backed key/value namespaces shared by all worker processes.
+    Used by launcher.py to replace the in-memory dicts/sets of the
+    services (sessions, OTPs, anti-replay, KYC jobs) so any worker can
+    serve any step of a multi-request flow. Values are pickled (the file
+    is server-local and never holds client-supplied pickles).
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS shared_state (
+            namespace TEXT NOT NULL,
+            key       TEXT NOT NULL,
+            value     BLOB NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(self.SCHEMA)
+
+    def _conn(self):
+        """One connection per thread and process (never reused across fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def dict(self, namespace):
+        return SharedDict(self, namespace)
+
+    def set(self, namespace):
+        return SharedSet(self, namespace)
+
+    def clear(self, namespace):
+        self._conn().execute('DELETE FROM shared_state WHERE namespace = ?', (namespace,))
+
+class SharedDict(MutableMapping):
+    """
+    Dict view of one namespace. Values are copies: mutate, then assign
+    back (d[k] = v) for the change to be visible to other processes.
+    """
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+
+    def __getitem__(self, key):
+        row = self.store._conn().execute(
+            'SELECT value FROM shared_state WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def __setitem__(self, key, value):
+        self.store._conn().execute(
+            'INSERT OR REPLACE INTO shared_state (namespace, key, value) VALUES (?, ?, ?)',
+            (self.namespace, key, pickle.dumps(value))
+        )
+
+    def __delitem__(self, key):
+        cursor = self.store._conn().execute(
+            'DELETE FROM shared_state WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.store._conn().execute(
+            'SELECT 1 FROM shared_state WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        rows = self.store._conn().execute(
+            'SELECT key FROM shared_state WHERE namespace = ?', (self.namespace,)
+        ).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        return self.store._conn().execute(
+            'SELECT COUNT(*) FROM shared_state WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+
+    def items(self):
+        rows = self.store._conn().execute(
+            'SELECT key, value FROM shared_state WHERE namespace = ?', (self.namespace,)
+        ).fetchall()
+        return [(key, pickle.loads(value)) for key, value in rows]
+
+class SharedSet(MutableSet):
+    """Set view of one namespace (members stored as keys)"""
+    def __init__(self, store, namespace):
+        self.members = SharedDict(store, namespace)
+
+    def __contains__(self, member):
+        return member in self.members
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, member):
+        self.members[member] = True
+
+    def discard(self, member):
+        self.members.pop(member, None)
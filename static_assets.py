@@ -0,0 +1,138 @@
+# static_assets.py
+import re
+import gzip
+import hashlib
+import mimetypes
+import os
+from flask import Response
+
+try:
+    import brotli  # Optional: br variants are skipped without it
+except ImportError:
+    brotli = None
+
+# Only these files are ever served from the working directory
+STATIC_ASSETS = [
+    'login.html',
+    'voting.html',
+    'vote.html',
+    'verfication.html',
+    'styles.css',
+    'auth.js',
+    'kyc.js'
+]
+
+# Versioned sub-resources never change under a given URL
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Pages (and unversioned URLs) are revalidated every time, answered with 304
+REVALIDATE_CACHE = 'no-cache'
+
+class StaticAssetCache:
+    """
+    Allow-listed static assets preloaded into memory.
+
+    At startup every asset is read once, its gzip (and brotli, if
+    available) variant is precomputed and a content-hash ETag assigned.
+    HTML pages have their script/stylesheet references rewritten to
+    `name?v=<hash>`, so those URLs can be cached for a year while the
+    pages themselves are revalidated with a cheap 304.
+    """
+    def __init__(self, root='.', assets=None, min_compress_bytes=256):
+        self.root = root
+        self.allowed = list(assets or STATIC_ASSETS)
+        self.min_compress_bytes = min_compress_bytes
+        self.assets = {}  # name -> asset dict
+        self.load()
+
+    def load(self):
+        """(Re)build the cache from disk"""
+        contents = {}
+        for name in self.allowed:
+            path = os.path.join(self.root, name)
+            if not os.path.isfile(path):
+                print(f"Warning: static asset {name} not found, skipping")
+                continue
+            with open(path, 'rb') as f:
+                contents[name] = f.read()
+
+        # Version sub-resources first, so pages can reference their hashes
+        versions = {name: hashlib.sha256(body).hexdigest()[:16]
+                    for name, body in contents.items() if not name.endswith('.html')}
+
+        assets = {}
+        for name, body in contents.items():
+            if name.endswith('.html'):
+                body = self._version_references(body, versions)
+            assets[name] = self._build_asset(name, body)
+        self.assets = assets
+        print(f"✓ Loaded {len(assets)} static assets")
+
+    def _version_references(self, html, versions):
+        """Rewrite src/href="name" to src/href="name?v=<hash>" for cached assets"""
+        def replace(match):
+            name = match.group(2).decode()
+            if name not in versions:
+                return match.group(0)
+            return match.group(1) + f'{name}?v={versions[name]}"'.encode()
+        return re.sub(rb'((?:src|href)=")([^"?#]+)"', replace, html)
+
+    def _build_asset(self, name, body):
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        mimetype, _ = mimetypes.guess_type(name)
+        mimetype = mimetype or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype.endswith('javascript'):
+            mimetype += '; charset=utf-8'
+
+        variants = {'identity': body}
+        if len(body) >= self.min_compress_bytes:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    variants['br'] = compressed
+
+        return {
+            'version': digest,
+            'mimetype': mimetype,
+            'page': name.endswith('.html'),
+            'variants': variants,
+            'etags': {encoding: f'{digest}-{encoding}' if encoding != 'identity' else digest
+                      for encoding in variants}
+        }
+
+    def _choose_encoding(self, asset, accept_encodings):
+        """Smallest variant the client accepts"""
+        best = 'identity'
+        for encoding in ('br', 'gzip'):
+            if encoding in asset['variants'] and accept_encodings[encoding] > 0:
+                if len(asset['variants'][encoding]) < len(asset['variants'][best]):
+                    best = encoding
+        return best
+
+    def response(self, name, request):
+        """
+        Flask response for an asset, or None if it is not allow-listed
+        Honours Accept-Encoding and If-None-Match
+        """
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        encoding = self._choose_encoding(asset, request.accept_encodings)
+        etag = asset['etags'][encoding]
+        versioned = not asset['page'] and request.args.get('v') == asset['version']
+
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE if versioned else REVALIDATE_CACHE,
+            'Vary': 'Accept-Encoding',
+            'ETag': f'"{etag}"'
+        }
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(asset['variants'][encoding], status=200, headers=headers,
+                        content_type=asset['mimetype'])
@@ -0,0 +1,144 @@
+# stress_test_votes.py
+"""
+Concurrency stress test for the vote path.
+
+Creates a throwaway registry, then has N concurrent clients hammer the
+vote path (each voter submits several times at once, half through the
+commit pipeline and half through VoteProcessor.process_vote directly).
+Afterwards it checks there are no double votes and no lost updates:
+exactly one vote per voter, a valid chain with contiguous indexes, and
+matching vote store, registry, vote records and candidate counts.
+
+Usage: python stress_test_votes.py [--voters 200] [--attempts 4] [--threads 32]
+"""
+import os
+import sys
+import argparse
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from cryptography.fernet import Fernet
+
+from auth_service import VoterAuthService
+from blockchain_lite import TamperEvidenceChain
+from vote_service import VoteProcessor
+from vote_store import EncryptedVoteStore
+from vote_pipeline import VoteCommitPipeline
+from excel_manager import ExcelManager
+from anti_replay import AntiReplayProtection
+
+CANDIDATES = ['Candidate A', 'Candidate B', 'Candidate C']
+
+def create_fixture(workdir, voters):
+    registry = pd.DataFrame({
+        'VoterID': [f'S{i:06d}' for i in range(voters)],
+        'Name': [f'Stress Voter {i}' for i in range(voters)],
+        'DOB': ['1990-01-01'] * voters,
+        'Email': [f'voter{i}@example.com' for i in range(voters)],
+        'HasVoted': [False] * voters
+    })
+    registry.to_excel(os.path.join(workdir, 'voter_registry.xlsx'), index=False, engine='openpyxl')
+    pd.DataFrame({
+        'CandidateID': [f'C{i:03d}' for i in range(len(CANDIDATES))],
+        'CandidateName': CANDIDATES,
+        'PoliticalParty': ['Independent'] * len(CANDIDATES),
+        'VoteCount': [0] * len(CANDIDATES)
+    }).to_excel(os.path.join(workdir, 'candidates.xlsx'), index=False, engine='openpyxl')
+    return registry
+
+def main():
+    parser = argparse.ArgumentParser(description='Vote path concurrency stress test')
+    parser.add_argument('--voters', type=int, default=200)
+    parser.add_argument('--attempts', type=int, default=4, help='concurrent submits per voter')
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vote-stress-')
+    path = lambda name: os.path.join(workdir, name)
+    registry = create_fixture(workdir, args.voters)
+
+    key = Fernet.generate_key()
+    auth_service = VoterAuthService(path('voter_registry.xlsx'), key)
+    tamper_chain = TamperEvidenceChain(path('vote_chain.json'))
+    vote_store = EncryptedVoteStore(path('vote_store.dat'))
+    vote_processor = VoteProcessor(auth_service, None, tamper_chain, vote_store=vote_store)
+    excel_manager = ExcelManager(path('voter_registry.xlsx'), path('vote_records.xlsx'),
+                                 path('candidates.xlsx'))
+    excel_manager.load_voter_registry()
+    excel_manager.load_candidates()
+    excel_manager.load_vote_records()
+    anti_replay = AntiReplayProtection()
+    pipeline = VoteCommitPipeline(vote_processor, tamper_chain, anti_replay, excel_manager)
+
+    # Log every voter in
+    sessions = []
+    for _, voter in registry.iterrows():
+        _, temp_token, _ = auth_service.validate_voter(voter['VoterID'], voter['DOB'], voter['Email'])
+        _, session_token, _ = auth_service.complete_login_after_otp(temp_token)
+        sessions.append(session_token)
+
+    successes = {}
+    successes_lock = threading.Lock()
+
+    def submit(job):
+        voter_index, attempt = job
+        session_token = sessions[voter_index]
+        choice = CANDIDATES[voter_index % len(CANDIDATES)]
+        timestamp = datetime.utcnow().isoformat()
+        if attempt % 2 == 0:
+            ok, prepared = vote_processor.prepare_vote(session_token, choice, 'ab' * 32, '127.0.0.1')
+            if ok:
+                nonce = anti_replay.generate_nonce(prepared['voter_id'], timestamp)
+                ok, _ = pipeline.submit(prepared, nonce, timestamp).result(timeout=60)
+        else:
+            ok, _ = vote_processor.process_vote(session_token, choice, 'ab' * 32, '127.0.0.1')
+        if ok:
+            with successes_lock:
+                successes[voter_index] = successes.get(voter_index, 0) + 1
+
+    jobs = [(v, a) for a in range(args.attempts) for v in range(args.voters)]
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(submit, jobs))
+    pipeline.stop()
+
+    failures = []
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    doubles = [v for v, count in successes.items() if count > 1]
+    check(not doubles, f"{len(doubles)} voters voted more than once")
+    check(len(successes) == args.voters, f"{args.voters - len(successes)} voters lost their vote")
+
+    is_valid, error_index = tamper_chain.verify_chain_integrity()
+    check(is_valid, f"chain integrity broken at block {error_index}")
+    indexes = [block['index'] for block in tamper_chain.chain]
+    check(indexes == list(range(len(indexes))), "chain indexes are not contiguous")
+    check(len(tamper_chain.chain) - 1 == args.voters,
+          f"chain has {len(tamper_chain.chain) - 1} vote blocks, expected {args.voters}")
+    on_disk = TamperEvidenceChain(path('vote_chain.json')).chain
+    check(len(on_disk) == len(tamper_chain.chain), "saved chain is missing blocks")
+
+    voter_hashes = {hashlib.sha256(v.encode()).hexdigest() for v in registry['VoterID']}
+    check(set(vote_store.keys()) == voter_hashes, "vote store does not match voters")
+
+    # Only pipeline commits touch the workbooks; direct process_vote does not
+    pipeline_votes = len(pd.read_excel(path('vote_records.xlsx')))
+    counted = int(pd.read_excel(path('candidates.xlsx'))['VoteCount'].sum())
+    marked = int(pd.read_excel(path('voter_registry.xlsx'))['HasVoted'].sum())
+    check(counted == pipeline_votes, f"candidate counts {counted} != vote records {pipeline_votes}")
+    check(marked == pipeline_votes, f"registry HasVoted {marked} != vote records {pipeline_votes}")
+
+    print(f"Voters: {args.voters}, attempts: {len(jobs)}, accepted: {sum(successes.values())}, "
+          f"via pipeline: {pipeline_votes}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: no double votes, no lost updates")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# tests/conftest.py
+import io
+import os
+import sys
+import shutil
+import hashlib
+import pytest
+from cryptography.fernet import Fernet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kyc_service import KYCService  # noqa: E402
+
+# Data files app.py loads from the working directory
+APP_DATA_FILES = ['voter_registry.xlsx', 'candidates.xlsx', 'vote_records.xlsx', 'vote_chain.json']
+KYC_MAX_UPLOAD_BYTES = 100 * 1024
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """app.py imported inside a scratch copy of the data files"""
+    workdir = tmp_path_factory.mktemp('server')
+    for name in APP_DATA_FILES:
+        shutil.copy(os.path.join(ROOT, name), workdir)
+    os.makedirs(workdir / 'kyc_storage')
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(workdir)
+        mp.setenv('KYC_MAX_UPLOAD_BYTES', str(KYC_MAX_UPLOAD_BYTES))
+        mp.setenv('STATIC_ROOT', ROOT)
+        import app
+        assert app.warmup.wait(timeout=60), app.warmup.status()
+        yield app
+        app.vote_pipeline.stop(5)
+
+@pytest.fixture(scope='session')
+def client(server):
+    return server.app.test_client()
+
+def login(server, index):
+    """Session token for the registry row at index (skips the OTP email)"""
+    voter = server.auth_service.voter_db.iloc[index]
+    ok, temp_token, info = server.auth_service.validate_voter(
+        voter['VoterID'], voter['DOB'], voter['Email'])
+    assert ok, info
+    ok, session_token, _ = server.auth_service.complete_login_after_otp(temp_token)
+    assert ok
+    return session_token
+
+def sha256_hex(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+@pytest.fixture
+def kyc_service(tmp_path):
+    return KYCService(str(tmp_path / 'kyc_storage'), Fernet.generate_key(),
+                      max_upload_bytes=8 * 1024 * 1024)
+
+def jpeg_bytes(size=(2400, 1800)):
+    from PIL import Image
+    output = io.BytesIO()
+    Image.linear_gradient('L').resize(size).convert('RGB').save(output, format='JPEG', quality=95)
+    return output.getvalue()
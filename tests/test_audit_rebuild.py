@@ -0,0 +1,107 @@
+# tests/test_audit_rebuild.py
+import os
+import sys
+import json
+import hashlib
+import subprocess
+import pandas as pd
+import pytest
+from cryptography.fernet import Fernet
+from blockchain_lite import TamperEvidenceChain
+from vote_store import EncryptedVoteStore
+from security_config import SecurityConfig
+from conftest import ROOT, sha256_hex
+
+VOTERS = [('V001', 'John Doe', 'Alpha'), ('V002', 'Jane Smith', 'Beta'), ('V003', 'Bob Johnson', 'Alpha')]
+DERIVED_FILES = ['vote_records.xlsx', 'candidates.xlsx', 'voter_registry.xlsx']
+
+@pytest.fixture
+def election(tmp_path, monkeypatch):
+    """
+    Three recorded votes on the chain and in consistent workbooks; V001's
+    vote predates the encrypted vote store, so only V002/V003 are stored
+    Returns: function storing the missing vote
+    """
+    monkeypatch.chdir(tmp_path)
+    cipher = Fernet(SecurityConfig.generate_keys()['session_key'])
+
+    chain = TamperEvidenceChain('vote_chain.json')
+    block_hashes = chain.append_vote_records([{
+        'voter_id_hash': sha256_hex(voter_id),
+        'vote_hash': sha256_hex(choice + voter_id),
+        'kyc_image_hash': sha256_hex('kyc' + voter_id),
+        'timestamp': '2025-11-01T10:00:00',
+        'geolocation': {'city': 'Pune', 'country': 'India'}
+    } for voter_id, _, choice in VOTERS])
+
+    pd.DataFrame([{
+        'VoterID': voter_id, 'VoterName': name, 'CandidateVoted': choice,
+        'Timestamp': '2025-11-01 10:00:00', 'IPAddress': '10.0.0.1',
+        'GeolocationCity': 'Pune', 'GeolocationCountry': 'India', 'VotedStatus': True,
+        'KYCImageHash': sha256_hex('kyc' + voter_id), 'BlockHash': block_hash,
+        'VoteHash': sha256_hex(choice + voter_id)
+    } for (voter_id, name, choice), block_hash in zip(VOTERS, block_hashes)]).to_excel(
+        'vote_records.xlsx', index=False)
+    pd.DataFrame({'CandidateID': ['C1', 'C2'], 'CandidateName': ['Alpha', 'Beta'],
+                  'PoliticalParty': ['P1', 'P2'], 'PartySymbol': ['S1', 'S2'],
+                  'VoteCount': [2, 1], 'Slogan': ['s1', 's2']}).to_excel('candidates.xlsx', index=False)
+    pd.DataFrame({'VoterID': ['V001', 'V002', 'V003', 'V004'],
+                  'Name': ['John Doe', 'Jane Smith', 'Bob Johnson', 'Alice Brown'],
+                  'DOB': ['1990-01-15'] * 4, 'Email': ['x@example.com'] * 4,
+                  'Phone': ['1'] * 4, 'Address': ['a'] * 4,
+                  'HasVoted': [True, True, True, False]}).to_excel('voter_registry.xlsx', index=False)
+
+    def store_vote(index):
+        voter_id, name, choice = VOTERS[index]
+        store = EncryptedVoteStore('vote_store.dat')
+        store[sha256_hex(voter_id)] = cipher.encrypt(json.dumps({
+            'voter_id': voter_id, 'voter_name': name, 'vote_choice': choice,
+            'timestamp': '2025-11-01T10:00:00', 'block_hash': block_hashes[index]
+        }).encode())
+        store.close()
+
+    store_vote(1)
+    store_vote(2)
+    return store_vote
+
+def run_audit(*args):
+    return subprocess.run([sys.executable, os.path.join(ROOT, 'audit_rebuild.py'),
+                           '--workers', '1', *args], capture_output=True, text=True)
+
+def digests():
+    return {name: hashlib.sha256(open(name, 'rb').read()).hexdigest() for name in DERIVED_FILES}
+
+def test_apply_refuses_when_chain_votes_are_not_in_the_store(election):
+    before = digests()
+    result = run_audit('--apply')
+
+    assert result.returncode == 2, result.stdout + result.stderr
+    assert 'chain_without_vote' in result.stdout
+    assert digests() == before
+    assert not any(os.path.exists(name + '.bak') for name in DERIVED_FILES)
+    # The already-counted voter must stay marked as voted
+    assert bool(pd.read_excel('voter_registry.xlsx').set_index('VoterID').loc['V001', 'HasVoted'])
+
+def test_apply_repairs_drift_when_sources_are_consistent(election):
+    election(0)
+    assert run_audit().returncode == 0
+
+    # Drop one record row and a HasVoted update, as a failed workbook write would
+    records = pd.read_excel('vote_records.xlsx')
+    records.drop(index=1).to_excel('vote_records.xlsx', index=False)
+    registry = pd.read_excel('voter_registry.xlsx')
+    registry.loc[2, 'HasVoted'] = False
+    registry.to_excel('voter_registry.xlsx', index=False)
+
+    report = run_audit('--json', 'report.json')
+    assert report.returncode == 1
+    with open('report.json') as f:
+        drift = json.load(f)
+    assert [entry['VoterID'] for entry in drift['vote_records']['missing']] == ['V002']
+    assert drift['registry'] == [{'VoterID': 'V003', 'recorded': False, 'rebuilt': True}]
+
+    assert run_audit('--apply').returncode == 0
+    assert run_audit().returncode == 0
+    rebuilt = pd.read_excel('vote_records.xlsx')
+    assert list(rebuilt['VoterID']) == ['V001', 'V002', 'V003']
+    assert list(rebuilt['IPAddress'].fillna('N/A')) == ['10.0.0.1', 'N/A', '10.0.0.1']
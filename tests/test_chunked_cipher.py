@@ -0,0 +1,57 @@
+# tests/test_chunked_cipher.py
+import io
+import os
+import pytest
+from cryptography.fernet import Fernet
+from chunked_cipher import ChunkedCipher
+
+CHUNK = ChunkedCipher.CHUNK_SIZE
+
+@pytest.fixture
+def cipher():
+    return ChunkedCipher(Fernet.generate_key())
+
+def encrypt(cipher, data):
+    output = io.BytesIO()
+    cipher.encrypt_stream((data[i:i + CHUNK] for i in range(0, len(data), CHUNK)), output)
+    return output.getvalue()
+
+def decrypt(cipher, blob):
+    return b''.join(cipher.decrypt_stream(io.BytesIO(blob)))
+
+@pytest.mark.parametrize('size', [0, 1, CHUNK, 3 * CHUNK + 17])
+def test_round_trip(cipher, size):
+    data = os.urandom(size)
+    blob = encrypt(cipher, data)
+    assert ChunkedCipher.is_chunked(blob)
+    assert decrypt(cipher, blob) == data
+
+def test_flipped_byte_is_rejected(cipher):
+    blob = bytearray(encrypt(cipher, os.urandom(2 * CHUNK)))
+    blob[ChunkedCipher.HEADER_SIZE + 100] ^= 1
+    with pytest.raises(ValueError, match='authentication'):
+        decrypt(cipher, bytes(blob))
+
+def test_dropped_final_chunk_is_rejected(cipher):
+    # Cut exactly at a record boundary: the new last chunk is not flagged final
+    blob = encrypt(cipher, os.urandom(2 * CHUNK))
+    first_record = ChunkedCipher.HEADER_SIZE + 4 + int.from_bytes(
+        blob[ChunkedCipher.HEADER_SIZE:ChunkedCipher.HEADER_SIZE + 4], 'big')
+    with pytest.raises(ValueError):
+        decrypt(cipher, blob[:first_record])
+
+@pytest.mark.parametrize('cut', [1, 3, 50])
+def test_truncated_stream_is_rejected(cipher, cut):
+    blob = encrypt(cipher, os.urandom(CHUNK + 10))
+    with pytest.raises(ValueError):
+        decrypt(cipher, blob[:-cut])
+
+def test_header_only_is_rejected(cipher):
+    blob = encrypt(cipher, b'data')
+    with pytest.raises(ValueError, match='truncated'):
+        decrypt(cipher, blob[:ChunkedCipher.HEADER_SIZE])
+
+def test_wrong_key_is_rejected(cipher):
+    blob = encrypt(cipher, b'data')
+    with pytest.raises(ValueError):
+        decrypt(ChunkedCipher(Fernet.generate_key()), blob)
@@ -0,0 +1,25 @@
+# tests/test_concurrency.py
+import threading
+from concurrency import LockStripes
+
+def test_same_key_same_lock():
+    stripes = LockStripes(16)
+    assert stripes.lock_for('voter-1') is stripes.lock_for('voter-1')
+    assert len({id(stripes.lock_for(f'voter-{i}')) for i in range(200)}) > 8
+
+def test_striped_updates_are_not_lost():
+    stripes = LockStripes(8)
+    counts = {f'key-{i}': 0 for i in range(4)}
+
+    def work():
+        for _ in range(2000):
+            for key in counts:
+                with stripes.lock_for(key):
+                    counts[key] += 1
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(counts.values()) == {8000}
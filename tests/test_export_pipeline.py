@@ -0,0 +1,77 @@
+# tests/test_export_pipeline.py
+import os
+import json
+import time
+import pytest
+from types import SimpleNamespace
+from cryptography.fernet import Fernet
+from openpyxl import load_workbook
+from vote_store import EncryptedVoteStore
+from blockchain_lite import TamperEvidenceChain
+from export_pipeline import (VoteExportPipeline, ExportJob, build_chain_index, make_executor,
+                             idle_progress, write_progress, EXPORT_COLUMNS)
+from conftest import sha256_hex
+
+def test_executor_does_not_fork():
+    with make_executor(1) as executor:
+        assert executor._mp_context.get_start_method() == 'spawn'
+
+def test_export_joins_store_and_chain(tmp_path):
+    key = Fernet.generate_key()
+    cipher = Fernet(key)
+    store = EncryptedVoteStore(str(tmp_path / 'vote_store.dat'))
+    chain = []
+    for i in range(5):
+        voter_id = f'V{i:03d}'
+        block = {'voter_id_hash': sha256_hex(voter_id), 'vote_hash': f'vh{i}',
+                 'kyc_image_hash': f'kyc{i}', 'geolocation': {'city': 'Pune', 'country': 'India'}}
+        chain.append({'index': i + 1, 'hash': f'bh{i}', 'data': block})
+        store[block['voter_id_hash']] = cipher.encrypt(json.dumps({
+            'voter_id': voter_id, 'voter_name': f'Voter {i}', 'vote_choice': 'A',
+            'timestamp': '2025-11-01T10:00:00', 'block_hash': f'bh{i}'
+        }).encode())
+
+    pipeline = VoteExportPipeline(store, SimpleNamespace(chain=chain), key, batch_size=2, workers=2)
+    output = tmp_path / 'export.xlsx'
+    assert pipeline.run(str(output)) == 5
+    assert pipeline.progress['status'] == 'complete'
+    assert pipeline.progress['processed'] == 5
+
+    rows = list(load_workbook(output).active.values)
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert [row[1] for row in rows[1:]] == [f'V{i:03d}' for i in range(5)]
+    assert rows[1][4:] == ('Pune', 'India', 'kyc0', 'bh0', 'vh0')
+
+def test_chain_index_matches_vote_proofs(tmp_path):
+    chain = TamperEvidenceChain(str(tmp_path / 'chain.json'))
+    voter_id_hash = sha256_hex('V001')
+    chain.append_vote_records([{'voter_id_hash': voter_id_hash, 'vote_hash': 'first'},
+                               {'voter_id_hash': voter_id_hash, 'vote_hash': 'second'}])
+
+    assert build_chain_index(chain.chain)[voter_id_hash]['vote_hash'] == 'first'
+    assert chain.get_vote_proof(voter_id_hash)['vote_hash'] == 'first'
+
+def test_admin_export_runs_in_the_background(server, client):
+    response = client.post('/api/admin/export')
+    assert response.status_code == 202, response.get_json()
+    status_url = response.get_json()['status_url']
+
+    deadline = time.time() + 60
+    while client.get(status_url).get_json()['status'] in ('starting', 'running'):
+        assert time.time() < deadline, 'export never finished'
+        time.sleep(0.1)
+    progress = client.get(status_url).get_json()
+    assert progress['status'] == 'complete', progress
+    assert progress['processed'] == progress['total'] == len(server.vote_store)
+    assert load_workbook(progress['file']).active.max_row == progress['total'] + 1
+
+def test_export_job_refuses_to_run_twice(tmp_path):
+    job = ExportJob(str(tmp_path / 'export.xlsx'), str(tmp_path / 'progress.json'),
+                    'chain.json', 'store.dat')
+    write_progress(job.progress_path, dict(idle_progress(), status='running', pid=os.getpid()))
+    with pytest.raises(RuntimeError):
+        job.start()
+
+    # An export killed without reporting does not block the next one
+    write_progress(job.progress_path, dict(idle_progress(), status='running', pid=2 ** 22 + 1))
+    assert job.progress['status'] == 'failed'
@@ -0,0 +1,57 @@
+# tests/test_geoip.py
+import pytest
+from geoip import GeoIPLookup, UNKNOWN_LOCATION
+
+CSV = """start_ip,end_ip,city,country
+10.0.0.0,10.0.0.255,Pune,India
+10.0.1.0,10.0.1.255,Mumbai,India
+10.0.3.0,10.0.3.0,Delhi,India
+167772672,167772927,Chennai,India
+2001:db8::,2001:db8::ffff,Berlin,Germany
+10.0.9.9,10.0.9.1,Broken,Range
+"""
+
+@pytest.fixture
+def geoip(tmp_path):
+    path = tmp_path / 'geoip.csv'
+    path.write_text(CSV)
+    return GeoIPLookup(str(path))
+
+@pytest.mark.parametrize('ip, city', [
+    ('10.0.0.0', 'Pune'),        # First address of the first range
+    ('10.0.0.255', 'Pune'),      # Last address of a range
+    ('10.0.1.0', 'Mumbai'),      # Adjacent range starts right after
+    ('10.0.2.0', 'Chennai'),     # Integer-notation range
+    ('10.0.3.0', 'Delhi'),       # Single-address range
+    ('::ffff:10.0.1.7', 'Mumbai'),
+    ('2001:db8::ffff', 'Berlin'),
+])
+def test_range_boundaries(geoip, ip, city):
+    assert geoip.lookup(ip)['city'] == city
+
+@pytest.mark.parametrize('ip', [
+    '9.255.255.255',   # Before the first range
+    '10.0.3.1',        # Gap after a single-address range
+    '10.0.9.5',        # Inside the skipped (start > end) range
+    '255.255.255.255', # After the last range
+    '2001:db8::1:0',
+    'not-an-ip',
+    None,
+])
+def test_outside_ranges_is_unknown(geoip, ip):
+    assert geoip.lookup(ip) == UNKNOWN_LOCATION
+
+def test_without_dataset_everything_is_unknown(tmp_path):
+    geoip = GeoIPLookup(str(tmp_path / 'missing.csv'))
+    assert geoip.lookup('10.0.0.1') == UNKNOWN_LOCATION
+
+def test_reload_replaces_the_dataset(geoip, tmp_path):
+    path = tmp_path / 'update.csv'
+    path.write_text("start_ip,end_ip,city,country\n"
+                    "10.0.0.0,10.0.0.127,Nagpur,India\n")
+    assert geoip.lookup('10.0.0.5')['city'] == 'Pune'
+
+    assert geoip.load_csv(str(path)) == 1
+    assert geoip.lookup('10.0.0.5')['city'] == 'Nagpur'
+    assert geoip.lookup('10.0.0.200') == UNKNOWN_LOCATION  # Old ranges are gone
+    assert geoip.lookup('10.0.1.0') == UNKNOWN_LOCATION
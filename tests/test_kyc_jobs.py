@@ -0,0 +1,34 @@
+# tests/test_kyc_jobs.py
+import hashlib
+from datetime import datetime, timedelta
+from kyc_jobs import KYCJobQueue
+from conftest import sha256_hex, jpeg_bytes
+
+def test_stored_image_is_ready_only_for_its_voter(kyc_service):
+    jobs = KYCJobQueue(kyc_service, max_workers=1)
+    image_hash, _ = kyc_service.process_kyc_image(jpeg_bytes((64, 64)), 'V100', 't1')
+
+    assert jobs.check_image_ready(image_hash, sha256_hex('V100')) == (True, None)
+    ready, error = jobs.check_image_ready(image_hash, sha256_hex('V200'))
+    assert not ready and 'not found' in error
+
+def test_unknown_hash_is_not_ready(kyc_service):
+    jobs = KYCJobQueue(kyc_service, max_workers=1)
+    ready, _ = jobs.check_image_ready(hashlib.sha256(b'never uploaded').hexdigest(),
+                                      sha256_hex('V100'))
+    assert not ready
+
+def test_failed_job_stays_unusable_after_pruning(kyc_service):
+    jobs = KYCJobQueue(kyc_service, max_workers=1, retention_minutes=0)
+    ok, job = jobs.submit(b'not an image', 'V100', 't1')
+    assert ok
+    jobs.pool.shutdown(wait=True)
+    assert jobs.check_image_ready(job['image_hash'], sha256_hex('V100'))[0] is False
+
+    # Expire the failed job; the hash must still be rejected
+    jobs.jobs[job['job_id']]['completed'] = datetime.utcnow() - timedelta(minutes=1)
+    with jobs._lock:
+        jobs._prune_finished()
+    assert job['job_id'] not in jobs.jobs
+    ready, error = jobs.check_image_ready(job['image_hash'], sha256_hex('V100'))
+    assert not ready and 'not found' in error
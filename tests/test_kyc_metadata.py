@@ -0,0 +1,60 @@
+# tests/test_kyc_metadata.py
+import sqlite3
+import pytest
+from cryptography.fernet import Fernet
+from kyc_metadata import KYCMetadataStore
+from conftest import sha256_hex
+
+VOTER = sha256_hex('V100')
+OTHER = sha256_hex('V200')
+
+@pytest.fixture
+def store(tmp_path):
+    return KYCMetadataStore(str(tmp_path / 'kyc_metadata.db'), Fernet.generate_key())
+
+def test_blind_index_is_keyed(tmp_path, store):
+    index = store.voter_index(VOTER)
+    assert index == store.voter_index(VOTER)
+    assert index != VOTER and index != sha256_hex(VOTER)
+    other_key = KYCMetadataStore(str(tmp_path / 'other.db'), Fernet.generate_key())
+    assert other_key.voter_index(VOTER) != index
+
+def test_voter_id_hash_is_not_stored_in_clear(store):
+    store.add_image('i' * 64, 'ii/ii/x.enc', {'size': 1}, VOTER, '2025-11-01T10:00:00')
+    stored, index = sqlite3.connect(store.db_path).execute(
+        'SELECT voter_id_hash, voter_index FROM kyc_references').fetchone()
+    assert VOTER.encode() not in bytes(stored)
+    assert index == store.voter_index(VOTER)
+    assert store.find_by_voter(VOTER)[0]['voter_id_hash'] == VOTER
+
+def test_reference_counting(store):
+    image = 'i' * 64
+    assert store.add_reference(image, VOTER, 't0') is False  # Unknown image
+
+    assert store.add_image(image, 'loc', {'size': 10}, VOTER, 't1') is True
+    assert store.add_reference(image, OTHER, 't2') is True
+    assert store.add_reference(image, VOTER, 't3') is True
+    assert store.reference_count(image) == 3
+    assert store.has_reference(image, OTHER)
+
+    assert store.remove_reference(image, VOTER, 't1') == 2
+    assert store.remove_reference(image, OTHER) == 1
+    assert not store.has_reference(image, OTHER)
+    assert store.unreferenced_images() == []
+
+    assert store.remove_reference(image, VOTER) == 0
+    assert store.unreferenced_images() == [image]
+    store.delete_image(image)
+    assert store.get_image(image) is None
+
+def test_audit_queries(store):
+    store.add_image('a' * 64, 'la', {'size': 1, 'format': 'JPEG'}, VOTER, '2025-11-01T09:00:00')
+    store.add_image('b' * 64, 'lb', {'size': 2}, OTHER, '2025-11-01T10:00:00')
+    store.add_reference('b' * 64, VOTER, '2025-11-01T11:00:00')
+
+    by_voter = store.find_by_voter(VOTER)
+    assert [record['image_hash'] for record in by_voter] == ['a' * 64, 'b' * 64]
+    assert by_voter[0]['format'] == 'JPEG'
+
+    in_range = store.find_by_time_range('2025-11-01T09:30:00', '2025-11-01T11:00:00')
+    assert [(record['image_hash'], record['voter_id_hash']) for record in in_range] == [('b' * 64, OTHER)]
@@ -0,0 +1,41 @@
+# tests/test_kyc_service.py
+import io
+import os
+import hashlib
+import pytest
+from PIL import Image
+from kyc_service import KYCInvalidImage
+from conftest import jpeg_bytes
+
+def test_upload_is_normalized(kyc_service, monkeypatch):
+    original = jpeg_bytes()
+    encrypted = []
+    encrypt_stream = kyc_service.stream_cipher.encrypt_stream
+    monkeypatch.setattr(kyc_service.stream_cipher, 'encrypt_stream',
+                        lambda chunks, dst: encrypted.append(b''.join(chunks)) or
+                        encrypt_stream([encrypted[-1]], dst))
+    image_hash, path = kyc_service.process_kyc_stream(io.BytesIO(original), 'V100', 't1')
+
+    assert image_hash == hashlib.sha256(original).hexdigest()
+    details = kyc_service.metadata.get_image(image_hash)
+    assert max(details['dimensions']) == kyc_service.max_dimension
+    stored = kyc_service.retrieve_kyc_image(image_hash)
+    assert hashlib.sha256(stored).hexdigest() == details['normalized_hash']
+    with Image.open(io.BytesIO(stored)) as img:
+        assert max(img.size) == kyc_service.max_dimension
+    assert encrypted == [stored]  # Only the normalized image, encrypted once
+    assert not os.listdir(kyc_service.staging_path)
+
+def test_undecodable_upload_is_rejected(kyc_service):
+    with pytest.raises(KYCInvalidImage):
+        kyc_service.process_kyc_stream(io.BytesIO(b'not an image' * 1000), 'V100', 't1')
+
+def test_duplicate_upload_is_not_encrypted_again(kyc_service, monkeypatch):
+    original = jpeg_bytes((64, 64))
+    image_hash, path = kyc_service.process_kyc_stream(io.BytesIO(original), 'V100', 't1')
+
+    def fail(*args, **kwargs):
+        raise AssertionError("known content was encrypted again")
+    monkeypatch.setattr(kyc_service.stream_cipher, 'encrypt_stream', fail)
+    assert kyc_service.process_kyc_stream(io.BytesIO(original), 'V101', 't2') == (image_hash, path)
+    assert kyc_service.get_reference_count(image_hash) == 2
@@ -0,0 +1,31 @@
+# tests/test_kyc_upload.py
+import io
+import os
+from conftest import login, KYC_MAX_UPLOAD_BYTES
+
+def upload(client, token, size):
+    return client.post(
+        '/api/kyc/upload',
+        data={'kyc_image': (io.BytesIO(os.urandom(size)), 'capture.jpg'),
+              'timestamp': '2025-11-01T10:00:00'},
+        headers={'Authorization': f'Bearer {token}'},
+        content_type='multipart/form-data'
+    )
+
+def test_upload_over_stream_cap_is_413(server, client):
+    # Fits MAX_CONTENT_LENGTH, rejected while streaming
+    response = upload(client, login(server, 1), KYC_MAX_UPLOAD_BYTES + 1024)
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
+
+def test_body_over_max_content_length_is_413(server, client):
+    # Rejected by werkzeug before the form is parsed (was a 500)
+    response = upload(client, login(server, 1), 3 * KYC_MAX_UPLOAD_BYTES)
+    assert response.status_code == 413
+    body = response.get_json()
+    assert body['success'] is False
+    assert str(KYC_MAX_UPLOAD_BYTES) in body['error']
+
+def test_undecodable_image_is_400(server, client):
+    response = upload(client, login(server, 1), 1024)
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+# tests/test_profiling.py
+import pytest
+from profiling import RequestProfiler, PROFILER
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = RequestProfiler(output_dir=str(tmp_path / 'profiles'), token='s3cret')
+    with profiler.profile('submit_vote'):
+        sum(range(1000))
+    return profiler
+
+def test_token_matches(profiler):
+    assert profiler.token_matches('s3cret')
+    assert not profiler.token_matches('s3cre')
+    assert not profiler.token_matches(None)
+    assert not RequestProfiler(token=None).token_matches('')
+
+def test_hotspots_only_for_profiled_endpoints(tmp_path, profiler):
+    assert profiler.profiled_endpoints() == ['submit_vote']
+    assert profiler.hotspots('submit_vote')
+
+    # A .prof outside the profiles directory must not be reachable
+    with profiler.profile('elsewhere'):
+        pass
+    (tmp_path / 'profiles' / 'elsewhere').rename(tmp_path / 'outside')
+    assert profiler.hotspots('../outside') == []
+    assert profiler.hotspots('..') == []
+
+def test_admin_endpoint_rejects_bad_token_and_names(client, profiler, monkeypatch):
+    monkeypatch.setattr(PROFILER, 'token', profiler.token)
+    monkeypatch.setattr(PROFILER, 'output_dir', profiler.output_dir)
+    url = '/api/admin/profiles'
+
+    assert client.get(url, headers={'X-Profile-Token': 'wrong'}).status_code == 403
+    headers = {'X-Profile-Token': 's3cret'}
+    assert client.get(url, query_string={'endpoint': '../..'}, headers=headers).status_code == 404
+    response = client.get(url, query_string={'endpoint': 'submit_vote'}, headers=headers)
+    assert response.status_code == 200
+    assert list(response.get_json()['hotspots']) == ['submit_vote']
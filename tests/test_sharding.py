@@ -0,0 +1,16 @@
+# tests/test_sharding.py
+from sharding import ShardCoordinator, create_coordinator_app
+
+def test_anchor_requires_admin_token(tmp_path):
+    coordinator = ShardCoordinator({}, str(tmp_path / 'root_chain.json'), token='s3cret')
+    client = create_coordinator_app(coordinator).test_client()
+
+    assert client.post('/api/root/anchor').status_code == 403
+    assert client.post('/api/root/anchor', headers={'X-Anchor-Token': 'wrong'}).status_code == 403
+    assert client.post('/api/root/anchor', headers={'X-Anchor-Token': 's3cret'}).status_code == 200
+
+def test_anchor_is_disabled_without_a_token(tmp_path, monkeypatch):
+    monkeypatch.delenv('ANCHOR_TOKEN', raising=False)
+    coordinator = ShardCoordinator({}, str(tmp_path / 'root_chain.json'))
+    client = create_coordinator_app(coordinator).test_client()
+    assert client.post('/api/root/anchor', headers={'X-Anchor-Token': ''}).status_code == 403
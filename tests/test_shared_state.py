@@ -0,0 +1,34 @@
+# tests/test_shared_state.py
+from types import SimpleNamespace
+from shared_state import SharedStateStore
+from launcher import share_mutable_state, VOLATILE_NAMESPACES
+
+def fake_server():
+    return SimpleNamespace(auth_service=SimpleNamespace(), otp_service=SimpleNamespace(),
+                           anti_replay=SimpleNamespace(), kyc_jobs=SimpleNamespace())
+
+def test_dict_and_set_views_are_shared(tmp_path):
+    path = str(tmp_path / 'shared_state.db')
+    sessions = SharedStateStore(path).dict('sessions')
+    sessions['token'] = {'voter_id': 'V001'}
+    nonces = SharedStateStore(path).set('used_nonces')
+    nonces.add('n1')
+
+    other = SharedStateStore(path)
+    assert other.dict('sessions')['token'] == {'voter_id': 'V001'}
+    assert 'n1' in other.set('used_nonces')
+    del other.dict('sessions')['token']
+    assert 'token' not in sessions
+
+def test_launcher_start_clears_previous_run(tmp_path):
+    state = SharedStateStore(str(tmp_path / 'shared_state.db'))
+    for namespace in VOLATILE_NAMESPACES:
+        state.dict(namespace)['stale'] = True
+
+    server = fake_server()
+    share_mutable_state(server, state)
+
+    assert len(server.auth_service.active_sessions) == 0
+    assert 'stale' not in server.anti_replay.used_nonces
+    for namespace in VOLATILE_NAMESPACES:
+        assert len(state.dict(namespace)) == 0
@@ -0,0 +1,40 @@
+# tests/test_verify_batch.py
+from conftest import sha256_hex
+
+def vote_blocks(server):
+    """First block per voter (the demo chain repeats V001; lookups resolve to the first)"""
+    blocks = {}
+    for block in server.tamper_chain.chain:
+        if isinstance(block['data'], dict) and 'voter_id_hash' in block['data']:
+            blocks.setdefault(block['data']['voter_id_hash'], block)
+    return list(blocks.values())
+
+def test_batch_returns_proofs_missing_and_invalid(server, client):
+    block = vote_blocks(server)[-1]
+    unknown = sha256_hex('never voted')
+    response = client.post('/api/verify/batch', json={'hashes': [
+        block['data']['voter_id_hash'], block['data']['vote_hash'], unknown, 'not-a-hash', 'A' * 64
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+
+    expected = [block['index'], block['hash'], block['timestamp'], block['data']['vote_hash']]
+    assert body['proofs'][block['data']['voter_id_hash']] == expected
+    assert body['proofs'][block['data']['vote_hash']] == expected
+    assert body['verified'] == 2
+    assert body['missing'] == [unknown]
+    assert sorted(body['invalid']) == sorted(['not-a-hash', 'A' * 64])
+    assert body['chain_length'] == len(server.tamper_chain.chain)
+
+def test_batch_matches_single_lookup(server, client):
+    for block in vote_blocks(server):
+        voter_id_hash = block['data']['voter_id_hash']
+        single = client.get(f'/api/verify/{voter_id_hash}').get_json()['proof']
+        batch = client.post('/api/verify/batch', json={'hashes': [voter_id_hash]}).get_json()
+        assert batch['proofs'][voter_id_hash][1] == single['block_hash']
+
+def test_batch_limits(server, client):
+    assert client.post('/api/verify/batch', json={'hashes': []}).status_code == 400
+    assert client.post('/api/verify/batch', data='nonsense').status_code == 400
+    too_many = [sha256_hex(str(i)) for i in range(server.VERIFY_BATCH_MAX + 1)]
+    assert client.post('/api/verify/batch', json={'hashes': too_many}).status_code == 413
@@ -0,0 +1,73 @@
+# tests/test_vote_store.py
+import pytest
+from vote_store import EncryptedVoteStore
+
+def test_append_and_point_reads(tmp_path):
+    store = EncryptedVoteStore(str(tmp_path / 'votes.dat'))
+    store.update([('a' * 64, b'token-a'), ('b' * 64, b'token-b')])
+    store['c' * 64] = b'token-c'
+
+    assert len(store) == 3
+    assert store['b' * 64] == b'token-b'
+    assert store.get('d' * 64) is None
+    assert 'c' * 64 in store
+
+def test_last_write_wins_and_items_skip_superseded(tmp_path):
+    store = EncryptedVoteStore(str(tmp_path / 'votes.dat'))
+    store['a' * 64] = b'old'
+    store['b' * 64] = b'other'
+    store['a' * 64] = b'new'
+
+    assert store['a' * 64] == b'new'
+    assert list(store.items()) == [('b' * 64, b'other'), ('a' * 64, b'new')]
+
+def test_reopen_rebuilds_index_and_drops_torn_record(tmp_path):
+    path = tmp_path / 'votes.dat'
+    store = EncryptedVoteStore(str(path))
+    store.update([('a' * 64, b'token-a'), ('b' * 64, b'token-b')])
+    store.close()
+    with open(path, 'ab') as f:
+        f.write(b'c' * 64 + b' partial')  # Crash mid-append
+
+    reopened = EncryptedVoteStore(str(path))
+    assert sorted(reopened.keys()) == ['a' * 64, 'b' * 64]
+    assert reopened['a' * 64] == b'token-a'
+    assert path.read_bytes().endswith(b'token-b\n')
+
+def test_refresh_picks_up_appends_from_another_writer(tmp_path):
+    path = str(tmp_path / 'votes.dat')
+    writer = EncryptedVoteStore(path)
+    replica = EncryptedVoteStore(path)
+    writer['a' * 64] = b'token-a'
+    assert 'a' * 64 not in replica
+
+    assert replica.refresh() == 1
+    assert replica['a' * 64] == b'token-a'
+
+    # A partially written tail is left for the next refresh
+    with open(path, 'ab') as f:
+        f.write(b'b' * 64 + b' tok')
+    assert replica.refresh() == 0
+    with open(path, 'ab') as f:
+        f.write(b'en-b\n')
+    assert replica.refresh() == 1
+    assert replica['b' * 64] == b'token-b'
+
+def test_read_only_never_creates_truncates_or_writes(tmp_path):
+    path = tmp_path / 'votes.dat'
+    missing = EncryptedVoteStore(str(path), read_only=True)
+    assert len(missing) == 0 and list(missing.items()) == []
+    assert not path.exists()
+
+    writer = EncryptedVoteStore(str(path))
+    writer['a' * 64] = b'token-a'
+    with open(path, 'ab') as f:
+        f.write(b'b' * 64 + b' partial')  # Record still being appended
+    size = path.stat().st_size
+
+    reader = EncryptedVoteStore(str(path), read_only=True)
+    assert list(reader.items()) == [('a' * 64, b'token-a')]
+    assert path.stat().st_size == size
+    with pytest.raises(PermissionError):
+        reader['c' * 64] = b'token-c'
+    reader.close()
@@ -0,0 +1,32 @@
+# tests/test_vote_submit.py
+import io
+import time
+from conftest import login, jpeg_bytes
+
+def test_slow_commit_is_202_and_pollable(server, client, monkeypatch):
+    token = login(server, 3)
+    headers = {'Authorization': f'Bearer {token}'}
+    uploaded = client.post(
+        '/api/kyc/upload',
+        data={'kyc_image': (io.BytesIO(jpeg_bytes((64, 64))), 'capture.jpg'),
+              'timestamp': '2025-11-01T10:00:00'},
+        headers=headers, content_type='multipart/form-data'
+    )
+    assert uploaded.status_code == 200, uploaded.get_json()
+
+    # The commit batch cannot finish within a zero wait
+    monkeypatch.setattr(server, 'VOTE_COMMIT_WAIT_SECONDS', 0)
+    response = client.post('/api/vote/submit', headers=headers, json={
+        'vote_choice': 'C002',
+        'kyc_image_hash': uploaded.get_json()['image_hash'],
+        'timestamp': '2025-11-01T10:00:05'
+    })
+    assert response.status_code == 202, response.get_json()
+    body = response.get_json()
+    assert body['status'] == 'pending'
+
+    deadline = time.time() + 10
+    while client.get(body['status_url']).status_code != 200:
+        assert time.time() < deadline, 'vote never committed'
+        time.sleep(0.05)
+    assert client.get(body['status_url']).get_json()['verified']
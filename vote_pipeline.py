@@ -0,0 +1,149 @@
+# vote_pipeline.py
+import queue
+import threading
+from concurrent.futures import Future
+from metrics import timed, REGISTRY
+from profiling import PROFILER, is_profiling
+
+BATCH_SIZE = REGISTRY.histogram(
+    'vote_vault_commit_batch_size', 'Votes per commit pipeline batch',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+class VoteCommitPipeline:
+    """
+    Single-writer commit stage for validated votes.
+
+    Request threads only validate (VoteProcessor.prepare_vote) and enqueue.
+    One writer thread drains the queue in batches and applies every side
+    effect in a fixed order:
+        1. chain append (one durable save per batch)
+        2. encrypted vote store
+        3. anti-replay registration -> receipt released to the client,
+           live results (ResultsBroadcaster) updated
+        4. voter registry HasVoted (one write per batch)
+        5. vote records (one write per batch)
+        6. candidate vote counts (one write per batch)
+    Because only this thread mutates the chain, the vote store and the
+    workbooks, none of them need locking on the vote path.
+    """
+    def __init__(self, vote_processor, tamper_chain, anti_replay, excel_manager,
+                 max_batch=64, batch_wait=0.005, results=None):
+        self.vote_processor = vote_processor
+        self.tamper_chain = tamper_chain
+        self.anti_replay = anti_replay
+        self.excel_manager = excel_manager
+        self.results = results
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue()
+        self._stopped = threading.Event()
+        self.writer = threading.Thread(target=self._run, name='vote-commit', daemon=True)
+        self.writer.start()
+
+    def submit(self, prepared_vote, nonce, timestamp):
+        """
+        Queue a validated vote (from VoteProcessor.prepare_vote)
+        Returns: Future resolving to (success, receipt_or_error) once the
+        vote's block is durably on the chain
+        """
+        future = Future()
+        # A vote from a profiled request gets its commit batch profiled too
+        future.profile = is_profiling()
+        self.queue.put((prepared_vote, nonce, timestamp, future))
+        return future
+
+    def stop(self, timeout=None):
+        """Finish queued work and stop the writer thread"""
+        self._stopped.set()
+        self.queue.put(None)
+        self.writer.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            # Give concurrent submitters a moment to join this batch
+            try:
+                while len(batch) < self.max_batch:
+                    item = self.queue.get(timeout=self.batch_wait)
+                    if item is None:
+                        self._stopped.set()
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            try:
+                if any(future.profile for _, _, _, future in batch):
+                    with PROFILER.profile('vote_commit_batch'):
+                        self._commit_batch(batch)
+                else:
+                    self._commit_batch(batch)
+            except Exception as e:
+                print(f"Error in vote commit pipeline: {e}")
+                for prepared, _, _, future in batch:
+                    if not future.done():
+                        self.vote_processor.abandon_vote(prepared)
+                        future.set_exception(e)
+
+            if self._stopped.is_set() and self.queue.empty():
+                return
+
+    @timed('vote_commit_batch')
+    def _commit_batch(self, batch):
+        # Duplicate check is race-free here: only this thread records votes
+        accepted = []
+        seen = set()
+        for prepared, nonce, timestamp, future in batch:
+            voter_id_hash = prepared['voter_id_hash']
+            if voter_id_hash in seen or voter_id_hash in self.vote_processor.votes_encrypted:
+                future.set_result((False, {'error': 'Vote already recorded'}))
+                continue
+            seen.add(voter_id_hash)
+            accepted.append((prepared, nonce, timestamp, future))
+
+        if not accepted:
+            return
+        BATCH_SIZE.observe(len(accepted))
+
+        # 1. Chain append, persisted once for the whole batch
+        block_hashes = self.tamper_chain.append_vote_records(
+            [prepared['public_record'] for prepared, _, _, _ in accepted]
+        )
+
+        # 2. Encrypted vote store, one durable write for the whole batch
+        receipts = self.vote_processor.finalize_votes(
+            [prepared for prepared, _, _, _ in accepted], block_hashes
+        )
+
+        committed = []
+        for (prepared, nonce, timestamp, future), receipt in zip(accepted, receipts):
+            # 3. Anti-replay registration
+            self.anti_replay.register_vote(prepared['voter_id_hash'], nonce, timestamp)
+            future.set_result((True, receipt))
+            committed.append((prepared, receipt))
+        if self.results is not None:
+            self.results.record([prepared['vote_choice'] for prepared, _ in committed])
+
+        # 4-6. Derived Excel outputs, one write per workbook per batch
+        self.excel_manager.mark_voters_as_voted(
+            [prepared['voter_id'] for prepared, _ in committed]
+        )
+        self.excel_manager.add_vote_records([{
+            'voter_id': prepared['voter_id'],
+            'voter_name': prepared['voter_name'],
+            'candidate_voted': prepared['vote_choice'],
+            'ip_address': prepared['ip_address'],
+            'geolocation_city': receipt['geolocation']['city'],
+            'geolocation_country': receipt['geolocation']['country'],
+            'kyc_image_hash': prepared['kyc_image_hash'],
+            'block_hash': receipt['block_hash'],
+            'vote_hash': receipt['vote_hash']
+        } for prepared, receipt in committed])
+        self.excel_manager.update_candidate_vote_counts(
+            [prepared['vote_choice'] for prepared, _ in committed]
+        )
@@ -2,20 +2,48 @@
 import hashlib
 import json
 from datetime import datetime
-import requests
+from geoip import UNKNOWN_LOCATION
+from concurrency import LockStripes
+from metrics import timed
 
 class VoteProcessor:
-    def __init__(self, auth_service, kyc_service, tamper_chain):
+    def __init__(self, auth_service, kyc_service, tamper_chain, geoip=None,
+                 vote_store=None):
         self.auth_service = auth_service
         self.kyc_service = kyc_service
         self.tamper_chain = tamper_chain
-        self.votes_encrypted = {}  # voter_id_hash -> encrypted vote
+        self.geoip = geoip  # Offline GeoIPLookup (None -> 'Unknown')
+        # voter_id_hash -> encrypted vote (EncryptedVoteStore persists it on disk)
+        self.votes_encrypted = vote_store if vote_store is not None else {}
+        # Per-voter lock stripe makes the duplicate check + reservation atomic
+        self.vote_locks = LockStripes()
+        self.votes_in_flight = set()  # voter_id_hash reserved but not yet stored
     
+    @timed('process_vote')
     def process_vote(self, session_token, vote_choice, kyc_image_hash, ip_address):
         """
         Complete vote processing workflow
         Returns: (success, vote_receipt)
         """
+        success, prepared = self.prepare_vote(session_token, vote_choice,
+                                              kyc_image_hash, ip_address)
+        if not success:
+            return False, prepared
+        
+        try:
+            block_hash = self.tamper_chain.add_vote_record(prepared['public_record'])
+        except Exception:
+            self.abandon_vote(prepared)
+            raise
+        
+        return True, self.finalize_vote(prepared, block_hash)
+    
+    @timed('vote_prepare')
+    def prepare_vote(self, session_token, vote_choice, kyc_image_hash, ip_address):
+        """
+        Validation half of process_vote: everything before the chain append
+        Returns: (success, prepared_vote or error)
+        """
         # 1. Verify session
         voter_info = self.auth_service.verify_session(session_token)
         if not voter_info:
@@ -23,10 +51,13 @@ class VoteProcessor:
         
         voter_id = voter_info['voter_id']
         
-        # 2. Check duplicate vote (replay protection)
+        # 2. Check duplicate vote (replay protection) and reserve the voter
+        # until the vote is stored, so concurrent submits cannot both pass
         voter_id_hash = hashlib.sha256(voter_id.encode()).hexdigest()
-        if voter_id_hash in self.votes_encrypted:
-            return False, {'error': 'Vote already recorded'}
+        with self.vote_locks.lock_for(voter_id_hash):
+            if voter_id_hash in self.votes_encrypted or voter_id_hash in self.votes_in_flight:
+                return False, {'error': 'Vote already recorded'}
+            self.votes_in_flight.add(voter_id_hash)
         
         # 3. Hash vote choice (privacy)
         vote_hash = hashlib.sha256(
@@ -45,44 +76,75 @@ class VoteProcessor:
             'geolocation': geolocation  # City/country only
         }
         
-        block_hash = self.tamper_chain.add_vote_record(public_record)
-        
-        # 6. Store encrypted vote mapping (for decryption if needed)
-        encrypted_vote = self.auth_service.cipher.encrypt(
-            json.dumps({
-                'voter_id': voter_id,
-                'voter_name': voter_info['name'],
-                'vote_choice': vote_choice,
-                'timestamp': public_record['timestamp'],
-                'block_hash': block_hash
-            }).encode()
-        )
-        self.votes_encrypted[voter_id_hash] = encrypted_vote
-        
-        # 7. Generate voter receipt
-        receipt = {
+        return True, {
+            'voter_id': voter_id,
+            'voter_name': voter_info['name'],
             'voter_id_hash': voter_id_hash,
-            'vote_hash': vote_hash,
-            'block_hash': block_hash,
-            'timestamp': public_record['timestamp'],
-            'verification_url': f"/api/verify/{voter_id_hash}"
+            'vote_choice': vote_choice,
+            'kyc_image_hash': kyc_image_hash,
+            'ip_address': ip_address,  # Never leaves the server / public record
+            'public_record': public_record
         }
+    
+    def finalize_vote(self, prepared, block_hash):
+        """
+        Commit half of process_vote, run once the block is on the chain
+        Returns: vote_receipt
+        """
+        return self.finalize_votes([prepared], [block_hash])[0]
+    
+    def finalize_votes(self, prepared_votes, block_hashes):
+        """
+        Batch form of finalize_vote: stores all encrypted votes in one write
+        Returns: list of vote_receipts
+        """
+        encrypted_votes = []
+        receipts = []
+        for prepared, block_hash in zip(prepared_votes, block_hashes):
+            public_record = prepared['public_record']
+            voter_id_hash = prepared['voter_id_hash']
+            
+            # 6. Encrypt vote mapping (for decryption if needed)
+            with timed('vote_encrypt'):
+                encrypted_votes.append((voter_id_hash, self.auth_service.cipher.encrypt(
+                    json.dumps({
+                        'voter_id': prepared['voter_id'],
+                        'voter_name': prepared['voter_name'],
+                        'vote_choice': prepared['vote_choice'],
+                        'timestamp': public_record['timestamp'],
+                        'block_hash': block_hash
+                    }).encode()
+                )))
+            
+            # 7. Generate voter receipt
+            receipts.append({
+                'voter_id_hash': voter_id_hash,
+                'vote_hash': public_record['vote_hash'],
+                'block_hash': block_hash,
+                'timestamp': public_record['timestamp'],
+                'geolocation': public_record['geolocation'],
+                'verification_url': f"/api/verify/{voter_id_hash}"
+            })
+        
+        # Store encrypted votes, then release the reservations
+        with timed('vote_store_write'):
+            self.votes_encrypted.update(encrypted_votes)
+        for prepared in prepared_votes:
+            self.abandon_vote(prepared)
         
-        return True, receipt
+        return receipts
+    
+    def abandon_vote(self, prepared):
+        """Release a prepare_vote reservation (vote stored or failed)"""
+        with self.vote_locks.lock_for(prepared['voter_id_hash']):
+            self.votes_in_flight.discard(prepared['voter_id_hash'])
     
     def get_geolocation(self, ip_address):
         """
         Get city/country from IP (privacy-preserving)
-        Uses free IP geolocation service
+        Uses the local GeoIP dataset, no network call on the vote path
         """
-        try:
-            # Example using ipapi.co (replace with preferred service)
-            response = requests.get(f'https://ipapi.co/{ip_address}/json/', 
-                                   timeout=2)
-            data = response.json()
-            return {
-                'city': data.get('city', 'Unknown'),
-                'country': data.get('country_name', 'Unknown')
-            }
-        except:
-            return {'city': 'Unknown', 'country': 'Unknown'}
\ No newline at end of file
+        if self.geoip is None:
+            return dict(UNKNOWN_LOCATION)
+        with timed('geoip_lookup'):
+            return dict(self.geoip.lookup(ip_address))
@@ -0,0 +1,166 @@
+# vote_store.py
+import os
+import threading
+
+class EncryptedVoteStore:
+    """
+    Append-only on-disk store of encrypted votes, keyed by voter_id_hash.
+
+    Each record is one line: "<voter_id_hash> <fernet token>\n" (both ASCII).
+    Only an index of voter_id_hash -> (offset, length) is kept in memory;
+    point lookups are a single positioned read and exports iterate the file
+    sequentially. Behaves like the dict it replaces in VoteProcessor.
+
+    With read_only=True (audits and exports next to a running server) the
+    file is never created, truncated or written; a missing file reads as
+    an empty store and a torn tail record is only skipped.
+    """
+    def __init__(self, store_path, load=True, read_only=False):
+        self.store_path = store_path
+        self.read_only = read_only
+        self.index = {}  # voter_id_hash -> (token offset, token length)
+        self._end = 0    # File offset up to which records are indexed
+        self._lock = threading.Lock()
+        if load:
+            self._load_index()
+        self._append_file = None
+        self._read_fd = None
+        if not read_only:
+            self._append_file = open(self.store_path, 'ab')
+        if os.path.exists(self.store_path):
+            self._read_fd = os.open(self.store_path, os.O_RDONLY)
+
+    def load(self):
+        """Build the index (deferred with load=False)"""
+        with self._lock:
+            self._load_index()
+        return True, len(self.index)
+
+    def _load_index(self):
+        """Rebuild the index, dropping a torn record left by a crash"""
+        if not os.path.exists(self.store_path):
+            if not self.read_only:
+                open(self.store_path, 'wb').close()
+            return
+
+        offset = 0
+        valid_end = 0
+        with open(self.store_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                voter_id_hash, sep, token = line.rstrip(b'\n').partition(b' ')
+                if sep:
+                    self.index[voter_id_hash.decode()] = (offset + len(voter_id_hash) + 1, len(token))
+                offset += len(line)
+                valid_end = offset
+
+        if valid_end != os.path.getsize(self.store_path):
+            if self.read_only:
+                # Possibly a record the live server is still appending
+                print(f"Warning: Ignoring incomplete record at end of {self.store_path}")
+            else:
+                print(f"Warning: Truncating incomplete record at end of {self.store_path}")
+                with open(self.store_path, 'r+b') as f:
+                    f.truncate(valid_end)
+        self._end = valid_end
+
+    def refresh(self):
+        """
+        Index records appended by another process since the last look
+        (read-only replicas, e.g. launcher.py workers). A partially written
+        tail record is left for the next refresh.
+        """
+        if self._read_fd is None:
+            return 0
+        size = os.fstat(self._read_fd).st_size
+        if size <= self._end:
+            return 0
+
+        with self._lock:
+            if size <= self._end:
+                return 0
+            tail = os.pread(self._read_fd, size - self._end, self._end)
+            offset = self._end
+            added = 0
+            for line in tail.splitlines(keepends=True):
+                if not line.endswith(b'\n'):
+                    break
+                voter_id_hash, sep, token = line.rstrip(b'\n').partition(b' ')
+                if sep:
+                    self.index[voter_id_hash.decode()] = (offset + len(voter_id_hash) + 1, len(token))
+                    added += 1
+                offset += len(line)
+            self._end = offset
+            return added
+
+    def update(self, items):
+        """Append several encrypted votes with one write and one fsync"""
+        if self.read_only:
+            raise PermissionError(f"{self.store_path} is open read-only")
+        if hasattr(items, 'items'):
+            items = items.items()
+        items = list(items)
+
+        with self._lock:
+            offset = self._append_file.seek(0, os.SEEK_END)
+            lines = []
+            positions = []
+            for voter_id_hash, token in items:
+                line = voter_id_hash.encode() + b' ' + token + b'\n'
+                positions.append((voter_id_hash, (offset + len(voter_id_hash) + 1, len(token))))
+                lines.append(line)
+                offset += len(line)
+
+            self._append_file.write(b''.join(lines))
+            self._append_file.flush()
+            os.fsync(self._append_file.fileno())
+            # Index only after the data is durable (last record wins)
+            self.index.update(positions)
+            self._end = offset
+
+    def __setitem__(self, voter_id_hash, token):
+        self.update([(voter_id_hash, token)])
+
+    def __getitem__(self, voter_id_hash):
+        offset, length = self.index[voter_id_hash]
+        return os.pread(self._read_fd, length, offset)
+
+    def get(self, voter_id_hash, default=None):
+        if voter_id_hash not in self.index:
+            return default
+        return self[voter_id_hash]
+
+    def __contains__(self, voter_id_hash):
+        return voter_id_hash in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(list(self.index))
+
+    def keys(self):
+        return list(self.index)
+
+    def items(self):
+        """Sequential scan in append order, yielding (voter_id_hash, token)"""
+        if self._read_fd is None:
+            return
+        with open(self.store_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                voter_id_hash, _, token = line.rstrip(b'\n').partition(b' ')
+                key = voter_id_hash.decode()
+                # Skip records superseded by a later write for the same voter
+                if self.index.get(key, (None,))[0] == offset + len(voter_id_hash) + 1:
+                    yield key, token
+                offset += len(line)
+
+    def close(self):
+        if self._append_file is not None:
+            self._append_file.close()
+        if self._read_fd is not None:
+            os.close(self._read_fd)
@@ -0,0 +1,73 @@
+# warmup.py
+"""
+Background startup loading with per-component readiness.
+
+    warmup = Warmup()
+    warmup.add('chain', tamper_chain.load)
+    warmup.add('results', load_results, after=('chain',))
+    warmup.start()               # returns immediately
+    warmup.wait(['chain'], 30)   # request path: block until loaded
+
+Every component loads on its own thread as soon as its dependencies are
+ready, so independent files are read concurrently. A loader may return
+(success, detail) like the services' load_* methods; (False, error) or
+an exception marks the component failed (it is not retried).
+"""
+import time
+import threading
+
+class Warmup:
+    def __init__(self):
+        self.components = {}  # name -> status dict
+        self._loaders = {}    # name -> (loader, dependencies)
+        self._done = {}       # name -> threading.Event (set when ready or failed)
+        self.started = None
+
+    def add(self, name, loader, after=()):
+        self._loaders[name] = (loader, tuple(after))
+        self._done[name] = threading.Event()
+        self.components[name] = {'status': 'pending', 'seconds': None, 'error': None}
+
+    def start(self):
+        self.started = time.perf_counter()
+        for name in self._loaders:
+            threading.Thread(target=self._load, args=(name,),
+                             name=f'warmup-{name}', daemon=True).start()
+
+    def _load(self, name):
+        loader, dependencies = self._loaders[name]
+        component = self.components[name]
+        try:
+            for dependency in dependencies:
+                self._done[dependency].wait()
+                if self.components[dependency]['status'] != 'ready':
+                    raise RuntimeError(f'{dependency} failed to load')
+
+            component['status'] = 'loading'
+            started = time.perf_counter()
+            result = loader()
+            component['seconds'] = round(time.perf_counter() - started, 3)
+            if isinstance(result, tuple) and result and result[0] is False:
+                raise RuntimeError(result[1])
+            component['status'] = 'ready'
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            component['status'] = 'failed'
+            component['error'] = str(e)
+        finally:
+            self._done[name].set()
+
+    def is_ready(self, names=None):
+        return all(self.components[name]['status'] == 'ready' for name in names or self.components)
+
+    def wait(self, names=None, timeout=None):
+        """Block until the components have loaded; True if all are ready"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names or self.components:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not self._done[name].wait(remaining):
+                return False
+        return self.is_ready(names)
+
+    def status(self, names=None):
+        return {name: dict(self.components[name]) for name in names or self.components}